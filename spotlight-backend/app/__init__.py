@@ -3,14 +3,61 @@ from flask_sqlalchemy import SQLAlchemy
 from flask_jwt_extended import JWTManager
 from flask_cors import CORS
 from flask_migrate import Migrate
+from werkzeug.middleware.proxy_fix import ProxyFix
 from config import config
+from app.utils.replica import RoutingSession
+from app.utils.prefork import install_fork_safety, install_leader_scheduler
 
 # Initialize extensions
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 jwt = JWTManager()
 migrate = Migrate()
 cors = CORS()
 
+def init_sqlite(app):
+    """Configure SQLite connections and, in concurrent mode, the single-writer machinery"""
+    from app.utils.sqlite import is_sqlite_uri, configure_sqlite_engine, install_session_write_lock, SQLiteWriter
+    import threading
+    
+    if not is_sqlite_uri(app.config['SQLALCHEMY_DATABASE_URI']):
+        return
+    
+    with app.app_context():
+        engine = db.engine
+    
+    if configure_sqlite_engine(engine, app.config):
+        write_lock = threading.RLock()
+        app.extensions['sqlite_write_lock'] = write_lock
+        app.extensions['sqlite_writer'] = SQLiteWriter(
+            engine,
+            write_lock,
+            batch_size=app.config['SQLITE_WRITER_BATCH_SIZE'],
+            flush_interval=app.config['SQLITE_WRITER_FLUSH_INTERVAL']
+        )
+        install_session_write_lock(db.session)
+
+def init_replica(app):
+    """Set up routing to the optional read replica bind (SQLALCHEMY_BINDS['replica'])"""
+    from app.utils.replica import REPLICA_BIND, ReplicaRouter, install_read_your_writes
+    from app.utils.sqlite import is_sqlite_uri, configure_sqlite_engine
+    
+    if REPLICA_BIND not in (app.config.get('SQLALCHEMY_BINDS') or {}):
+        return
+    
+    with app.app_context():
+        engine = db.engines[REPLICA_BIND]
+    
+    if is_sqlite_uri(str(engine.url)):
+        configure_sqlite_engine(engine, app.config)
+    
+    app.extensions['replica_router'] = ReplicaRouter(
+        engine,
+        max_lag_seconds=app.config['REPLICA_MAX_LAG_SECONDS'],
+        check_interval=app.config['REPLICA_LAG_CHECK_INTERVAL'],
+        read_your_writes_seconds=app.config['REPLICA_READ_YOUR_WRITES_SECONDS']
+    )
+    install_read_your_writes(db.session)
+
 def create_app(config_name='default'):
     """Application factory function"""
     app = Flask(__name__)
@@ -18,89 +65,47 @@ def create_app(config_name='default'):
     # Load configuration
     app.config.from_object(config[config_name])
     
-    # Filter out OPTIONS requests from access logs (CORS preflight)
-    import logging
-    log = logging.getLogger('werkzeug')
-    
-    class FilterOPTIONS(logging.Filter):
-        def filter(self, record):
-            return 'OPTIONS' not in record.getMessage()
-    
-    log.addFilter(FilterOPTIONS())
+    if app.config['PROXY_FIX_X_FOR']:
+        # Click dedupe and the access log key on request.remote_addr, which is the proxy's address otherwise
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=app.config['PROXY_FIX_X_FOR'])
     
     # Initialize extensions
     db.init_app(app)
+    init_sqlite(app)
+    init_replica(app)
+    install_fork_safety(app)
+    if app.config['TRACING_ENABLED']:
+        from app.utils.tracing import install_tracing
+        install_tracing(app)
+    if app.config['SQL_INSTRUMENTATION_ENABLED']:
+        from app.utils.query_stats import install_query_instrumentation
+        install_query_instrumentation(app)
+    if app.config['ACCESS_LOG_ENABLED']:
+        from app.utils.access_log import install_access_log
+        install_access_log(app)
+    if app.config['METRICS_ENABLED']:
+        if not app.config['METRICS_TOKEN'] and not (app.debug or app.testing):
+            raise ValueError("METRICS_TOKEN must be set to serve /api/metrics outside debug mode (or set METRICS_ENABLED=false)")
+        from app.utils.metrics import install_metrics
+        install_metrics(app)
+    if app.config['TRAFFIC_CAPTURE_ENABLED']:
+        from app.utils.traffic_capture import install_traffic_capture
+        install_traffic_capture(app)
+    if app.config['PROFILER_ENABLED']:
+        from app.utils.profiler import install_profiler
+        install_profiler(app)
+    if app.config['COMPRESSION_ENABLED']:
+        # Registered last so its after_request runs first and the hooks above see the bytes actually sent
+        from app.utils.compression import install_compression
+        install_compression(app)
+    install_leader_scheduler(app)
     jwt.init_app(app)
     migrate.init_app(app, db)
     cors.init_app(app, origins=app.config['CORS_ORIGINS'], supports_credentials=True)
     
-    # Initialize Swagger
-    from flasgger import Swagger
-    
-    swagger_config = {
-        "headers": [],
-        "specs": [
-            {
-                "endpoint": "apispec",
-                "route": "/apispec.json",
-                "rule_filter": lambda rule: True,
-                "model_filter": lambda tag: True,
-            }
-        ],
-        "static_url_path": "/flasgger_static",
-        "swagger_ui": True,
-        "specs_route": "/api/docs"
-    }
-    
-    swagger_template = {
-        "swagger": "2.0",
-        "info": {
-            "title": "Spotlight Music Hub API",
-            "description": "API documentation for Spotlight - A music link hub platform for artists",
-            "version": "1.0.0",
-            "contact": {
-                "name": "Spotlight API Support"
-            }
-        },
-        "basePath": "/api",
-        "schemes": ["http", "https"],
-        "securityDefinitions": {
-            "Bearer": {
-                "type": "apiKey",
-                "name": "Authorization",
-                "in": "header",
-                "description": "JWT Authorization header using the Bearer scheme. Example: \"Authorization: Bearer {token}\""
-            }
-        },
-        "tags": [
-            {
-                "name": "Authentication",
-                "description": "User authentication and authorization endpoints"
-            },
-            {
-                "name": "Spotify",
-                "description": "Spotify OAuth integration and music data endpoints"
-            },
-            {
-                "name": "Profiles",
-                "description": "User profile management endpoints"
-            },
-            {
-                "name": "Social Links",
-                "description": "Social media links management endpoints"
-            },
-            {
-                "name": "Music Showcase",
-                "description": "Music showcase management endpoints"
-            },
-            {
-                "name": "Health",
-                "description": "API health check endpoints"
-            }
-        ]
-    }
-    
-    Swagger(app, config=swagger_config, template=swagger_template)
+    # API docs: spec and Swagger UI are built on first request (or served from a prebuilt file)
+    from app.utils.api_docs import init_api_docs
+    init_api_docs(app)
     
     # Register blueprints
     from app.routes.auth import auth_bp
@@ -120,10 +125,24 @@ def create_app(config_name='default'):
     # Serve uploaded avatar files
     @app.route('/api/uploads/avatars/<filename>', methods=['GET'])
     def serve_avatar(filename):
-        """Serve uploaded avatar files"""
-        from flask import send_from_directory
-        upload_folder = app.config['UPLOAD_FOLDER']
-        return send_from_directory(upload_folder, filename)
+        """Serve uploaded avatar files with immutable caching and conditional/range requests"""
+        from app.services import AvatarService
+        return AvatarService.send(filename)
+    
+    @app.route('/api/uploads/incoming/<token>', methods=['PUT'])
+    def receive_avatar_upload(token):
+        """Direct avatar upload target when avatars are stored locally (object storage takes presigned uploads)"""
+        from flask import jsonify, request
+        from app.services import AvatarService
+        from app.utils.uploads import UploadRejected
+        from werkzeug.exceptions import RequestEntityTooLarge
+        try:
+            AvatarService.receive_direct_upload(token, request.stream)
+        except UploadRejected as e:
+            return jsonify({'error': e.message}), e.status_code
+        except RequestEntityTooLarge:
+            return jsonify({'error': 'File too large (max 5MB)'}), 413
+        return '', 204
     
     # Health check endpoint
     @app.route('/api/health')
@@ -146,5 +165,33 @@ def create_app(config_name='default'):
         """
         return {'status': 'healthy'}, 200
     
+    if app.config['METRICS_ENABLED']:
+        @app.route('/api/metrics')
+        def metrics():
+            """
+            Metrics
+            Request, database, Spotify and queue metrics in Prometheus text format
+            ---
+            tags:
+              - Health
+            produces:
+              - text/plain
+            responses:
+              200:
+                description: Metrics summed over the server's worker processes (METRICS_MULTIPROCESS_DIR), else this process's
+              401:
+                description: Missing or wrong METRICS_TOKEN bearer token
+            """
+            from flask import Response, request
+            from app.utils.metrics import REGISTRY
+            import hmac
+            
+            token = app.config['METRICS_TOKEN']
+            if token and not hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}'):
+                return {'error': 'Unauthorized'}, 401
+            
+            collector = app.extensions.get('metrics_snapshots')
+            return Response(REGISTRY.render(collector.collect() if collector else None), mimetype='text/plain; version=0.0.4')
+    
     return app
 
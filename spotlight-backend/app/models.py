@@ -12,16 +12,26 @@ class User(db.Model):
     username = db.Column(db.String(50), unique=True, nullable=False, index=True)
     password_hash = db.Column(db.String(255), nullable=False)
     is_admin = db.Column(db.Boolean, default=False, nullable=False)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)  # Keyset pagination cannot step past NULLs
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     # Relationships
-    profile = db.relationship('UserProfile', backref='user', uselist=False, cascade='all, delete-orphan')
-    social_links = db.relationship('SocialLink', backref='user', lazy='dynamic', cascade='all, delete-orphan')
-    spotify_connection = db.relationship('SpotifyConnection', backref='user', uselist=False, cascade='all, delete-orphan')
-    music_showcase = db.relationship('MusicShowcase', backref='user', lazy='dynamic', cascade='all, delete-orphan')
-    profile_clicks = db.relationship('ProfileClick', backref='user', lazy='dynamic', cascade='all, delete-orphan')
-    
+    # passive_deletes: child rows are removed by the ON DELETE CASCADE foreign keys,
+    # so deleting a user never loads its (potentially huge) collections into memory
+    profile = db.relationship('UserProfile', backref='user', uselist=False, cascade='all, delete-orphan', passive_deletes=True)
+    social_links = db.relationship('SocialLink', backref='user', lazy='dynamic', cascade='all, delete-orphan', passive_deletes=True)
+    spotify_connection = db.relationship('SpotifyConnection', backref='user', uselist=False, cascade='all, delete-orphan', passive_deletes=True)
+    music_showcase = db.relationship('MusicShowcase', backref='user', lazy='dynamic', cascade='all, delete-orphan', passive_deletes=True)
+    profile_clicks = db.relationship('ProfileClick', backref='user', lazy='dynamic', cascade='all, delete-orphan', passive_deletes=True)
+
+    __table_args__ = (
+        # Keyset pagination for the admin user listing
+        db.Index('ix_users_created_at_id', 'created_at', 'id'),
+        # Case-insensitive prefix search (pattern ops let Postgres use the index for LIKE 'abc%')
+        db.Index('ix_users_username_lower', db.func.lower(username).label('username_lower'), postgresql_ops={'username_lower': 'varchar_pattern_ops'}),
+        db.Index('ix_users_email_lower', db.func.lower(email).label('email_lower'), postgresql_ops={'email_lower': 'varchar_pattern_ops'}),
+    )
+
     def set_password(self, password):
         """Hash and set password"""
         self.password_hash = generate_password_hash(password)
@@ -49,6 +59,7 @@ class UserProfile(db.Model):
     display_name = db.Column(db.String(100))
     bio = db.Column(db.Text)
     avatar_url = db.Column(db.String(500))
+    avatar_variants = db.Column(db.JSON)  # {size: {'webp': url, 'fallback': url}} for uploaded avatars
     theme_settings = db.Column(db.JSON, default=dict)
     is_public = db.Column(db.Boolean, default=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
@@ -62,12 +73,21 @@ class UserProfile(db.Model):
             'display_name': self.display_name,
             'bio': self.bio,
             'avatar_url': self.avatar_url,
+            'avatar_variants': self.avatar_variants,
             'theme_settings': self.theme_settings or {},
             'is_public': self.is_public,
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'updated_at': self.updated_at.isoformat() if self.updated_at else None
         }
 
+class AvatarFile(db.Model):
+    """Reference count of an uploaded avatar file, keyed by its (content-hash) filename"""
+    __tablename__ = 'avatar_files'
+    
+    filename = db.Column(db.String(100), primary_key=True)
+    ref_count = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
 class SocialLink(db.Model):
     """Social media links model"""
     __tablename__ = 'social_links'
@@ -80,6 +100,11 @@ class SocialLink(db.Model):
     position = db.Column(db.Integer, default=0)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
+    __table_args__ = (
+        # A user's links in display order (WHERE user_id = ? ORDER BY position, id)
+        db.Index('ix_social_links_user_id_position', 'user_id', 'position'),
+    )
+    
     def to_dict(self):
         """Convert social link to dictionary"""
         return {
@@ -138,6 +163,11 @@ class MusicShowcase(db.Model):
     position = db.Column(db.Integer, default=0)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
+    __table_args__ = (
+        # A user's showcase in display order (WHERE user_id = ? ORDER BY position, id)
+        db.Index('ix_music_showcase_user_id_position', 'user_id', 'position'),
+    )
+    
     def to_dict(self):
         """Convert showcase item to dictionary"""
         return {
@@ -164,6 +194,11 @@ class ProfileClick(db.Model):
     user_agent = db.Column(db.String(500))
     referer = db.Column(db.String(500))
     
+    __table_args__ = (
+        # Click deduplication (same user, same IP, within the last few seconds)
+        db.Index('ix_profile_clicks_user_id_ip_address_clicked_at', 'user_id', 'ip_address', 'clicked_at'),
+    )
+    
     def to_dict(self):
         """Convert click to dictionary"""
         return {
@@ -175,3 +210,31 @@ class ProfileClick(db.Model):
             'referer': self.referer
         }
 
+
+class UserDeletionJob(db.Model):
+    """Background purge of a deleted user's clicks, shared by every worker process"""
+    __tablename__ = 'user_deletion_jobs'
+    
+    id = db.Column(db.String(32), primary_key=True)
+    user_id = db.Column(db.Integer, nullable=False)  # No foreign key: the job outlives the user it deletes
+    status = db.Column(db.String(20), nullable=False, default='pending')
+    clicks_purged = db.Column(db.Integer, nullable=False, default=0)
+    started_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    finished_at = db.Column(db.DateTime)
+    error = db.Column(db.Text)
+    owner = db.Column(db.String(100))  # '<host>:<pid>' of the worker running it
+    updated_at = db.Column(db.DateTime)  # Heartbeat: set on every progress update
+    
+    def to_dict(self):
+        """Convert job to dictionary"""
+        return {
+            'id': self.id,
+            'user_id': self.user_id,
+            'status': self.status,
+            'clicks_purged': self.clicks_purged,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None,
+            'error': self.error,
+            'owner': self.owner,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
@@ -1,8 +1,12 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, Response, request, jsonify, stream_with_context, current_app
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from functools import wraps
+from datetime import datetime
+from sqlalchemy import or_, case, literal, select, text, union_all
 from app import db
 from app.models import User, UserProfile, SocialLink, MusicShowcase, SpotifyConnection, ProfileClick
+from app.services import ExportService, UserDeletionService
+from app.utils import encode_cursor, decode_cursor, after_cursor, escape_like, use_replica, pool_status
 
 admin_bp = Blueprint('admin', __name__)
 
@@ -22,6 +26,7 @@ def admin_required(f):
 @admin_bp.route('/stats', methods=['GET'])
 @jwt_required()
 @admin_required
+@use_replica
 def get_stats():
     """
     Get Admin Statistics
@@ -57,10 +62,11 @@ def get_stats():
 @admin_bp.route('/users', methods=['GET'])
 @jwt_required()
 @admin_required
+@use_replica
 def get_users():
     """
     Get All Users
-    Retrieve list of all users (admin only)
+    Retrieve list of users ordered by signup time (admin only), using cursor pagination
     ---
     tags:
       - Admin
@@ -68,40 +74,252 @@ def get_users():
       - Bearer: []
     parameters:
       - in: query
-        name: page
-        type: integer
-        default: 1
+        name: cursor
+        type: string
+        required: false
+        description: Opaque cursor returned as next_cursor by the previous page
       - in: query
         name: per_page
         type: integer
         default: 20
+      - in: query
+        name: q
+        type: string
+        required: false
+        description: Case-insensitive prefix match on username or email
+      - in: query
+        name: total
+        type: string
+        enum: [none, estimate, exact]
+        default: none
+        description: Whether to include a total row count (estimate is cheap on Postgres)
     responses:
       200:
         description: Users retrieved successfully
+        schema:
+          type: object
+          properties:
+            users:
+              type: array
+              items:
+                type: object
+            next_cursor:
+              type: string
+            has_more:
+              type: boolean
+            per_page:
+              type: integer
+            total:
+              type: integer
+      400:
+        description: Invalid cursor or total mode
       403:
         description: Admin access required
     """
+    per_page = request.args.get('per_page', 20, type=int)
+    per_page = max(1, min(per_page, 100))  # Limit max per_page
+    search = (request.args.get('q') or '').strip().lower()
+    total_mode = request.args.get('total', 'none')
+    
+    if total_mode not in ('none', 'estimate', 'exact'):
+        return jsonify({'error': 'total must be one of: none, estimate, exact'}), 400
+    
+    query = User.query
+    
+    if search:
+        pattern = escape_like(search) + '%'
+        query = query.filter(or_(
+            db.func.lower(User.username).like(pattern, escape='\\'),
+            db.func.lower(User.email).like(pattern, escape='\\')
+        ))
+    
+    filtered_query = query
+    
+    cursor = request.args.get('cursor')
+    if cursor:
+        position = decode_cursor(cursor)
+        if not position:
+            return jsonify({'error': 'Invalid cursor'}), 400
+        query = query.filter(after_cursor(position, User.created_at, User.id))
+    
     try:
-        page = request.args.get('page', 1, type=int)
-        per_page = request.args.get('per_page', 20, type=int)
-        per_page = min(per_page, 100)  # Limit max per_page
+        # Fetch one extra row to know whether another page exists without counting
+        users = query.order_by(User.created_at, User.id).limit(per_page + 1).all()
+        has_more = len(users) > per_page
+        users = users[:per_page]
         
-        users = User.query.paginate(
-            page=page,
-            per_page=per_page,
-            error_out=False
-        )
+        aggregates = _user_aggregates([user.id for user in users])
         
-        return jsonify({
-            'users': [user.to_dict() for user in users.items],
-            'total': users.total,
-            'page': page,
-            'per_page': per_page,
-            'pages': users.pages
-        }), 200
+        rows = []
+        for user in users:
+            row = user.to_dict()
+            row['stats'] = aggregates.get(user.id, {'social_links': 0, 'showcase_items': 0, 'profile_clicks': 0})
+            rows.append(row)
+        
+        response = {
+            'users': rows,
+            'next_cursor': encode_cursor(users[-1].created_at, users[-1].id) if has_more else None,
+            'has_more': has_more,
+            'per_page': per_page
+        }
+        
+        if total_mode == 'exact':
+            response['total'] = filtered_query.order_by(None).count()
+        elif total_mode == 'estimate':
+            response['total'] = _estimate_user_count(filtered_query, search)
+        
+        return jsonify(response), 200
     except Exception as e:
         return jsonify({'error': 'Failed to retrieve users', 'details': str(e)}), 500
 
+def _user_aggregates(user_ids):
+    """Link, showcase and click counts for the given users in a single grouped query"""
+    if not user_ids:
+        return {}
+    
+    def counts(model, kind):
+        return (
+            select(
+                model.user_id.label('user_id'),
+                literal(kind).label('kind'),
+                db.func.count().label('total')
+            )
+            .where(model.user_id.in_(user_ids))
+            .group_by(model.user_id)
+        )
+    
+    per_table = union_all(
+        counts(SocialLink, 'social_links'),
+        counts(MusicShowcase, 'showcase_items'),
+        counts(ProfileClick, 'profile_clicks')
+    ).subquery()
+    
+    stmt = select(
+        per_table.c.user_id,
+        *[
+            db.func.sum(case((per_table.c.kind == kind, per_table.c.total), else_=0)).label(kind)
+            for kind in ('social_links', 'showcase_items', 'profile_clicks')
+        ]
+    ).group_by(per_table.c.user_id)
+    
+    return {
+        row.user_id: {
+            'social_links': int(row.social_links or 0),
+            'showcase_items': int(row.showcase_items or 0),
+            'profile_clicks': int(row.profile_clicks or 0)
+        }
+        for row in db.session.execute(stmt)
+    }
+
+def _estimate_user_count(filtered_query, search):
+    """Cheap row count estimate; uses planner statistics on Postgres, exact count elsewhere"""
+    if not search and db.engine.dialect.name == 'postgresql':
+        estimate = db.session.execute(
+            text("SELECT reltuples::bigint FROM pg_class WHERE relname = :table"),
+            {'table': User.__tablename__}
+        ).scalar()
+        if estimate is not None and estimate >= 0:
+            return int(estimate)
+    return filtered_query.order_by(None).count()
+
+@admin_bp.route('/export/<dataset>', methods=['GET'])
+@jwt_required()
+@admin_required
+@use_replica
+def export_data(dataset):
+    """
+    Export Platform Data
+    Stream a full dump of users, profiles or profile clicks as NDJSON or CSV (admin only)
+    ---
+    tags:
+      - Admin
+    security:
+      - Bearer: []
+    produces:
+      - application/x-ndjson
+      - text/csv
+      - application/gzip
+    parameters:
+      - in: path
+        name: dataset
+        type: string
+        enum: [users, profiles, clicks]
+        required: true
+      - in: query
+        name: format
+        type: string
+        enum: [ndjson, csv]
+        default: ndjson
+      - in: query
+        name: gzip
+        type: boolean
+        default: false
+        description: Gzip-compress the stream
+      - in: query
+        name: since
+        type: string
+        format: date-time
+        required: false
+        description: Only clicks at or after this time (clicks only)
+      - in: query
+        name: until
+        type: string
+        format: date-time
+        required: false
+        description: Only clicks before this time (clicks only)
+      - in: query
+        name: user_id
+        type: integer
+        required: false
+        description: Restrict the export to a single user
+    responses:
+      200:
+        description: Export stream
+      400:
+        description: Invalid dataset, format or time range
+      403:
+        description: Admin access required
+    """
+    export_format = request.args.get('format', 'ndjson')
+    compress = request.args.get('gzip', 'false').lower() in ('true', '1', 'yes')
+    user_id = request.args.get('user_id', type=int)
+    
+    if dataset not in ExportService.DATASETS:
+        return jsonify({'error': f"dataset must be one of: {', '.join(ExportService.DATASETS)}"}), 400
+    
+    if export_format not in ExportService.FORMATS:
+        return jsonify({'error': f"format must be one of: {', '.join(ExportService.FORMATS)}"}), 400
+    
+    try:
+        since = datetime.fromisoformat(request.args['since']) if request.args.get('since') else None
+        until = datetime.fromisoformat(request.args['until']) if request.args.get('until') else None
+    except ValueError:
+        return jsonify({'error': 'since and until must be ISO 8601 timestamps'}), 400
+    
+    if (since or until) and dataset != 'clicks':
+        return jsonify({'error': 'since and until only apply to the clicks dataset'}), 400
+    
+    chunks = ExportService.stream(
+        dataset,
+        export_format=export_format,
+        compress=compress,
+        since=since,
+        until=until,
+        user_id=user_id
+    )
+    
+    mimetype = 'text/csv' if export_format == 'csv' else 'application/x-ndjson'
+    filename = f"spotlight-{dataset}-{datetime.utcnow().strftime('%Y%m%dT%H%M%SZ')}.{export_format}"
+    if compress:
+        mimetype = 'application/gzip'
+        filename += '.gz'
+    
+    response = Response(stream_with_context(chunks), mimetype=mimetype)
+    response.headers['Content-Disposition'] = f'attachment; filename="{filename}"'
+    response.headers['Cache-Control'] = 'no-store'
+    response.headers['X-Accel-Buffering'] = 'no'  # Let nginx pass chunks through as they are produced
+    return response
+
 @admin_bp.route('/users/<int:user_id>/toggle-admin', methods=['POST'])
 @jwt_required()
 @admin_required
@@ -149,3 +367,342 @@ def toggle_admin(user_id):
         db.session.rollback()
         return jsonify({'error': 'Failed to update admin status', 'details': str(e)}), 500
 
+
+@admin_bp.route('/users/<int:user_id>', methods=['DELETE'])
+@jwt_required()
+@admin_required
+def delete_user(user_id):
+    """
+    Delete User
+    Permanently delete a user and all of their data (admin only).
+    Users with large click histories are purged in chunks by a background job.
+    ---
+    tags:
+      - Admin
+    security:
+      - Bearer: []
+    parameters:
+      - in: path
+        name: user_id
+        type: integer
+        required: true
+    responses:
+      200:
+        description: User deleted
+      202:
+        description: Deletion started in the background
+        schema:
+          type: object
+          properties:
+            message:
+              type: string
+            job:
+              type: object
+      400:
+        description: Cannot delete your own account
+      403:
+        description: Admin access required
+      404:
+        description: User not found
+    """
+    current_user_id = get_jwt_identity()
+    if user_id == current_user_id:
+        return jsonify({'error': 'Cannot delete your own account'}), 400
+    
+    user = User.query.get(user_id)
+    if not user:
+        return jsonify({'error': 'User not found'}), 404
+    
+    try:
+        click_count = UserDeletionService.count_clicks(user_id)
+        
+        if click_count > current_app.config['USER_DELETE_BACKGROUND_THRESHOLD']:
+            # Hide the profile right away; the purge may take a while
+            if user.profile:
+                user.profile.is_public = False
+                db.session.commit()
+            job = UserDeletionService.start_background_deletion(user_id)
+            return jsonify({
+                'message': 'User deletion started',
+                'job': job
+            }), 202
+        
+        UserDeletionService.delete_user(user_id)
+        return jsonify({'message': 'User deleted successfully'}), 200
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': 'Failed to delete user', 'details': str(e)}), 500
+
+@admin_bp.route('/jobs/<job_id>', methods=['GET'])
+@jwt_required()
+@admin_required
+def get_job(job_id):
+    """
+    Get Background Job Status
+    Check progress of a background user deletion (admin only)
+    ---
+    tags:
+      - Admin
+    security:
+      - Bearer: []
+    parameters:
+      - in: path
+        name: job_id
+        type: string
+        required: true
+    responses:
+      200:
+        description: Job status retrieved successfully
+      403:
+        description: Admin access required
+      404:
+        description: Job not found
+    """
+    job = UserDeletionService.get_job(job_id)
+    
+    if not job:
+        return jsonify({'error': 'Job not found'}), 404
+    
+    return jsonify({'job': job}), 200
+
+@admin_bp.route('/db/pools', methods=['GET'])
+@jwt_required()
+@admin_required
+def get_db_pools():
+    """
+    Get Database Pool Metrics
+    Connection pool statistics per bind, plus read replica health and routing counters (admin only)
+    ---
+    tags:
+      - Admin
+    security:
+      - Bearer: []
+    responses:
+      200:
+        description: Pool metrics retrieved successfully
+        schema:
+          type: object
+          properties:
+            pools:
+              type: object
+              description: Keyed by bind (primary, replica) with size, checkedin, checkedout, overflow and status
+            replica:
+              type: object
+              description: Replica health, lag_seconds and routing counters; null when no replica is configured
+      403:
+        description: Admin access required
+    """
+    router = current_app.extensions.get('replica_router')
+    
+    return jsonify({
+        'pools': pool_status(db.engines),
+        'replica': router.status() if router else None
+    }), 200
+
+@admin_bp.route('/db/queries', methods=['GET'])
+@jwt_required()
+@admin_required
+def get_db_query_stats():
+    """
+    Get SQL Query Statistics
+    Per-endpoint query counts, database time, duplicate queries, likely N+1 patterns and slow queries (admin only)
+    ---
+    tags:
+      - Admin
+    security:
+      - Bearer: []
+    parameters:
+      - in: query
+        name: reset
+        type: boolean
+        required: false
+        description: Clear the counters after reading them
+    responses:
+      200:
+        description: Query statistics retrieved successfully
+        schema:
+          type: object
+          properties:
+            endpoints:
+              type: object
+              description: Keyed by endpoint with requests, queries, avg_queries, max_queries, db_time_seconds, avg_db_time_ms, duplicate_queries, n_plus_one_requests and slow_queries
+      403:
+        description: Admin access required
+      404:
+        description: Query recording is disabled
+    """
+    stats = current_app.extensions.get('query_stats')
+    
+    if not stats:
+        return jsonify({'error': 'Query recording is disabled (SQL_INSTRUMENTATION_ENABLED)'}), 404
+    
+    endpoints = stats.snapshot()
+    if request.args.get('reset', '').lower() in ('true', '1', 'yes'):
+        stats.reset()
+    
+    return jsonify({'endpoints': endpoints}), 200
+
+def _get_profiler():
+    return current_app.extensions.get('profiler')
+
+@admin_bp.route('/profiler', methods=['GET'])
+@jwt_required()
+@admin_required
+def get_profiler():
+    """
+    Get Profiler Status
+    Current profiling rule and the stored request profiles, newest first (admin only)
+    ---
+    tags:
+      - Admin
+    security:
+      - Bearer: []
+    responses:
+      200:
+        description: Profiler status retrieved successfully
+      403:
+        description: Admin access required
+      404:
+        description: Profiler is disabled
+    """
+    profiler = _get_profiler()
+    
+    if not profiler:
+        return jsonify({'error': 'Profiler is disabled (PROFILER_ENABLED)'}), 404
+    
+    return jsonify(profiler.status()), 200
+
+@admin_bp.route('/profiler', methods=['PUT'])
+@jwt_required()
+@admin_required
+def arm_profiler():
+    """
+    Arm Profiler
+    Sample-profile upcoming requests to one endpoint, or to any endpoint (admin only)
+    ---
+    tags:
+      - Admin
+    security:
+      - Bearer: []
+    parameters:
+      - in: body
+        name: body
+        schema:
+          type: object
+          properties:
+            endpoint:
+              type: string
+              example: profiles.get_public_profile
+              description: Flask endpoint name; omit or null for every endpoint
+            sample_rate:
+              type: number
+              example: 0.1
+              description: Share of matching requests to profile (0-1, default 1)
+            count:
+              type: integer
+              example: 10
+              description: Stop after this many profiles (default 10)
+    responses:
+      200:
+        description: Profiler armed
+      400:
+        description: Invalid endpoint, sample rate or count
+      403:
+        description: Admin access required
+      404:
+        description: Profiler is disabled
+    """
+    profiler = _get_profiler()
+    
+    if not profiler:
+        return jsonify({'error': 'Profiler is disabled (PROFILER_ENABLED)'}), 404
+    
+    data = request.get_json() or {}
+    endpoint = data.get('endpoint')
+    sample_rate = data.get('sample_rate', 1)
+    count = data.get('count', 10)
+    
+    if endpoint is not None and endpoint not in current_app.view_functions:
+        return jsonify({'error': f'Unknown endpoint: {endpoint}'}), 400
+    
+    if isinstance(sample_rate, bool) or not isinstance(sample_rate, (int, float)) or not 0 < sample_rate <= 1:
+        return jsonify({'error': 'sample_rate must be a number greater than 0 and at most 1'}), 400
+    
+    if isinstance(count, bool) or not isinstance(count, int) or not 1 <= count <= profiler.max_profiles:
+        return jsonify({'error': f'count must be an integer between 1 and {profiler.max_profiles}'}), 400
+    
+    profiler.arm(endpoint, float(sample_rate), count)
+    
+    return jsonify(profiler.status()), 200
+
+@admin_bp.route('/profiler', methods=['DELETE'])
+@jwt_required()
+@admin_required
+def disarm_profiler():
+    """
+    Disarm Profiler
+    Stop selecting new requests for profiling; stored profiles are kept (admin only)
+    ---
+    tags:
+      - Admin
+    security:
+      - Bearer: []
+    responses:
+      200:
+        description: Profiler disarmed
+      403:
+        description: Admin access required
+      404:
+        description: Profiler is disabled
+    """
+    profiler = _get_profiler()
+    
+    if not profiler:
+        return jsonify({'error': 'Profiler is disabled (PROFILER_ENABLED)'}), 404
+    
+    profiler.disarm()
+    
+    return jsonify(profiler.status()), 200
+
+@admin_bp.route('/profiler/profiles/<profile_id>', methods=['GET'])
+@jwt_required()
+@admin_required
+def download_profile(profile_id):
+    """
+    Download Profile
+    Collapsed-stack text for one profile, ready for flamegraph.pl or speedscope (admin only)
+    ---
+    tags:
+      - Admin
+    security:
+      - Bearer: []
+    parameters:
+      - in: path
+        name: profile_id
+        type: string
+        required: true
+    produces:
+      - text/plain
+    responses:
+      200:
+        description: One "frame;frame;frame count" line per distinct stack
+      403:
+        description: Admin access required
+      404:
+        description: Profiler is disabled or profile not found
+    """
+    profiler = _get_profiler()
+    
+    if not profiler:
+        return jsonify({'error': 'Profiler is disabled (PROFILER_ENABLED)'}), 404
+    
+    profile = profiler.get(profile_id)
+    
+    if not profile:
+        return jsonify({'error': 'Profile not found'}), 404
+    
+    return Response(
+        profiler.to_collapsed(profile),
+        mimetype='text/plain',
+        headers={'Content-Disposition': f'attachment; filename=profile-{profile_id}.folded'}
+    )
@@ -1,11 +1,17 @@
+import asyncio
+from asgiref.sync import sync_to_async
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
+from sqlalchemy import insert
 from app import db
 from app.models import MusicShowcase, User
-from app.services import SpotifyService
+from app.services import SpotifyService, AsyncSpotifyService, OrderingService
 
 music_showcase_bp = Blueprint('music_showcase', __name__)
 
+SHOWCASE_LIMIT = 5  # Maximum showcase items per user (MVP)
+SPOTIFY_ALBUMS_BATCH_LIMIT = 20  # Spotify's "Get Several Albums" accepts at most 20 ids
+
 @music_showcase_bp.route('', methods=['GET'])
 @jwt_required()
 def get_music_showcase():
@@ -51,7 +57,7 @@ def get_music_showcase():
         description: Unauthorized
     """
     current_user_id = get_jwt_identity()
-    items = MusicShowcase.query.filter_by(user_id=current_user_id).order_by(MusicShowcase.position).all()
+    items = MusicShowcase.query.filter_by(user_id=current_user_id).order_by(*OrderingService.order_by(MusicShowcase)).all()
     
     return jsonify({
         'items': [item.to_dict() for item in items]
@@ -59,7 +65,7 @@ def get_music_showcase():
 
 @music_showcase_bp.route('', methods=['POST'])
 @jwt_required()
-def add_to_showcase():
+async def add_to_showcase():
     """
     Add Item to Music Showcase
     Add a Spotify album, single, or EP to the music showcase (max 5 items)
@@ -111,32 +117,44 @@ def add_to_showcase():
     if not spotify_item_id:
         return jsonify({'error': 'spotify_item_id is required'}), 400
     
-    # Check if user has Spotify connected
-    user = User.query.get(current_user_id)
-    if not user or not user.spotify_connection:
-        return jsonify({'error': 'Spotify not connected'}), 401
+    def check_showcase():
+        # Check if user has Spotify connected
+        user = User.query.get(current_user_id)
+        if not user or not user.spotify_connection:
+            return jsonify({'error': 'Spotify not connected'}), 401
+        
+        # Check showcase limit (5 items for MVP)
+        existing_count = MusicShowcase.query.filter_by(user_id=current_user_id).count()
+        if existing_count >= SHOWCASE_LIMIT:
+            return jsonify({'error': 'Showcase limit reached (5 items maximum)'}), 400
+        
+        # Check if item already exists
+        existing = MusicShowcase.query.filter_by(
+            user_id=current_user_id,
+            spotify_item_id=spotify_item_id
+        ).first()
+        
+        if existing:
+            return jsonify({'error': 'Item already in showcase'}), 409
+        
+        return None
     
-    # Check showcase limit (5 items for MVP)
-    existing_count = MusicShowcase.query.filter_by(user_id=current_user_id).count()
-    if existing_count >= 5:
-        return jsonify({'error': 'Showcase limit reached (5 items maximum)'}), 400
+    async def fetch_album():
+        access_token = await AsyncSpotifyService.get_valid_access_token(current_user_id)
+        if not access_token:
+            return None, None
+        return access_token, await AsyncSpotifyService.get_album_details(access_token, spotify_item_id)
     
-    # Check if item already exists
-    existing = MusicShowcase.query.filter_by(
-        user_id=current_user_id,
-        spotify_item_id=spotify_item_id
-    ).first()
+    # The album is fetched from Spotify while the checks run on the request thread; when a check
+    # fails the fetched album is simply dropped
+    error, (access_token, album_data) = await asyncio.gather(sync_to_async(check_showcase)(), fetch_album())
     
-    if existing:
-        return jsonify({'error': 'Item already in showcase'}), 409
+    if error:
+        return error
     
-    # Get album details from Spotify
-    access_token = SpotifyService.get_valid_access_token(current_user_id)
     if not access_token:
         return jsonify({'error': 'Failed to get Spotify access token'}), 500
     
-    album_data = SpotifyService.get_album_details(access_token, spotify_item_id)
-    
     if not album_data:
         return jsonify({'error': 'Failed to fetch album details from Spotify'}), 404
     
@@ -155,31 +173,160 @@ def add_to_showcase():
     images = album_data.get('images', [])
     image_url = images[0].get('url', '') if images else None
     
-    # Get current max position
-    max_position = db.session.query(db.func.max(MusicShowcase.position)).filter_by(user_id=current_user_id).scalar() or -1
-    
-    # Create showcase item
-    showcase_item = MusicShowcase(
-        user_id=current_user_id,
-        spotify_item_id=spotify_item_id,
-        item_type=item_type,
-        item_name=album_data.get('name', ''),
-        artist_names=artist_names,
-        image_url=image_url,
-        spotify_url=album_data.get('external_urls', {}).get('spotify', ''),
-        position=max_position + 1
-    )
+    def save_item():
+        # Create showcase item
+        showcase_item = MusicShowcase(
+            user_id=current_user_id,
+            spotify_item_id=spotify_item_id,
+            item_type=item_type,
+            item_name=album_data.get('name', ''),
+            artist_names=artist_names,
+            image_url=image_url,
+            spotify_url=album_data.get('external_urls', {}).get('spotify', ''),
+            position=OrderingService.next_position(MusicShowcase, current_user_id)  # Computed inside the INSERT
+        )
+        
+        try:
+            db.session.add(showcase_item)
+            db.session.commit()
+            return jsonify({
+                'message': 'Item added to showcase successfully',
+                'item': showcase_item.to_dict()
+            }), 201
+        except Exception as e:
+            db.session.rollback()
+            return jsonify({'error': 'Failed to add item to showcase', 'details': str(e)}), 500
+    
+    return await sync_to_async(save_item)()
+
+@music_showcase_bp.route('/bulk', methods=['POST'])
+@jwt_required()
+def bulk_add_to_showcase():
+    """
+    Bulk Add Items to Music Showcase
+    Add several Spotify albums, singles or EPs in one request (e.g. a full EP set)
+    ---
+    tags:
+      - Music Showcase
+    security:
+      - Bearer: []
+    parameters:
+      - in: body
+        name: body
+        required: true
+        schema:
+          type: object
+          required:
+            - spotify_item_ids
+          properties:
+            spotify_item_ids:
+              type: array
+              items:
+                type: string
+              description: Spotify album/single/EP IDs, in the order they should appear
+              example: [4uLU6hMCjMI75M1A2tKUQC, 6dVIqQ8qmQ5GBnJ9shOYGE]
+    responses:
+      201:
+        description: Items added to showcase successfully
+        schema:
+          type: object
+          properties:
+            message:
+              type: string
+            items:
+              type: array
+              items:
+                type: object
+      400:
+        description: Invalid input or showcase limit reached
+      401:
+        description: Spotify not connected or unauthorized
+      404:
+        description: Some albums were not found on Spotify
+      409:
+        description: Some items are already in the showcase
+      500:
+        description: Failed to add items to showcase
+    """
+    current_user_id = get_jwt_identity()
+    data = request.get_json()
+    
+    if not data or not isinstance(data.get('spotify_item_ids'), list):
+        return jsonify({'error': 'spotify_item_ids array is required'}), 400
+    
+    # Normalize and de-duplicate while keeping the requested order
+    spotify_item_ids = []
+    for spotify_item_id in data['spotify_item_ids']:
+        if not isinstance(spotify_item_id, str) or not spotify_item_id.strip():
+            return jsonify({'error': 'spotify_item_ids must be non-empty strings'}), 400
+        if spotify_item_id.strip() not in spotify_item_ids:
+            spotify_item_ids.append(spotify_item_id.strip())
+    
+    if not spotify_item_ids:
+        return jsonify({'error': 'spotify_item_ids array is required'}), 400
+    
+    # Limit and duplicate checks from a single query over the user's current items
+    existing_ids = {
+        row.spotify_item_id
+        for row in db.session.query(MusicShowcase.spotify_item_id).filter_by(user_id=current_user_id)
+    }
+    
+    if len(existing_ids) + len(spotify_item_ids) > SHOWCASE_LIMIT:
+        return jsonify({
+            'error': f'Showcase limit reached ({SHOWCASE_LIMIT} items maximum)',
+            'available_slots': max(0, SHOWCASE_LIMIT - len(existing_ids))
+        }), 400
+    
+    duplicates = [spotify_item_id for spotify_item_id in spotify_item_ids if spotify_item_id in existing_ids]
+    if duplicates:
+        return jsonify({'error': 'Some items are already in showcase', 'spotify_item_ids': duplicates}), 409
+    
+    # Token lookup (also confirms Spotify is connected)
+    access_token = SpotifyService.get_valid_access_token(current_user_id)
+    if not access_token:
+        return jsonify({'error': 'Spotify not connected'}), 401
+    
+    # One catalog request for every album (limit is far below Spotify's 20-id batch size)
+    albums = SpotifyService.get_several_albums(access_token, spotify_item_ids[:SPOTIFY_ALBUMS_BATCH_LIMIT])
+    
+    if albums is None:
+        return jsonify({'error': 'Failed to fetch album details from Spotify'}), 502
+    
+    albums_by_id = {album['id']: album for album in albums if album}
+    missing = [spotify_item_id for spotify_item_id in spotify_item_ids if spotify_item_id not in albums_by_id]
+    if missing:
+        return jsonify({'error': 'Some albums were not found on Spotify', 'spotify_item_ids': missing}), 404
+    
+    # One multi-row INSERT; positions are offsets from the current max, computed in the statement
+    next_position = OrderingService.next_position(MusicShowcase, current_user_id)
+    rows = []
+    for index, spotify_item_id in enumerate(spotify_item_ids):
+        album = SpotifyService.format_album(albums_by_id[spotify_item_id])
+        rows.append({
+            'user_id': current_user_id,
+            'spotify_item_id': spotify_item_id,
+            'item_type': album['item_type'],
+            'item_name': album['item_name'],
+            'artist_names': album['artist_names'],
+            'image_url': album['image_url'],
+            'spotify_url': album['spotify_url'],
+            'position': next_position + index * OrderingService.POSITION_GAP
+        })
     
     try:
-        db.session.add(showcase_item)
+        inserted = db.session.execute(
+            insert(MusicShowcase).values(rows).returning(MusicShowcase.id)
+        ).scalars().all()
         db.session.commit()
+        
+        items = MusicShowcase.query.filter(MusicShowcase.id.in_(inserted)).order_by(*OrderingService.order_by(MusicShowcase)).all()
         return jsonify({
-            'message': 'Item added to showcase successfully',
-            'item': showcase_item.to_dict()
+            'message': 'Items added to showcase successfully',
+            'items': [item.to_dict() for item in items]
         }), 201
     except Exception as e:
         db.session.rollback()
-        return jsonify({'error': 'Failed to add item to showcase', 'details': str(e)}), 500
+        return jsonify({'error': 'Failed to add items to showcase', 'details': str(e)}), 500
 
 @music_showcase_bp.route('/<int:item_id>', methods=['DELETE'])
 @jwt_required()
@@ -279,23 +426,84 @@ def reorder_showcase():
     if not isinstance(item_ids, list):
         return jsonify({'error': 'item_ids must be an array'}), 400
     
-    # Verify all items belong to user
-    items = MusicShowcase.query.filter(
-        MusicShowcase.id.in_(item_ids),
-        MusicShowcase.user_id == current_user_id
-    ).all()
+    if len(set(item_ids)) != len(item_ids) or not all(isinstance(item_id, int) for item_id in item_ids):
+        return jsonify({'error': 'item_ids must be unique integers'}), 400
     
-    if len(items) != len(item_ids):
-        return jsonify({'error': 'Some items not found or do not belong to user'}), 400
-    
-    # Update positions
+    # Update positions in one statement; the user_id filter doubles as the ownership check
     try:
-        for index, item_id in enumerate(item_ids):
-            item = next(i for i in items if i.id == item_id)
-            item.position = index
+        updated = OrderingService.reorder(MusicShowcase, current_user_id, item_ids)
+        
+        if updated != len(item_ids):
+            db.session.rollback()
+            return jsonify({'error': 'Some items not found or do not belong to user'}), 400
         
         db.session.commit()
         return jsonify({'message': 'Showcase reordered successfully'}), 200
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': 'Failed to reorder showcase', 'details': str(e)}), 500
+
+@music_showcase_bp.route('/<int:item_id>/move', methods=['PUT'])
+@jwt_required()
+def move_showcase_item(item_id):
+    """
+    Move Showcase Item
+    Move a single showcase item directly before or after another item
+    ---
+    tags:
+      - Music Showcase
+    security:
+      - Bearer: []
+    parameters:
+      - in: path
+        name: item_id
+        type: integer
+        required: true
+        description: ID of the showcase item to move
+      - in: body
+        name: body
+        required: true
+        schema:
+          type: object
+          properties:
+            before_id:
+              type: integer
+              description: Place the item directly before this item
+            after_id:
+              type: integer
+              description: Place the item directly after this item
+    responses:
+      200:
+        description: Item moved successfully
+        schema:
+          type: object
+          properties:
+            message:
+              type: string
+      400:
+        description: Invalid input data
+      401:
+        description: Unauthorized
+      404:
+        description: Item not found
+      500:
+        description: Failed to move item
+    """
+    current_user_id = get_jwt_identity()
+    data = request.get_json()
+    
+    before_id = data.get('before_id') if data else None
+    after_id = data.get('after_id') if data else None
+    
+    if (before_id is None) == (after_id is None):
+        return jsonify({'error': 'Exactly one of before_id or after_id is required'}), 400
+    
+    try:
+        if not OrderingService.move(MusicShowcase, current_user_id, item_id, before_id=before_id, after_id=after_id):
+            return jsonify({'error': 'Item not found'}), 404
+        
+        db.session.commit()
+        return jsonify({'message': 'Item moved successfully'}), 200
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': 'Failed to move item', 'details': str(e)}), 500
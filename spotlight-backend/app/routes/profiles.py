@@ -1,38 +1,50 @@
 from flask import Blueprint, request, jsonify, current_app
 from flask_jwt_extended import jwt_required, get_jwt_identity
+from sqlalchemy.orm import joinedload
 from app import db
 from app.models import User, UserProfile, SocialLink, MusicShowcase, ProfileClick
-from app.utils import validate_url
-import os
-import uuid
+from app.services import OrderingService, ProfileBatchService, BatchValidationError, SpotifyService, ClickTrackingService, AvatarService
+from app.utils import validate_url, use_replica
+from app.utils.compression import cache_compressed
+from app.utils.images import InvalidImageError
+from app.utils.uploads import parse_streaming_form, UploadRejected
+from werkzeug.exceptions import RequestEntityTooLarge
+from datetime import datetime, timedelta
 
 profiles_bp = Blueprint('profiles', __name__)
 
-def allowed_file(filename):
-    """Check if file extension is allowed"""
-    return '.' in filename and \
-           filename.rsplit('.', 1)[1].lower() in current_app.config['ALLOWED_EXTENSIONS']
+def profile_payload(profile, slot):
+    """Profile dict plus the avatar variant that fits the UI slot it will be shown in"""
+    data = profile.to_dict()
+    data['avatar_url'] = AvatarService.public_url(profile.avatar_url)
+    data['avatar_variants'] = AvatarService.public_variants(profile.avatar_variants)
+    data['avatar'] = AvatarService.for_slot(profile, slot)
+    return data
 
-def save_avatar_file(file, user_id):
-    """Save uploaded avatar file and return the URL path"""
-    if file and allowed_file(file.filename):
-        # Create upload directory if it doesn't exist
-        upload_folder = current_app.config['UPLOAD_FOLDER']
-        os.makedirs(upload_folder, exist_ok=True)
-        
-        # Generate unique filename
-        ext = file.filename.rsplit('.', 1)[1].lower()
-        filename = f"{user_id}_{uuid.uuid4().hex[:8]}.{ext}"
-        filepath = os.path.join(upload_folder, filename)
-        
-        # Save file
-        file.save(filepath)
-        
-        # Return URL path (relative to static route)
-        return f"/api/uploads/avatars/{filename}"
-    return None
+def serialize_my_profile(user):
+    """Build the authenticated user's full profile payload"""
+    # Get social links
+    social_links = [link.to_dict() for link in user.social_links.order_by(*OrderingService.order_by(SocialLink)).all()]
+    
+    # Get music showcase
+    showcase_items = [item.to_dict() for item in user.music_showcase.order_by(*OrderingService.order_by(MusicShowcase)).all()]
+    
+    # Get Spotify connection status and data
+    spotify_connected = user.spotify_connection is not None
+    spotify_connection = user.spotify_connection.to_dict() if user.spotify_connection else None
+    
+    return {
+        'user': user.to_dict(),
+        'profile': profile_payload(user.profile, 'dashboard'),
+        'social_links': social_links,
+        'music_showcase': showcase_items,
+        'spotify_connected': spotify_connected,
+        'spotify_connection': spotify_connection
+    }
 
 @profiles_bp.route('/<username>', methods=['GET'])
+@use_replica
+@cache_compressed
 def get_public_profile(username):
     """
     Get Public Profile
@@ -63,6 +75,9 @@ def get_public_profile(username):
                   type: string
                 avatar_url:
                   type: string
+                avatar:
+                  type: object
+                  description: Avatar sized for the public profile slot (src, srcset, webp_srcset)
                 theme_settings:
                   type: object
             social_links:
@@ -88,33 +103,19 @@ def get_public_profile(username):
         return jsonify({'error': 'Profile is not public'}), 403
     
     # Get social links
-    social_links = [link.to_dict() for link in user.social_links.order_by(SocialLink.position).all()]
+    social_links = [link.to_dict() for link in user.social_links.order_by(*OrderingService.order_by(SocialLink)).all()]
     
     # Get music showcase
-    showcase_items = [item.to_dict() for item in user.music_showcase.order_by(MusicShowcase.position).all()]
+    showcase_items = [item.to_dict() for item in user.music_showcase.order_by(*OrderingService.order_by(MusicShowcase)).all()]
     
     # Track profile click (with deduplication to prevent React Strict Mode double-tracking)
     try:
-        from datetime import datetime, timedelta
-        
-        # Check for recent click from same IP/user within last 5 seconds (prevents React Strict Mode duplicates)
-        recent_threshold = datetime.utcnow() - timedelta(seconds=5)
-        recent_click = ProfileClick.query.filter(
-            ProfileClick.user_id == user.id,
-            ProfileClick.ip_address == request.remote_addr,
-            ProfileClick.clicked_at >= recent_threshold
-        ).first()
-        
-        # Only track if no recent click exists
-        if not recent_click:
-            click = ProfileClick(
-                user_id=user.id,
-                ip_address=request.remote_addr,
-                user_agent=request.headers.get('User-Agent', ''),
-                referer=request.headers.get('Referer', '')
-            )
-            db.session.add(click)
-            db.session.commit()
+        ClickTrackingService.track(
+            user.id,
+            request.remote_addr,
+            request.headers.get('User-Agent', ''),
+            request.headers.get('Referer', '')
+        )
     except Exception as e:
         # Don't fail the request if tracking fails
         db.session.rollback()
@@ -122,7 +123,7 @@ def get_public_profile(username):
     
     return jsonify({
         'username': user.username,
-        'profile': user.profile.to_dict(),
+        'profile': profile_payload(user.profile, 'public_profile'),
         'social_links': social_links,
         'music_showcase': showcase_items
     }), 200
@@ -176,24 +177,153 @@ def get_my_profile():
         db.session.commit()
         user = User.query.get(current_user_id)  # Refresh
     
-    # Get social links
-    social_links = [link.to_dict() for link in user.social_links.order_by(SocialLink.position).all()]
+    return jsonify(serialize_my_profile(user)), 200
+
+BOOTSTRAP_SECTIONS = ('links', 'showcase', 'spotify', 'analytics_summary')
+
+@profiles_bp.route('/me/bootstrap', methods=['GET'])
+@jwt_required()
+def get_dashboard_bootstrap():
+    """
+    Get Dashboard Bootstrap
+    Load everything the dashboard needs in one request; sections are chosen with `include`.
+    The Spotify section is fetched concurrently with the database queries.
+    ---
+    tags:
+      - Profiles
+    security:
+      - Bearer: []
+    parameters:
+      - in: query
+        name: include
+        type: string
+        required: false
+        default: links,showcase
+        description: Comma-separated sections (links, showcase, spotify, analytics_summary)
+    responses:
+      200:
+        description: Dashboard data retrieved successfully
+        schema:
+          type: object
+          properties:
+            user:
+              type: object
+            profile:
+              type: object
+            spotify_connected:
+              type: boolean
+            spotify_connection:
+              type: object
+            social_links:
+              type: array
+              items:
+                type: object
+            music_showcase:
+              type: array
+              items:
+                type: object
+            spotify_albums:
+              type: object
+              description: Same shape as GET /api/spotify/user-albums, or an error object
+            analytics_summary:
+              type: object
+      400:
+        description: Unknown section requested
+      401:
+        description: Unauthorized
+      404:
+        description: User not found
+    """
+    current_user_id = get_jwt_identity()
+    include = [section.strip() for section in request.args.get('include', 'links,showcase').split(',') if section.strip()]
     
-    # Get music showcase
-    showcase_items = [item.to_dict() for item in user.music_showcase.order_by(MusicShowcase.position).all()]
+    unknown = set(include) - set(BOOTSTRAP_SECTIONS)
+    if unknown:
+        return jsonify({'error': f"Unknown sections: {', '.join(sorted(unknown))}. Allowed: {', '.join(BOOTSTRAP_SECTIONS)}"}), 400
     
-    # Get Spotify connection status and data
-    spotify_connected = user.spotify_connection is not None
-    spotify_connection = user.spotify_connection.to_dict() if user.spotify_connection else None
+    # One query for the user with its one-to-one relations
+    user = User.query.options(
+        joinedload(User.profile),
+        joinedload(User.spotify_connection)
+    ).filter_by(id=current_user_id).first()
     
-    return jsonify({
+    if not user:
+        return jsonify({'error': 'User not found'}), 404
+    
+    # Ensure profile exists
+    if not user.profile:
+        db.session.add(UserProfile(user_id=user.id, display_name=user.username))
+        db.session.commit()
+    
+    connection = user.spotify_connection
+    
+    # Start the Spotify work first so it overlaps with the queries below; a token refresh is an HTTP call too
+    spotify_future = None
+    if 'spotify' in include and connection:
+        spotify_future = SpotifyService.submit(
+            _bootstrap_spotify_albums,
+            current_user_id,
+            connection.artist_id,
+            request.args.get('limit', 50, type=int)
+        )
+    
+    payload = {
         'user': user.to_dict(),
-        'profile': user.profile.to_dict(),
-        'social_links': social_links,
-        'music_showcase': showcase_items,
-        'spotify_connected': spotify_connected,
-        'spotify_connection': spotify_connection
-    }), 200
+        'profile': profile_payload(user.profile, 'dashboard'),
+        'spotify_connected': connection is not None,
+        'spotify_connection': connection.to_dict() if connection else None
+    }
+    
+    if 'links' in include:
+        links = SocialLink.query.filter_by(user_id=current_user_id).order_by(*OrderingService.order_by(SocialLink)).all()
+        payload['social_links'] = [link.to_dict() for link in links]
+    
+    if 'showcase' in include:
+        items = MusicShowcase.query.filter_by(user_id=current_user_id).order_by(*OrderingService.order_by(MusicShowcase)).all()
+        payload['music_showcase'] = [item.to_dict() for item in items]
+    
+    if 'analytics_summary' in include:
+        payload['analytics_summary'] = _analytics_summary(current_user_id)
+    
+    if 'spotify' in include:
+        if not connection:
+            payload['spotify_albums'] = {'error': 'Spotify not connected'}
+        else:
+            try:
+                albums = spotify_future.result(timeout=15)
+            except Exception as e:
+                current_app.logger.error(f'Failed to fetch Spotify albums for bootstrap: {e}')
+                albums = None
+            payload['spotify_albums'] = albums or {'error': 'Failed to fetch albums from Spotify'}
+    
+    return jsonify(payload), 200
+
+def _bootstrap_spotify_albums(user_id, artist_id, limit):
+    """Access token (refreshed if expired) then the albums, as one task on the Spotify pool"""
+    access_token = SpotifyService.get_valid_access_token(user_id)
+    if not access_token:
+        return {'error': 'Failed to get Spotify access token'}
+    return SpotifyService.get_showcase_albums(access_token, artist_id=artist_id, limit=limit)
+
+def _analytics_summary(user_id):
+    """Total, 7-day and 30-day profile click counts in one query"""
+    now = datetime.utcnow()
+    week_ago = now - timedelta(days=7)
+    month_ago = now - timedelta(days=30)
+    
+    row = db.session.query(
+        db.func.count(ProfileClick.id),
+        db.func.sum(db.case((ProfileClick.clicked_at >= week_ago, 1), else_=0)),
+        db.func.sum(db.case((ProfileClick.clicked_at >= month_ago, 1), else_=0)),
+        db.func.max(ProfileClick.clicked_at)
+    ).filter(ProfileClick.user_id == user_id).one()
+    
+    return {
+        'total_clicks': row[0] or 0,
+        'clicks_last_7_days': int(row[1] or 0),
+        'clicks_last_30_days': int(row[2] or 0),
+        'last_click_at': row[3].isoformat() if row[3] else None
+    }
 
 @profiles_bp.route('/me', methods=['PUT'])
 @jwt_required()
@@ -240,11 +370,13 @@ def update_profile():
             profile:
               type: object
       400:
-        description: Invalid input data
+        description: Invalid input data, or an avatar whose content is not an allowed image type
       401:
         description: Unauthorized
       404:
         description: User not found
+      413:
+        description: Avatar larger than 5MB
       500:
         description: Failed to update profile
     """
@@ -265,49 +397,49 @@ def update_profile():
     
     # Handle multipart/form-data (file upload)
     if request.content_type and 'multipart/form-data' in request.content_type:
+        # The avatar streams to a staging file as it is parsed; bad types and sizes stop the upload early
+        try:
+            form, avatar_upload = parse_streaming_form(
+                request,
+                'avatar',
+                current_app.config['UPLOAD_FOLDER'],
+                current_app.config['ALLOWED_EXTENSIONS'],
+                current_app.config['ALLOWED_IMAGE_TYPES'],
+                current_app.config['MAX_CONTENT_LENGTH']
+            )
+        except UploadRejected as e:
+            return jsonify({'error': e.message}), e.status_code
+        except RequestEntityTooLarge:
+            return jsonify({'error': 'File too large (max 5MB)'}), 413
+        except ValueError:
+            return jsonify({'error': 'Invalid multipart body'}), 400
+        
         # Handle file upload
-        if 'avatar' in request.files:
-            avatar_file = request.files['avatar']
-            if avatar_file.filename:
-                # Delete old avatar file if it exists and is a local file
-                if profile.avatar_url and profile.avatar_url.startswith('/api/uploads/'):
-                    old_filename = profile.avatar_url.split('/')[-1]
-                    old_filepath = os.path.join(current_app.config['UPLOAD_FOLDER'], old_filename)
-                    if os.path.exists(old_filepath):
-                        try:
-                            os.remove(old_filepath)
-                        except Exception:
-                            pass  # Ignore errors when deleting old file
-                
-                # Save new avatar
-                avatar_url = save_avatar_file(avatar_file, current_user_id)
-                if avatar_url:
-                    profile.avatar_url = avatar_url
-                else:
-                    return jsonify({'error': 'Invalid file type. Allowed: png, jpg, jpeg, gif, webp'}), 400
+        if avatar_upload:
+            # Resize and re-encode in the process pool; the old avatar's files are collected once this commits
+            try:
+                avatar_url, avatar_variants = AvatarService.process_upload(avatar_upload)
+            except (InvalidImageError, UploadRejected):
+                return jsonify({'error': 'Invalid image file'}), 400
+            except Exception as e:
+                current_app.logger.error(f'Failed to process avatar for user {current_user_id}: {e}')
+                return jsonify({'error': 'Failed to process avatar'}), 500
+            
+            AvatarService.set_avatar(profile, avatar_url, avatar_variants)
         
         # Handle avatar removal
-        if 'remove_avatar' in request.form and request.form['remove_avatar'].lower() in ('true', '1', 'yes'):
-            # Delete old avatar file if it exists and is a local file
-            if profile.avatar_url and profile.avatar_url.startswith('/api/uploads/'):
-                old_filename = profile.avatar_url.split('/')[-1]
-                old_filepath = os.path.join(current_app.config['UPLOAD_FOLDER'], old_filename)
-                if os.path.exists(old_filepath):
-                    try:
-                        os.remove(old_filepath)
-                    except Exception:
-                        pass  # Ignore errors when deleting old file
-            profile.avatar_url = None
+        if 'remove_avatar' in form and form['remove_avatar'].lower() in ('true', '1', 'yes'):
+            AvatarService.set_avatar(profile, None, None)
         
         # Handle other form fields
-        if 'display_name' in request.form:
-            profile.display_name = request.form['display_name'].strip() if request.form['display_name'] else None
+        if 'display_name' in form:
+            profile.display_name = form['display_name'].strip() if form['display_name'] else None
         
-        if 'bio' in request.form:
-            profile.bio = request.form['bio'].strip() if request.form['bio'] else None
+        if 'bio' in form:
+            profile.bio = form['bio'].strip() if form['bio'] else None
         
-        if 'is_public' in request.form:
-            profile.is_public = request.form['is_public'].lower() in ('true', '1', 'yes')
+        if 'is_public' in form:
+            profile.is_public = form['is_public'].lower() in ('true', '1', 'yes')
     
     # Handle JSON data (backward compatibility)
     else:
@@ -331,19 +463,10 @@ def update_profile():
                 if avatar_url.startswith('http://') or avatar_url.startswith('https://'):
                     if not validate_url(avatar_url):
                         return jsonify({'error': 'Invalid avatar URL'}), 400
-                    profile.avatar_url = avatar_url
+                    AvatarService.set_avatar(profile, avatar_url, None)
                 # If it's empty string, clear the avatar
                 elif not avatar_url:
-                    # Delete old file if it's a local file
-                    if profile.avatar_url and profile.avatar_url.startswith('/api/uploads/'):
-                        old_filename = profile.avatar_url.split('/')[-1]
-                        old_filepath = os.path.join(current_app.config['UPLOAD_FOLDER'], old_filename)
-                        if os.path.exists(old_filepath):
-                            try:
-                                os.remove(old_filepath)
-                            except Exception:
-                                pass
-                    profile.avatar_url = None
+                    AvatarService.set_avatar(profile, None, None)
         
         if 'theme_settings' in data:
             if isinstance(data['theme_settings'], dict):
@@ -354,11 +477,250 @@ def update_profile():
     
     try:
         db.session.commit()
+        AvatarService.collect_released()
         return jsonify({
             'message': 'Profile updated successfully',
-            'profile': profile.to_dict()
+            'profile': profile_payload(profile, 'dashboard')
         }), 200
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': 'Failed to update profile', 'details': str(e)}), 500
 
+
+@profiles_bp.route('/me/avatar/uploads', methods=['POST'])
+@jwt_required()
+def start_avatar_upload():
+    """
+    Start Direct Avatar Upload
+    Get a presigned target to send the avatar file to, so its bytes never pass through the API
+    ---
+    tags:
+      - Profiles
+    security:
+      - Bearer: []
+    parameters:
+      - in: body
+        name: body
+        required: true
+        schema:
+          type: object
+          required:
+            - content_type
+            - size
+          properties:
+            content_type:
+              type: string
+              example: image/png
+            size:
+              type: integer
+              description: File size in bytes (max 5MB)
+    responses:
+      201:
+        description: Upload target
+        schema:
+          type: object
+          properties:
+            upload_token:
+              type: string
+              description: Pass to POST /api/profiles/me/avatar once the file is sent
+            method:
+              type: string
+              description: POST (multipart form with `fields` then `file`) or PUT (raw body with `headers`)
+            url:
+              type: string
+            fields:
+              type: object
+            headers:
+              type: object
+            expires_in:
+              type: integer
+      400:
+        description: Invalid content type or size
+      401:
+        description: Unauthorized
+      413:
+        description: File larger than 5MB
+    """
+    current_user_id = get_jwt_identity()
+    data = request.get_json() or {}
+    
+    try:
+        target = AvatarService.create_direct_upload(current_user_id, data.get('content_type'), data.get('size'))
+    except UploadRejected as e:
+        return jsonify({'error': e.message}), e.status_code
+    
+    return jsonify(target), 201
+
+@profiles_bp.route('/me/avatar', methods=['POST'])
+@jwt_required()
+def complete_avatar_upload():
+    """
+    Complete Direct Avatar Upload
+    Process a file sent to the target from POST /api/profiles/me/avatar/uploads and make it the avatar
+    ---
+    tags:
+      - Profiles
+    security:
+      - Bearer: []
+    parameters:
+      - in: body
+        name: body
+        required: true
+        schema:
+          type: object
+          required:
+            - upload_token
+          properties:
+            upload_token:
+              type: string
+    responses:
+      200:
+        description: Avatar updated
+      400:
+        description: Invalid or expired token, or the file is not an allowed image
+      401:
+        description: Unauthorized
+      403:
+        description: Upload started by another user
+      404:
+        description: File was not sent before completing
+      500:
+        description: Failed to process avatar
+    """
+    current_user_id = get_jwt_identity()
+    user = User.query.get(current_user_id)
+    
+    if not user:
+        return jsonify({'error': 'User not found'}), 404
+    
+    data = request.get_json() or {}
+    if not data.get('upload_token'):
+        return jsonify({'error': 'upload_token is required'}), 400
+    
+    try:
+        avatar_url, avatar_variants = AvatarService.complete_direct_upload(current_user_id, data['upload_token'])
+    except UploadRejected as e:
+        return jsonify({'error': e.message}), e.status_code
+    except InvalidImageError:
+        return jsonify({'error': 'Invalid image file'}), 400
+    except Exception as e:
+        current_app.logger.error(f'Failed to process avatar for user {current_user_id}: {e}')
+        return jsonify({'error': 'Failed to process avatar'}), 500
+    
+    if not user.profile:
+        db.session.add(UserProfile(user_id=user.id, display_name=user.username))
+        db.session.flush()
+    
+    try:
+        AvatarService.set_avatar(user.profile, avatar_url, avatar_variants)
+        db.session.commit()
+        AvatarService.collect_released()
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': 'Failed to update profile', 'details': str(e)}), 500
+    
+    return jsonify({
+        'message': 'Avatar updated successfully',
+        'profile': profile_payload(user.profile, 'dashboard')
+    }), 200
+
+@profiles_bp.route('/me/batch', methods=['POST'])
+@jwt_required()
+def batch_update_profile():
+    """
+    Batch Update Profile
+    Apply several dashboard edits (profile fields, social links, showcase items) atomically.
+    All operations are validated before anything is written; either all apply or none do.
+    ---
+    tags:
+      - Profiles
+    security:
+      - Bearer: []
+    parameters:
+      - in: body
+        name: body
+        required: true
+        schema:
+          type: object
+          required:
+            - operations
+          properties:
+            operations:
+              type: array
+              items:
+                type: object
+                required:
+                  - op
+                properties:
+                  op:
+                    type: string
+                    enum: [profile.update, link.add, link.update, link.delete, link.reorder, showcase.delete, showcase.reorder]
+                  id:
+                    type: integer
+                    description: Target id for update and delete operations
+                  ids:
+                    type: array
+                    items:
+                      type: integer
+                    description: Desired order for reorder operations
+                  data:
+                    type: object
+                    description: Fields for profile.update, link.add and link.update
+              example:
+                - op: profile.update
+                  data: {bio: New bio}
+                - op: link.add
+                  data: {platform: Instagram, url: "https://instagram.com/artist"}
+                - op: link.delete
+                  id: 3
+    responses:
+      200:
+        description: Batch applied; returns the resulting profile
+      400:
+        description: Invalid operation (nothing was applied)
+        schema:
+          type: object
+          properties:
+            error:
+              type: string
+            operation_index:
+              type: integer
+      401:
+        description: Unauthorized
+      404:
+        description: User not found
+      500:
+        description: Failed to apply batch
+    """
+    current_user_id = get_jwt_identity()
+    user = User.query.get(current_user_id)
+    
+    if not user:
+        return jsonify({'error': 'User not found'}), 404
+    
+    data = request.get_json()
+    
+    if not data:
+        return jsonify({'error': 'No data provided'}), 400
+    
+    # Ensure profile exists
+    if not user.profile:
+        db.session.add(UserProfile(user_id=user.id, display_name=user.username))
+        db.session.flush()
+    
+    try:
+        plan = ProfileBatchService.validate(current_user_id, data.get('operations'))
+    except BatchValidationError as e:
+        db.session.rollback()
+        return jsonify({'error': e.message, 'operation_index': e.index}), 400
+    
+    try:
+        ProfileBatchService.apply(current_user_id, plan)
+        db.session.commit()
+        AvatarService.collect_released()
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': 'Failed to apply batch', 'details': str(e)}), 500
+    
+    db.session.expire_all()
+    return jsonify(serialize_my_profile(user)), 200
@@ -2,6 +2,7 @@ from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from app import db
 from app.models import SocialLink
+from app.services import OrderingService
 from app.utils import validate_url
 
 social_links_bp = Blueprint('social_links', __name__)
@@ -44,7 +45,7 @@ def get_social_links():
         description: Unauthorized
     """
     current_user_id = get_jwt_identity()
-    links = SocialLink.query.filter_by(user_id=current_user_id).order_by(SocialLink.position).all()
+    links = SocialLink.query.filter_by(user_id=current_user_id).order_by(*OrderingService.order_by(SocialLink)).all()
     
     return jsonify({
         'links': [link.to_dict() for link in links]
@@ -115,16 +116,13 @@ def add_social_link():
     if not url or not validate_url(url):
         return jsonify({'error': 'Valid URL is required'}), 400
     
-    # Get current max position
-    max_position = db.session.query(db.func.max(SocialLink.position)).filter_by(user_id=current_user_id).scalar() or -1
-    
-    # Create link
+    # Create link (appended after the current last position, computed inside the INSERT)
     link = SocialLink(
         user_id=current_user_id,
         platform=platform,
         url=url,
         display_text=display_text or platform,
-        position=max_position + 1
+        position=OrderingService.next_position(SocialLink, current_user_id)
     )
     
     try:
@@ -319,23 +317,84 @@ def reorder_social_links():
     if not isinstance(link_ids, list):
         return jsonify({'error': 'link_ids must be an array'}), 400
     
-    # Verify all links belong to user
-    links = SocialLink.query.filter(
-        SocialLink.id.in_(link_ids),
-        SocialLink.user_id == current_user_id
-    ).all()
-    
-    if len(links) != len(link_ids):
-        return jsonify({'error': 'Some links not found or do not belong to user'}), 400
+    if len(set(link_ids)) != len(link_ids) or not all(isinstance(link_id, int) for link_id in link_ids):
+        return jsonify({'error': 'link_ids must be unique integers'}), 400
     
-    # Update positions
+    # Update positions in one statement; the user_id filter doubles as the ownership check
     try:
-        for index, link_id in enumerate(link_ids):
-            link = next(l for l in links if l.id == link_id)
-            link.position = index
+        updated = OrderingService.reorder(SocialLink, current_user_id, link_ids)
+        
+        if updated != len(link_ids):
+            db.session.rollback()
+            return jsonify({'error': 'Some links not found or do not belong to user'}), 400
         
         db.session.commit()
         return jsonify({'message': 'Links reordered successfully'}), 200
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': 'Failed to reorder links', 'details': str(e)}), 500
+
+@social_links_bp.route('/<int:link_id>/move', methods=['PUT'])
+@jwt_required()
+def move_social_link(link_id):
+    """
+    Move Social Link
+    Move a single social link directly before or after another link
+    ---
+    tags:
+      - Social Links
+    security:
+      - Bearer: []
+    parameters:
+      - in: path
+        name: link_id
+        type: integer
+        required: true
+        description: ID of the social link to move
+      - in: body
+        name: body
+        required: true
+        schema:
+          type: object
+          properties:
+            before_id:
+              type: integer
+              description: Place the link directly before this link
+            after_id:
+              type: integer
+              description: Place the link directly after this link
+    responses:
+      200:
+        description: Link moved successfully
+        schema:
+          type: object
+          properties:
+            message:
+              type: string
+      400:
+        description: Invalid input data
+      401:
+        description: Unauthorized
+      404:
+        description: Link not found
+      500:
+        description: Failed to move link
+    """
+    current_user_id = get_jwt_identity()
+    data = request.get_json()
+    
+    before_id = data.get('before_id') if data else None
+    after_id = data.get('after_id') if data else None
+    
+    if (before_id is None) == (after_id is None):
+        return jsonify({'error': 'Exactly one of before_id or after_id is required'}), 400
+    
+    try:
+        if not OrderingService.move(SocialLink, current_user_id, link_id, before_id=before_id, after_id=after_id):
+            return jsonify({'error': 'Link not found'}), 404
+        
+        db.session.commit()
+        return jsonify({'message': 'Link moved successfully'}), 200
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': 'Failed to move link', 'details': str(e)}), 500
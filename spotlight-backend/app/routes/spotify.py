@@ -1,8 +1,10 @@
+import asyncio
+from asgiref.sync import sync_to_async
 from flask import Blueprint, request, jsonify, current_app
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from app import db
 from app.models import User, SpotifyConnection
-from app.services import SpotifyService
+from app.services import SpotifyService, AsyncSpotifyService
 from datetime import datetime, timedelta
 
 spotify_bp = Blueprint('spotify', __name__)
@@ -45,7 +47,7 @@ def get_auth_url():
 
 @spotify_bp.route('/callback', methods=['POST'])
 @jwt_required()
-def handle_callback():
+async def handle_callback():
     """
     Handle Spotify OAuth Callback
     Exchange authorization code for access tokens and save connection
@@ -102,15 +104,18 @@ def handle_callback():
     
     code = data.get('code')
     
-    # Exchange code for tokens
-    token_data = SpotifyService.exchange_code_for_tokens(code)
+    # The existing connection is loaded on the request thread while the code is exchanged
+    token_data, connection = await asyncio.gather(
+        AsyncSpotifyService.exchange_code_for_tokens(code),
+        sync_to_async(SpotifyConnection.query.filter_by(user_id=current_user_id).first)()
+    )
     
     if not token_data:
         return jsonify({'error': 'Failed to exchange authorization code'}), 400
     
     # Get user info from Spotify
     access_token = token_data['access_token']
-    user_info = SpotifyService.get_user_info(access_token)
+    user_info = await AsyncSpotifyService.get_user_info(access_token)
     
     if not user_info:
         return jsonify({'error': 'Failed to get user info from Spotify'}), 400
@@ -119,35 +124,36 @@ def handle_callback():
     expires_in = token_data.get('expires_in', 3600)
     expires_at = datetime.utcnow() + timedelta(seconds=expires_in)
     
-    # Save or update connection
-    connection = SpotifyConnection.query.filter_by(user_id=current_user_id).first()
-    
-    if connection:
-        connection.spotify_user_id = user_info['id']
-        connection.access_token = token_data['access_token']
-        connection.refresh_token = token_data['refresh_token']
-        connection.token_expires_at = expires_at
-        # Preserve existing artist_id if it exists
-        connection.updated_at = datetime.utcnow()
-    else:
-        connection = SpotifyConnection(
-            user_id=current_user_id,
-            spotify_user_id=user_info['id'],
-            access_token=token_data['access_token'],
-            refresh_token=token_data['refresh_token'],
-            token_expires_at=expires_at
-        )
-        db.session.add(connection)
-    
-    try:
-        db.session.commit()
-        return jsonify({
-            'message': 'Spotify connected successfully',
-            'connection': connection.to_dict()
-        }), 200
-    except Exception as e:
-        db.session.rollback()
-        return jsonify({'error': 'Failed to save connection', 'details': str(e)}), 500
+    def save_connection(connection):
+        # Save or update connection
+        if connection:
+            connection.spotify_user_id = user_info['id']
+            connection.access_token = token_data['access_token']
+            connection.refresh_token = token_data['refresh_token']
+            connection.token_expires_at = expires_at
+            # Preserve existing artist_id if it exists
+            connection.updated_at = datetime.utcnow()
+        else:
+            connection = SpotifyConnection(
+                user_id=current_user_id,
+                spotify_user_id=user_info['id'],
+                access_token=token_data['access_token'],
+                refresh_token=token_data['refresh_token'],
+                token_expires_at=expires_at
+            )
+            db.session.add(connection)
+        
+        try:
+            db.session.commit()
+            return jsonify({
+                'message': 'Spotify connected successfully',
+                'connection': connection.to_dict()
+            }), 200
+        except Exception as e:
+            db.session.rollback()
+            return jsonify({'error': 'Failed to save connection', 'details': str(e)}), 500
+    
+    return await sync_to_async(save_connection)(connection)
 
 @spotify_bp.route('/artist-id', methods=['PUT'])
 @jwt_required()
@@ -276,7 +282,7 @@ def disconnect_artist_id():
 
 @spotify_bp.route('/search-artist', methods=['GET'])
 @jwt_required()
-def search_artist():
+async def search_artist():
     """
     Search for Artists
     Search for artists by name to help users find their artist ID
@@ -325,7 +331,7 @@ def search_artist():
     current_user_id = get_jwt_identity()
     
     # Get valid access token
-    access_token = SpotifyService.get_valid_access_token(current_user_id)
+    access_token = await AsyncSpotifyService.get_valid_access_token(current_user_id)
     
     if not access_token:
         return jsonify({'error': 'Spotify not connected. Please connect your Spotify account first.'}), 401
@@ -338,7 +344,7 @@ def search_artist():
         return jsonify({'error': 'Search query (q) is required'}), 400
     
     # Search for artists using service
-    artists_data = SpotifyService.search_artists(access_token, query, limit=limit)
+    artists_data = await AsyncSpotifyService.search_artists(access_token, query, limit=limit)
     
     if not artists_data:
         return jsonify({'error': 'Failed to search for artists'}), 500
@@ -357,14 +363,14 @@ def search_artist():
             'popularity': artist.get('popularity')
         })
     
-        return jsonify({
-            'artists': formatted_artists,
-            'total': artists_data.get('total', 0)
-        }), 200
+    return jsonify({
+        'artists': formatted_artists,
+        'total': artists_data.get('total', 0)
+    }), 200
 
 @spotify_bp.route('/search-albums', methods=['GET'])
 @jwt_required()
-def search_albums():
+async def search_albums():
     """
     Search for Albums
     Search for albums by title across all of Spotify
@@ -429,7 +435,7 @@ def search_albums():
     current_user_id = get_jwt_identity()
     
     # Get valid access token
-    access_token = SpotifyService.get_valid_access_token(current_user_id)
+    access_token = await AsyncSpotifyService.get_valid_access_token(current_user_id)
     
     if not access_token:
         return jsonify({'error': 'Spotify not connected. Please connect your Spotify account first.'}), 401
@@ -443,7 +449,7 @@ def search_albums():
         return jsonify({'error': 'Search query (q) is required'}), 400
     
     # Search for albums using service
-    albums_data = SpotifyService.search_albums(access_token, query, limit=limit, offset=offset)
+    albums_data = await AsyncSpotifyService.search_albums(access_token, query, limit=limit, offset=offset)
     
     if not albums_data:
         return jsonify({'error': 'Failed to search for albums'}), 500
@@ -490,7 +496,7 @@ def search_albums():
 
 @spotify_bp.route('/user-albums', methods=['GET'])
 @jwt_required()
-def get_user_albums():
+async def get_user_albums():
     """
     Get User's Spotify Albums
     Retrieve user's saved albums, singles, and EPs from Spotify
@@ -554,112 +560,32 @@ def get_user_albums():
     current_user_id = get_jwt_identity()
     
     # Get valid access token
-    access_token = SpotifyService.get_valid_access_token(current_user_id)
+    access_token = await AsyncSpotifyService.get_valid_access_token(current_user_id)
     
     if not access_token:
         return jsonify({'error': 'Spotify not connected. Please connect your Spotify account first.'}), 401
     
     # Get connection to check for artist_id
-    connection = SpotifyConnection.query.filter_by(user_id=current_user_id).first()
+    connection = await sync_to_async(SpotifyConnection.query.filter_by(user_id=current_user_id).first)()
     
     # Get query parameters
     limit = request.args.get('limit', 50, type=int)
     offset = request.args.get('offset', 0, type=int)
     
     # Fetch albums from Spotify - use artist albums if artist_id is available
-    if connection and connection.artist_id:
-        albums_data = SpotifyService.get_artist_albums(access_token, connection.artist_id, limit=limit, offset=offset)
-        
-        if not albums_data:
+    artist_id = connection.artist_id if connection else None
+    albums = await AsyncSpotifyService.get_showcase_albums(access_token, artist_id=artist_id, limit=limit, offset=offset)
+    
+    if not albums:
+        if artist_id:
             return jsonify({'error': 'Failed to fetch artist albums from Spotify'}), 500
-        
-        # Format response for artist albums (different structure)
-        items = []
-        for album in albums_data.get('items', []):
-            # Determine item type
-            album_type = album.get('album_type', 'album')
-            if album_type == 'single':
-                item_type = 'single'
-            elif album_type == 'ep':
-                item_type = 'ep'
-            else:
-                item_type = 'album'
-            
-            # Get artist names
-            artists = album.get('artists', [])
-            artist_names = ', '.join([artist.get('name', '') for artist in artists])
-            
-            # Get images
-            images = album.get('images', [])
-            image_url = images[0].get('url', '') if images else None
-            
-            items.append({
-                'spotify_id': album.get('id'),
-                'item_type': item_type,
-                'item_name': album.get('name', ''),
-                'artist_names': artist_names,
-                'image_url': image_url,
-                'spotify_url': album.get('external_urls', {}).get('spotify', ''),
-                'release_date': album.get('release_date', ''),
-                'total_tracks': album.get('total_tracks', 0)
-            })
-        
-        return jsonify({
-            'items': items,
-            'total': albums_data.get('total', 0),
-            'limit': limit,
-            'offset': offset
-        }), 200
-    else:
-        # Fall back to user's saved albums
-        albums_data = SpotifyService.get_user_albums(access_token, limit=limit, offset=offset)
-        
-        if not albums_data:
-            return jsonify({'error': 'Failed to fetch albums from Spotify'}), 500
-        
-        # Format response for saved albums
-        items = []
-        for item in albums_data.get('items', []):
-            album = item.get('album', {})
-            
-            # Determine item type
-            album_type = album.get('album_type', 'album')
-            if album_type == 'single':
-                item_type = 'single'
-            elif album_type == 'ep':
-                item_type = 'ep'
-            else:
-                item_type = 'album'
-            
-            # Get artist names
-            artists = album.get('artists', [])
-            artist_names = ', '.join([artist.get('name', '') for artist in artists])
-            
-            # Get images
-            images = album.get('images', [])
-            image_url = images[0].get('url', '') if images else None
-            
-            items.append({
-                'spotify_id': album.get('id'),
-                'item_type': item_type,
-                'item_name': album.get('name', ''),
-                'artist_names': artist_names,
-                'image_url': image_url,
-                'spotify_url': album.get('external_urls', {}).get('spotify', ''),
-                'release_date': album.get('release_date', ''),
-                'total_tracks': album.get('total_tracks', 0)
-            })
-        
-        return jsonify({
-            'items': items,
-            'total': albums_data.get('total', 0),
-            'limit': limit,
-            'offset': offset
-        }), 200
+        return jsonify({'error': 'Failed to fetch albums from Spotify'}), 500
+    
+    return jsonify(albums), 200
 
 @spotify_bp.route('/album/<album_id>', methods=['GET'])
 @jwt_required()
-def get_album_details(album_id):
+async def get_album_details(album_id):
     """
     Get Album Details
     Retrieve detailed information about a specific Spotify album
@@ -709,13 +635,13 @@ def get_album_details(album_id):
     current_user_id = get_jwt_identity()
     
     # Get valid access token
-    access_token = SpotifyService.get_valid_access_token(current_user_id)
+    access_token = await AsyncSpotifyService.get_valid_access_token(current_user_id)
     
     if not access_token:
         return jsonify({'error': 'Spotify not connected'}), 401
     
     # Fetch album details
-    album_data = SpotifyService.get_album_details(access_token, album_id)
+    album_data = await AsyncSpotifyService.get_album_details(access_token, album_id)
     
     if not album_data:
         return jsonify({'error': 'Failed to fetch album details'}), 404
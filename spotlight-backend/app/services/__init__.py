@@ -1,4 +1,20 @@
 from app.services.spotify_service import SpotifyService
+from app.services.async_spotify_service import AsyncSpotifyService
+from app.services.export_service import ExportService
+from app.services.user_deletion_service import UserDeletionService
+from app.services.ordering_service import OrderingService
+from app.services.profile_batch_service import ProfileBatchService, BatchValidationError
+from app.services.click_tracking_service import ClickTrackingService
+from app.services.avatar_service import AvatarService
 
-__all__ = ['SpotifyService']
-
+__all__ = [
+    'SpotifyService',
+    'AsyncSpotifyService',
+    'ExportService',
+    'UserDeletionService',
+    'OrderingService',
+    'ProfileBatchService',
+    'BatchValidationError',
+    'ClickTrackingService',
+    'AvatarService'
+]
@@ -0,0 +1,225 @@
+import asyncio
+import base64
+import weakref
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
+import httpx
+from asgiref.sync import sync_to_async
+from flask import current_app
+from app import db
+from app.models import SpotifyConnection
+from app.services.spotify_service import SpotifyService
+from app.utils.metrics import record_spotify_status, track_spotify_call
+from app.utils.tracing import traced
+
+# Event loop -> shared client; only asgi.py's server loop has one
+_clients = weakref.WeakKeyDictionary()
+
+# Loading the CA bundle takes tens of milliseconds, too slow to repeat for every per-call client
+_ssl_context = None
+
+class AsyncSpotifyService:
+    """Async counterpart of SpotifyService for async views
+
+    Under asgi.py, async views run on the server's event loop and share one pooled, keep-alive
+    client opened at startup. Under WSGI servers Flask runs each async view on a short-lived
+    loop of its own, so calls there get a client per call, like SpotifyService's requests calls.
+    Database work stays synchronous and is run back on the request's thread with sync_to_async.
+    """
+
+    @staticmethod
+    def _ssl_context():
+        global _ssl_context
+        if _ssl_context is None:
+            _ssl_context = httpx.create_ssl_context()
+        return _ssl_context
+
+    @staticmethod
+    def _limits(config):
+        return httpx.Limits(
+            max_connections=config['SPOTIFY_HTTP_MAX_CONNECTIONS'],
+            max_keepalive_connections=config['SPOTIFY_HTTP_MAX_CONNECTIONS']
+        )
+
+    @staticmethod
+    async def open_client(config):
+        """Create the shared client for the running loop (ASGI startup)"""
+        loop = asyncio.get_running_loop()
+        if loop not in _clients:
+            _clients[loop] = httpx.AsyncClient(
+                timeout=config['SPOTIFY_HTTP_TIMEOUT'],
+                limits=AsyncSpotifyService._limits(config),
+                verify=AsyncSpotifyService._ssl_context()
+            )
+
+    @staticmethod
+    async def close_client():
+        """Close the running loop's shared client (ASGI shutdown)"""
+        client = _clients.pop(asyncio.get_running_loop(), None)
+        if client is not None:
+            await client.aclose()
+
+    @staticmethod
+    @asynccontextmanager
+    async def _client():
+        client = _clients.get(asyncio.get_running_loop())
+        if client is not None:
+            yield client
+            return
+        async with httpx.AsyncClient(timeout=current_app.config['SPOTIFY_HTTP_TIMEOUT'], verify=AsyncSpotifyService._ssl_context()) as client:
+            yield client
+
+    @staticmethod
+    async def _get(access_token, path, params=None):
+        async with AsyncSpotifyService._client() as client:
+            response = await client.get(
+                f"{current_app.config['SPOTIFY_API_BASE_URL']}{path}",
+                headers={'Authorization': f'Bearer {access_token}'},
+                params=params
+            )
+
+        record_spotify_status(response.status_code)
+        if response.status_code != 200:
+            return None
+
+        return response.json()
+
+    @staticmethod
+    async def _token_request(data):
+        credentials = f"{current_app.config['SPOTIFY_CLIENT_ID']}:{current_app.config['SPOTIFY_CLIENT_SECRET']}"
+        encoded_credentials = base64.b64encode(credentials.encode()).decode()
+
+        async with AsyncSpotifyService._client() as client:
+            response = await client.post(
+                current_app.config['SPOTIFY_TOKEN_URL'],
+                headers={'Authorization': f'Basic {encoded_credentials}'},
+                data=data
+            )
+
+        record_spotify_status(response.status_code)
+        if response.status_code != 200:
+            return None
+
+        return response.json()
+
+    @staticmethod
+    @track_spotify_call
+    async def exchange_code_for_tokens(code):
+        """Exchange authorization code for access and refresh tokens"""
+        return await AsyncSpotifyService._token_request({
+            'grant_type': 'authorization_code',
+            'code': code,
+            'redirect_uri': current_app.config['SPOTIFY_REDIRECT_URI']
+        })
+
+    @staticmethod
+    @track_spotify_call
+    async def refresh_access_token(refresh_token):
+        """Refresh Spotify access token"""
+        return await AsyncSpotifyService._token_request({
+            'grant_type': 'refresh_token',
+            'refresh_token': refresh_token
+        })
+
+    @staticmethod
+    @track_spotify_call
+    async def get_user_info(access_token):
+        """Get Spotify user information"""
+        return await AsyncSpotifyService._get(access_token, '/me')
+
+    @staticmethod
+    @track_spotify_call
+    async def search_artists(access_token, query, limit=10):
+        """Search for artists by name - returns list of artists"""
+        data = await AsyncSpotifyService._get(access_token, '/search', {'q': query, 'type': 'artist', 'limit': limit})
+        return data.get('artists', {}) if data is not None else None
+
+    @staticmethod
+    @track_spotify_call
+    async def search_albums(access_token, query, limit=50, offset=0):
+        """Search for albums by name - returns list of albums"""
+        data = await AsyncSpotifyService._get(
+            access_token, '/search', {'q': query, 'type': 'album', 'limit': limit, 'offset': offset}
+        )
+        return data.get('albums', {}) if data is not None else None
+
+    @staticmethod
+    @track_spotify_call
+    async def get_artist_albums(access_token, artist_id, limit=50, offset=0):
+        """Get albums by a specific artist"""
+        return await AsyncSpotifyService._get(
+            access_token, f'/artists/{artist_id}/albums',
+            {'limit': limit, 'offset': offset, 'include_groups': 'album,single,ep'}
+        )
+
+    @staticmethod
+    @track_spotify_call
+    async def get_user_albums(access_token, limit=50, offset=0):
+        """Get user's saved albums"""
+        return await AsyncSpotifyService._get(access_token, '/me/albums', {'limit': limit, 'offset': offset})
+
+    @staticmethod
+    @track_spotify_call
+    async def get_album_details(access_token, album_id):
+        """Get detailed album information"""
+        return await AsyncSpotifyService._get(access_token, f'/albums/{album_id}')
+
+    @staticmethod
+    def _load_token(user_id):
+        connection = SpotifyConnection.query.filter_by(user_id=user_id).first()
+        if not connection:
+            return None
+        return connection.access_token, connection.refresh_token, connection.is_token_expired()
+
+    @staticmethod
+    def _save_refreshed_token(user_id, token_data):
+        connection = SpotifyConnection.query.filter_by(user_id=user_id).first()
+        connection.access_token = token_data['access_token']
+        if 'refresh_token' in token_data:
+            connection.refresh_token = token_data['refresh_token']
+
+        expires_in = token_data.get('expires_in', 3600)
+        connection.token_expires_at = datetime.utcnow() + timedelta(seconds=expires_in)
+
+        db.session.commit()
+
+    @staticmethod
+    @traced('spotify.get_valid_access_token')
+    async def get_valid_access_token(user_id):
+        """Get valid access token for user, refreshing if necessary"""
+        token = await sync_to_async(AsyncSpotifyService._load_token)(user_id)
+
+        if not token:
+            return None
+
+        access_token, refresh_token, expired = token
+        if not expired:
+            return access_token
+
+        token_data = await AsyncSpotifyService.refresh_access_token(refresh_token)
+
+        if not token_data:
+            return None
+
+        await sync_to_async(AsyncSpotifyService._save_refreshed_token)(user_id, token_data)
+        return token_data['access_token']
+
+    @staticmethod
+    async def get_showcase_albums(access_token, artist_id=None, limit=50, offset=0):
+        """Albums a user can showcase: the artist's discography if linked, otherwise saved albums"""
+        if artist_id:
+            albums_data = await AsyncSpotifyService.get_artist_albums(access_token, artist_id, limit=limit, offset=offset)
+            albums = albums_data.get('items', []) if albums_data else None
+        else:
+            albums_data = await AsyncSpotifyService.get_user_albums(access_token, limit=limit, offset=offset)
+            albums = [item.get('album', {}) for item in albums_data.get('items', [])] if albums_data else None
+
+        if albums is None:
+            return None
+
+        return {
+            'items': [SpotifyService.format_album(album) for album in albums],
+            'total': albums_data.get('total', 0),
+            'limit': limit,
+            'offset': offset
+        }
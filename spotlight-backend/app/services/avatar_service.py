@@ -0,0 +1,391 @@
+import hashlib
+import mimetypes
+import multiprocessing
+import os
+import re
+import shutil
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+from flask import current_app, redirect, request, send_from_directory
+from itsdangerous import BadData, URLSafeTimedSerializer
+from sqlalchemy import delete, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from werkzeug.exceptions import NotFound
+from werkzeug.utils import safe_join
+from app import db
+from app.models import AvatarFile
+from app.utils.images import render_avatar_variants
+from app.utils.storage import CHUNK_SIZE, load_storage
+from app.utils.uploads import StagedUpload, UploadRejected
+
+AVATAR_URL_PREFIX = '/api/uploads/avatars/'
+
+# Content types a direct upload may declare, by the image type they stand for
+DIRECT_UPLOAD_TYPES = {'image/png': 'png', 'image/jpeg': 'jpeg', 'image/gif': 'gif', 'image/webp': 'webp'}
+
+# Content-addressed files are named after the SHA-256 of their bytes
+CONTENT_HASH_FILENAME = re.compile(r'^([0-9a-f]{32})\.(?:webp|jpg|png)$')
+
+class AvatarService:
+    """Uploaded avatars, normalized into resized WebP and fallback variants in a process pool
+
+    Decoding and resizing a 5MB image is CPU-bound, so it runs in separate processes that
+    don't hold the request threads' GIL. Variants are stored on UserProfile.avatar_variants
+    as {size: {'webp': url, 'fallback': url}}; avatar_url keeps the largest fallback for
+    clients that only know that field.
+
+    Files are named after a hash of their content, so identical uploads share files and a
+    name never changes meaning, which lets them be cached forever. AvatarFile counts the
+    profiles that reference each file; files whose count drops to zero are garbage collected.
+    """
+
+    _pool = None
+    _pool_pid = None
+    _pool_lock = threading.Lock()
+
+    @staticmethod
+    def _get_pool():
+        with AvatarService._pool_lock:
+            if AvatarService._pool is None or AvatarService._pool_pid != os.getpid():
+                # Spawned, not forked: a fork of a threaded server can copy locks held by other threads
+                AvatarService._pool = ProcessPoolExecutor(
+                    max_workers=current_app.config['AVATAR_PROCESS_WORKERS'],
+                    mp_context=multiprocessing.get_context('spawn')
+                )
+                AvatarService._pool_pid = os.getpid()
+            return AvatarService._pool
+
+    @staticmethod
+    def process_upload(upload):
+        """Render and store the variants of a StagedUpload, then delete it; returns (avatar_url, variants)
+
+        Raises InvalidImageError when the upload is not a decodable image. The worker reads the
+        staged file itself, so the upload is never copied through the pool's pipe.
+        """
+        config = current_app.config
+        try:
+            future = AvatarService._get_pool().submit(
+                render_avatar_variants,
+                upload.finish(),
+                config['AVATAR_SIZES'],
+                config['AVATAR_WEBP_QUALITY'],
+                config['AVATAR_FALLBACK_QUALITY'],
+                config['AVATAR_MAX_PIXELS']
+            )
+            rendered = future.result(timeout=config['AVATAR_PROCESS_TIMEOUT'])
+        except BrokenProcessPool:
+            # A worker died (e.g. killed for memory); start a fresh pool for the next upload
+            with AvatarService._pool_lock:
+                AvatarService._pool = None
+            raise
+        finally:
+            upload.discard()
+
+        storage = AvatarService.storage()
+        variants = {}
+        for size, images in rendered.items():
+            fallback_ext = 'png' if images['fallback_format'] == 'png' else 'jpg'
+            urls = {}
+            for kind, ext in (('webp', 'webp'), ('fallback', fallback_ext)):
+                filename = f"{hashlib.sha256(images[kind]).hexdigest()[:32]}.{ext}"
+                # Already stored by an identical upload; a fresh modified time keeps the collector off it
+                if not storage.touch(filename):
+                    storage.put(filename, images[kind], mimetypes.guess_type(filename)[0])
+                urls[kind] = AVATAR_URL_PREFIX + filename
+            variants[str(size)] = urls
+
+        largest = variants[str(max(rendered))]
+        return largest['fallback'], variants
+
+    @staticmethod
+    def storage():
+        """The app's AvatarStorage (AVATAR_STORAGE), created on first use"""
+        extensions = current_app.extensions
+        if 'avatar_storage' not in extensions:
+            extensions['avatar_storage'] = load_storage(current_app.config)
+        return extensions['avatar_storage']
+
+    @staticmethod
+    def _serializer():
+        return URLSafeTimedSerializer(current_app.config['SECRET_KEY'], salt='avatar-direct-upload')
+
+    @staticmethod
+    def create_direct_upload(user_id, content_type, size):
+        """Start a direct upload: where the client sends the file, and the token to complete it with
+
+        Storage with presigned URLs (S3) takes the bytes itself; local storage gets them through
+        PUT /api/uploads/incoming/<token>. Raises UploadRejected for a disallowed type or size.
+        """
+        config = current_app.config
+        if content_type not in DIRECT_UPLOAD_TYPES or DIRECT_UPLOAD_TYPES[content_type] not in config['ALLOWED_IMAGE_TYPES']:
+            raise UploadRejected('Invalid file type. Allowed: png, jpg, jpeg, gif, webp')
+        if not isinstance(size, int) or size <= 0:
+            raise UploadRejected('size must be a positive integer')
+        if size > config['MAX_CONTENT_LENGTH']:
+            raise UploadRejected('File too large (max 5MB)', 413)
+
+        upload_id = uuid.uuid4().hex
+        token = AvatarService._serializer().dumps({'id': upload_id, 'user': str(user_id), 'type': content_type})
+        expires_in = config['AVATAR_UPLOAD_URL_EXPIRES']
+        target = AvatarService.storage().presign_upload(upload_id, content_type, config['MAX_CONTENT_LENGTH'], expires_in)
+        if target is None:
+            target = {'method': 'PUT', 'url': f'/api/uploads/incoming/{token}', 'headers': {'Content-Type': content_type}}
+        return {'upload_token': token, 'expires_in': expires_in, **target}
+
+    @staticmethod
+    def _load_token(token, max_age):
+        try:
+            return AvatarService._serializer().loads(token, max_age=max_age)
+        except BadData:
+            raise UploadRejected('Invalid or expired upload token')
+
+    @staticmethod
+    def _staged_upload():
+        config = current_app.config
+        return StagedUpload(config['UPLOAD_FOLDER'], None, config['ALLOWED_IMAGE_TYPES'], config['MAX_CONTENT_LENGTH'])
+
+    @staticmethod
+    def receive_direct_upload(token, stream):
+        """Store the body of PUT /api/uploads/incoming/<token> as the pending upload (local storage only)"""
+        if not AvatarService.storage().receives_uploads:
+            raise NotFound()
+        payload = AvatarService._load_token(token, current_app.config['AVATAR_UPLOAD_URL_EXPIRES'])
+        upload = AvatarService._staged_upload()
+        try:
+            shutil.copyfileobj(stream, upload, CHUNK_SIZE)
+            AvatarService.storage().receive_upload(payload['id'], upload.finish())
+        finally:
+            upload.discard()
+
+    @staticmethod
+    def complete_direct_upload(user_id, token):
+        """Process a finished direct upload; returns (avatar_url, variants) like process_upload
+
+        The upload is streamed back from storage through a StagedUpload, so its size and magic
+        bytes are checked again whatever the client claimed when it started.
+        """
+        payload = AvatarService._load_token(token, current_app.config['AVATAR_UPLOAD_URL_EXPIRES'] * 2)
+        if payload['user'] != str(user_id):
+            raise UploadRejected('Upload belongs to another user', 403)
+
+        storage = AvatarService.storage()
+        upload = AvatarService._staged_upload()
+        try:
+            storage.read_upload(payload['id'], upload)
+        except FileNotFoundError:
+            upload.discard()
+            raise UploadRejected('Upload not found; send the file before completing it', 404)
+        except BaseException:
+            upload.discard()
+            raise
+        finally:
+            storage.delete_upload(payload['id'])
+        return AvatarService.process_upload(upload)
+
+    @staticmethod
+    def filenames(avatar_url, variants):
+        """Names of the uploaded files an avatar references; external URLs have none"""
+        urls = {avatar_url}
+        for urls_by_kind in (variants or {}).values():
+            urls.update(urls_by_kind.values())
+        return {url[len(AVATAR_URL_PREFIX):] for url in urls if url and url.startswith(AVATAR_URL_PREFIX)}
+
+    @staticmethod
+    def set_avatar(profile, avatar_url, variants):
+        """Point a profile at a new avatar, moving file references in the caller's transaction
+
+        The released files are remembered on the session for collect_released() after commit.
+        """
+        old = AvatarService.filenames(profile.avatar_url, profile.avatar_variants)
+        new = AvatarService.filenames(avatar_url, variants)
+        AvatarService.retain(new - old)
+        AvatarService.release(old - new)
+        profile.avatar_url = avatar_url
+        profile.avatar_variants = variants
+
+    @staticmethod
+    def retain(filenames):
+        """Add one reference to each file, creating its row on first use"""
+        if not filenames:
+            return
+        insert = postgresql.insert if db.engine.dialect.name == 'postgresql' else sqlite.insert
+        now = datetime.utcnow()
+        stmt = insert(AvatarFile).values([
+            {'filename': filename, 'ref_count': 1, 'updated_at': now}
+            for filename in sorted(filenames)
+        ])
+        db.session.execute(stmt.on_conflict_do_update(
+            index_elements=[AvatarFile.filename],
+            set_={'ref_count': AvatarFile.ref_count + 1, 'updated_at': now}
+        ))
+
+    @staticmethod
+    def release(filenames):
+        """Drop one reference from each file; the files go at the next collection after commit"""
+        if not filenames:
+            return
+        db.session.execute(
+            update(AvatarFile)
+            .where(AvatarFile.filename.in_(sorted(filenames)))
+            .values(ref_count=AvatarFile.ref_count - 1, updated_at=datetime.utcnow())
+            .execution_options(synchronize_session=False)
+        )
+        db.session.info.setdefault('released_avatar_files', set()).update(filenames)
+
+    @staticmethod
+    def collect_released():
+        """Collect the files released in this session; call after commit"""
+        released = db.session.info.pop('released_avatar_files', None)
+        if released:
+            try:
+                AvatarService.collect_garbage(released)
+            except Exception as e:
+                db.session.rollback()
+                current_app.logger.warning(f'Avatar garbage collection failed: {e}')
+
+    @staticmethod
+    def collect_garbage(filenames=None, sweep_orphans=False):
+        """Delete unreferenced avatar files; returns the names removed from storage
+
+        Rows at zero references (among `filenames`, or all of them) are deleted, then their files,
+        unless a file was touched within AVATAR_GC_GRACE_SECONDS: that is an identical upload in
+        progress, which re-creates the row when it commits. With sweep_orphans, files that have
+        no row at all (uploads whose transaction failed) are removed once past the grace period,
+        as are abandoned direct uploads and staging files.
+        """
+        config = current_app.config
+        storage = AvatarService.storage()
+        now = time.time()
+        cutoff = now - config['AVATAR_GC_GRACE_SECONDS']
+
+        stmt = select(AvatarFile.filename).where(AvatarFile.ref_count <= 0)
+        if filenames is not None:
+            stmt = stmt.where(AvatarFile.filename.in_(sorted(filenames)))
+        candidates = set(db.session.execute(stmt).scalars())
+        if candidates:
+            db.session.execute(
+                delete(AvatarFile)
+                .where(AvatarFile.filename.in_(sorted(candidates)), AvatarFile.ref_count <= 0)
+                .execution_options(synchronize_session=False)
+            )
+            db.session.commit()
+            # Referenced again between the select and the delete
+            candidates -= set(db.session.execute(
+                select(AvatarFile.filename).where(AvatarFile.filename.in_(sorted(candidates)))
+            ).scalars())
+
+        if sweep_orphans:
+            stored = set(name for name, _ in storage.list())
+            known = set(db.session.execute(select(AvatarFile.filename)).scalars())
+            candidates |= stored - known
+
+            # Direct uploads never completed, and staging files left by crashed requests
+            upload_cutoff = cutoff - config['AVATAR_UPLOAD_URL_EXPIRES'] * 2
+            for upload_id, modified_at in list(storage.list_uploads()):
+                if modified_at < upload_cutoff:
+                    storage.delete_upload(upload_id)
+            staging_folder = config['UPLOAD_FOLDER']
+            if os.path.isdir(staging_folder):
+                for entry in os.scandir(staging_folder):
+                    if entry.name.startswith('.') and entry.is_file() and entry.stat().st_mtime < cutoff:
+                        os.remove(entry.path)
+
+        removed = []
+        for filename in sorted(candidates):
+            modified_at = storage.modified_at(filename)
+            if modified_at is not None and modified_at < cutoff:
+                storage.delete(filename)
+                removed.append(filename)
+        return removed
+
+    @staticmethod
+    def send(filename):
+        """Response for an uploaded avatar file
+
+        Names never change content, so responses are cacheable forever. Content-addressed files
+        get their hash as a strong ETag. With AVATAR_X_ACCEL_REDIRECT set, nginx sends the file
+        from that internal location; otherwise werkzeug answers If-None-Match and Range itself
+        and the WSGI server's file wrapper (sendfile on gunicorn) or USE_X_SENDFILE sends it.
+        Files in object storage are a permanent redirect to their public URL, unless a local copy
+        from before the move to object storage is still there.
+        """
+        config = current_app.config
+        upload_folder = config['UPLOAD_FOLDER']
+        path = safe_join(upload_folder, filename)
+        if path is None or filename.startswith('.'):
+            raise NotFound()
+        match = CONTENT_HASH_FILENAME.match(filename)
+        etag = match.group(1) if match else True
+        max_age = config['AVATAR_CACHE_MAX_AGE']
+
+        public_url = AvatarService.storage().public_url(filename)
+        if public_url and not os.path.isfile(path):
+            response = redirect(public_url, 301)
+            response.cache_control.public = True
+            response.cache_control.max_age = max_age
+            response.cache_control.immutable = True
+            return response
+
+        accel_prefix = config['AVATAR_X_ACCEL_REDIRECT']
+        if accel_prefix:
+            if not os.path.isfile(path):
+                raise NotFound()
+            response = current_app.response_class(mimetype=mimetypes.guess_type(filename)[0])
+            response.headers['X-Accel-Redirect'] = accel_prefix.rstrip('/') + '/' + filename
+            if match:
+                response.set_etag(etag)
+            response.cache_control.public = True
+            response.cache_control.max_age = max_age
+            response.cache_control.immutable = True
+            return response.make_conditional(request)
+
+        response = send_from_directory(upload_folder, filename, etag=etag, max_age=max_age)
+        response.cache_control.public = True
+        response.cache_control.immutable = True
+        return response
+
+    @staticmethod
+    def public_url(url):
+        """Where clients fetch an avatar URL from: object storage's public URL, or the app's own path"""
+        if url and url.startswith(AVATAR_URL_PREFIX):
+            return AvatarService.storage().public_url(url[len(AVATAR_URL_PREFIX):]) or url
+        return url
+
+    @staticmethod
+    def public_variants(variants):
+        """avatar_variants with public_url() applied to every URL"""
+        if not variants:
+            return variants
+        return {
+            size: {kind: AvatarService.public_url(url) for kind, url in urls_by_kind.items()}
+            for size, urls_by_kind in variants.items()
+        }
+
+    @staticmethod
+    def for_slot(profile, slot):
+        """Avatar for a UI slot (AVATAR_SLOTS, in CSS pixels): the smallest variants covering 1x and 2x screens"""
+        if not profile.avatar_url:
+            return None
+        css_size = current_app.config['AVATAR_SLOTS'][slot]
+        variants = profile.avatar_variants
+        if not variants:
+            # External URL or an upload from before variants existed
+            return {'size': css_size, 'src': AvatarService.public_url(profile.avatar_url), 'srcset': None, 'webp_srcset': None}
+
+        sizes = sorted(int(size) for size in variants)
+
+        def covering(pixels):
+            return str(next((size for size in sizes if size >= pixels), sizes[-1]))
+
+        variants = AvatarService.public_variants(variants)
+        one_x, two_x = variants[covering(css_size)], variants[covering(css_size * 2)]
+        return {
+            'size': css_size,
+            'src': one_x['fallback'],
+            'srcset': f"{one_x['fallback']} 1x, {two_x['fallback']} 2x",
+            'webp_srcset': f"{one_x['webp']} 1x, {two_x['webp']} 2x"
+        }
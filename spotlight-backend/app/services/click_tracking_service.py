@@ -0,0 +1,80 @@
+import threading
+import time
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import insert, select
+from app import db
+from app.models import ProfileClick
+from app.utils import primary
+
+class ClickTrackingService:
+    """Service for recording public profile views"""
+
+    # Repeat views from the same IP inside this window count once (React Strict Mode double-fetches)
+    DEDUPE_WINDOW = timedelta(seconds=5)
+
+    # (user_id, ip_address) -> monotonic time of the last click this process accepted
+    _recent = {}
+    _recent_lock = threading.Lock()
+
+    @staticmethod
+    def _claim(user_id, ip_address):
+        """Atomically note a click in this process; False if one was accepted within the window"""
+        key = (user_id, ip_address)
+        now = time.monotonic()
+        window = ClickTrackingService.DEDUPE_WINDOW.total_seconds()
+        with ClickTrackingService._recent_lock:
+            last = ClickTrackingService._recent.get(key)
+            if last is not None and now - last < window:
+                return False
+            ClickTrackingService._recent[key] = now
+            if len(ClickTrackingService._recent) > 10000:
+                ClickTrackingService._recent = {k: v for k, v in ClickTrackingService._recent.items() if now - v < window}
+        return True
+
+    @staticmethod
+    def recent_click_query(user_id, ip_address, now):
+        """A click by this IP on the profile within DEDUPE_WINDOW of `now`"""
+        return select(ProfileClick.id).where(
+            ProfileClick.user_id == user_id,
+            ProfileClick.ip_address == ip_address,
+            ProfileClick.clicked_at >= now - ClickTrackingService.DEDUPE_WINDOW
+        ).limit(1)
+
+    @staticmethod
+    def track(user_id, ip_address, user_agent, referer):
+        """Record a profile click unless the same IP viewed the profile moments ago
+
+        Clicks accepted by this process are remembered at submit time, so repeats are caught
+        while the first is still queued for the SQLite writer (or being committed by another
+        thread). The database check catches clicks recorded by other processes.
+        """
+        if not ClickTrackingService._claim(user_id, ip_address):
+            return False
+        
+        now = datetime.utcnow()
+        
+        # Dedupe against the primary: a lagging replica would miss the click just written
+        with primary():
+            recent_click = db.session.execute(ClickTrackingService.recent_click_query(user_id, ip_address, now)).first()
+        
+        if recent_click:
+            return False
+        
+        values = {
+            'user_id': user_id,
+            'clicked_at': now,
+            'ip_address': ip_address,
+            'user_agent': user_agent,
+            'referer': referer
+        }
+        
+        # SQLite concurrent mode: hand the insert to the single writer instead of writing here
+        writer = current_app.extensions.get('sqlite_writer')
+        if writer:
+            writer.submit(insert(ProfileClick.__table__), values)
+            return True
+        
+        db.session.add(ProfileClick(**values))
+        db.session.commit()
+        return True
@@ -0,0 +1,166 @@
+import csv
+import io
+import json
+import zlib
+from datetime import date, datetime
+from sqlalchemy import select
+from app import db
+from app.models import User, UserProfile, ProfileClick
+
+class ExportService:
+    """Service for streaming full-table exports to admins"""
+
+    # Rows fetched per round-trip from the server-side cursor
+    BATCH_SIZE = 1000
+
+    # Serialized bytes buffered before a chunk is handed to the WSGI server
+    CHUNK_SIZE = 64 * 1024
+
+    DATASETS = ('users', 'profiles', 'clicks')
+    FORMATS = ('ndjson', 'csv')
+
+    @staticmethod
+    def build_query(dataset, since=None, until=None, user_id=None):
+        """Build the column-level SELECT for a dataset (no ORM entities, so nothing accumulates in the session)"""
+        if dataset == 'users':
+            stmt = select(
+                User.id,
+                User.email,
+                User.username,
+                User.is_admin,
+                User.created_at,
+                User.updated_at
+            ).order_by(User.id)
+            if user_id:
+                stmt = stmt.where(User.id == user_id)
+            return stmt
+
+        if dataset == 'profiles':
+            stmt = select(
+                UserProfile.id,
+                UserProfile.user_id,
+                User.username,
+                UserProfile.display_name,
+                UserProfile.bio,
+                UserProfile.avatar_url,
+                UserProfile.theme_settings,
+                UserProfile.is_public,
+                UserProfile.created_at,
+                UserProfile.updated_at
+            ).join(User, User.id == UserProfile.user_id).order_by(UserProfile.id)
+            if user_id:
+                stmt = stmt.where(UserProfile.user_id == user_id)
+            return stmt
+
+        if dataset == 'clicks':
+            stmt = select(
+                ProfileClick.id,
+                ProfileClick.user_id,
+                ProfileClick.clicked_at,
+                ProfileClick.ip_address,
+                ProfileClick.user_agent,
+                ProfileClick.referer
+            ).order_by(ProfileClick.id)
+            if since:
+                stmt = stmt.where(ProfileClick.clicked_at >= since)
+            if until:
+                stmt = stmt.where(ProfileClick.clicked_at < until)
+            if user_id:
+                stmt = stmt.where(ProfileClick.user_id == user_id)
+            return stmt
+
+        raise ValueError(f'Unknown dataset: {dataset}')
+
+    @staticmethod
+    def iter_rows(stmt):
+        """Yield row mappings from a server-side cursor, BATCH_SIZE rows at a time"""
+        result = db.session.execute(stmt.execution_options(yield_per=ExportService.BATCH_SIZE))
+        try:
+            for row in result.mappings():
+                yield row
+        finally:
+            result.close()
+
+    @staticmethod
+    def _json_default(value):
+        if isinstance(value, (datetime, date)):
+            return value.isoformat()
+        raise TypeError(f'Cannot serialize {type(value).__name__}')
+
+    @staticmethod
+    def serialize_ndjson(rows):
+        """Yield one JSON document per line"""
+        for row in rows:
+            yield json.dumps(dict(row), default=ExportService._json_default, separators=(',', ':')) + '\n'
+
+    @staticmethod
+    def serialize_csv(rows, columns):
+        """Yield a CSV header followed by one line per row"""
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+
+        def flush():
+            value = buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate(0)
+            return value
+
+        writer.writerow(columns)
+        yield flush()
+
+        for row in rows:
+            values = []
+            for column in columns:
+                value = row[column]
+                if isinstance(value, (datetime, date)):
+                    value = value.isoformat()
+                elif isinstance(value, (dict, list)):
+                    value = json.dumps(value, separators=(',', ':'))
+                values.append(value)
+            writer.writerow(values)
+            yield flush()
+
+    @staticmethod
+    def chunked(pieces, compress=False):
+        """Coalesce small string pieces into CHUNK_SIZE byte chunks, optionally gzip-compressed"""
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if compress else None
+        pending = []
+        pending_size = 0
+
+        for piece in pieces:
+            data = piece.encode('utf-8')
+            pending.append(data)
+            pending_size += len(data)
+            if pending_size >= ExportService.CHUNK_SIZE:
+                chunk = b''.join(pending)
+                pending = []
+                pending_size = 0
+                if compressor:
+                    chunk = compressor.compress(chunk)
+                if chunk:
+                    yield chunk
+
+        tail = b''.join(pending)
+        if compressor:
+            tail = compressor.compress(tail) + compressor.flush()
+        if tail:
+            yield tail
+
+    @staticmethod
+    def stream(dataset, export_format='ndjson', compress=False, since=None, until=None, user_id=None):
+        """Return a generator of byte chunks for the requested export"""
+        if dataset not in ExportService.DATASETS:
+            raise ValueError(f'Unknown dataset: {dataset}')
+        if export_format not in ExportService.FORMATS:
+            raise ValueError(f'Unknown format: {export_format}')
+
+        stmt = ExportService.build_query(dataset, since=since, until=until, user_id=user_id)
+        rows = ExportService.iter_rows(stmt)
+
+        if export_format == 'csv':
+            columns = [column.key for column in stmt.selected_columns]
+            pieces = ExportService.serialize_csv(rows, columns)
+        else:
+            pieces = ExportService.serialize_ndjson(rows)
+
+        return ExportService.chunked(pieces, compress=compress)
@@ -0,0 +1,92 @@
+from sqlalchemy import case, func, select, update
+from app import db
+
+class OrderingService:
+    """Sparse position keys shared by every user-ordered list (social links, music showcase)
+
+    Items are spaced POSITION_GAP apart, so moving one item only rewrites that item's
+    position (the midpoint between its new neighbours). Lists are always read ordered
+    by (position, id), which keeps concurrent appends that land on the same key stable.
+    """
+
+    POSITION_GAP = 1024
+
+    @staticmethod
+    def order_by(model):
+        """Canonical ORDER BY for an ordered list"""
+        return (model.position, model.id)
+
+    @staticmethod
+    def next_position(model, user_id):
+        """Append position as a SQL expression, evaluated inside the INSERT itself"""
+        return (
+            select(func.coalesce(func.max(model.position), 0) + OrderingService.POSITION_GAP)
+            .where(model.user_id == user_id)
+            .scalar_subquery()
+        )
+
+    @staticmethod
+    def reorder(model, user_id, item_ids):
+        """Respace the given items in order with a single bulk UPDATE; returns the number of rows updated"""
+        if not item_ids:
+            return 0
+
+        positions = case(
+            {item_id: (index + 1) * OrderingService.POSITION_GAP for index, item_id in enumerate(item_ids)},
+            value=model.id
+        )
+        result = db.session.execute(
+            update(model)
+            .where(model.user_id == user_id, model.id.in_(item_ids))
+            .values(position=positions)
+            .execution_options(synchronize_session=False)
+        )
+        return result.rowcount
+
+    @staticmethod
+    def move(model, user_id, item_id, before_id=None, after_id=None):
+        """Move one item directly before or after another item; returns False if either id is unknown"""
+        rows = db.session.execute(
+            select(model.id, model.position)
+            .where(model.user_id == user_id)
+            .order_by(*OrderingService.order_by(model))
+        ).all()
+
+        positions = {row.id: row.position or 0 for row in rows}
+        anchor_id = before_id if before_id is not None else after_id
+        if item_id not in positions or anchor_id not in positions or anchor_id == item_id:
+            return False
+
+        order = [row.id for row in rows if row.id != item_id]
+        insert_at = order.index(anchor_id) + (0 if before_id is not None else 1)
+
+        lower = positions[order[insert_at - 1]] if insert_at > 0 else None
+        upper = positions[order[insert_at]] if insert_at < len(order) else None
+        new_position = OrderingService._between(lower, upper)
+
+        if new_position is None:
+            # Gap exhausted between the neighbours: respace the whole list once
+            order.insert(insert_at, item_id)
+            OrderingService.reorder(model, user_id, order)
+            return True
+
+        db.session.execute(
+            update(model)
+            .where(model.id == item_id, model.user_id == user_id)
+            .values(position=new_position)
+            .execution_options(synchronize_session=False)
+        )
+        return True
+
+    @staticmethod
+    def _between(lower, upper):
+        """Integer key strictly between lower and upper, or None if there is no room"""
+        if lower is None and upper is None:
+            return OrderingService.POSITION_GAP
+        if lower is None:
+            return upper - OrderingService.POSITION_GAP
+        if upper is None:
+            return lower + OrderingService.POSITION_GAP
+        if upper - lower < 2:
+            return None
+        return (lower + upper) // 2
@@ -0,0 +1,248 @@
+from sqlalchemy import delete, insert, select, update
+from app import db
+from app.models import UserProfile, SocialLink, MusicShowcase
+from app.services.ordering_service import OrderingService
+from app.services.avatar_service import AvatarService
+from app.utils import validate_url
+
+class BatchValidationError(Exception):
+    """Raised when an operation in a batch is invalid; nothing has been written"""
+
+    def __init__(self, index, message):
+        super().__init__(message)
+        self.index = index
+        self.message = message
+
+class ProfileBatchService:
+    """Validate and apply a list of dashboard edits in a single transaction"""
+
+    MAX_OPERATIONS = 200
+
+    PROFILE_FIELDS = ('display_name', 'bio', 'avatar_url', 'theme_settings', 'is_public')
+    LINK_FIELDS = ('platform', 'url', 'display_text')
+
+    OPERATIONS = (
+        'profile.update',
+        'link.add',
+        'link.update',
+        'link.delete',
+        'link.reorder',
+        'showcase.delete',
+        'showcase.reorder'
+    )
+
+    @staticmethod
+    def validate(user_id, operations):
+        """Check every operation up front and return an execution plan; raises BatchValidationError"""
+        if not isinstance(operations, list) or not operations:
+            raise BatchValidationError(None, 'operations must be a non-empty array')
+        if len(operations) > ProfileBatchService.MAX_OPERATIONS:
+            raise BatchValidationError(None, f'At most {ProfileBatchService.MAX_OPERATIONS} operations per batch')
+
+        plan = {
+            'profile': {},
+            'link_adds': [],
+            'link_updates': {},
+            'link_deletes': set(),
+            'link_reorder': None,
+            'showcase_deletes': set(),
+            'showcase_reorder': None
+        }
+
+        for index, operation in enumerate(operations):
+            if not isinstance(operation, dict) or operation.get('op') not in ProfileBatchService.OPERATIONS:
+                raise BatchValidationError(index, f"op must be one of: {', '.join(ProfileBatchService.OPERATIONS)}")
+
+            op = operation['op']
+            data = operation.get('data') or {}
+            if not isinstance(data, dict):
+                raise BatchValidationError(index, 'data must be an object')
+
+            if op == 'profile.update':
+                plan['profile'].update(ProfileBatchService._validate_profile_fields(index, data))
+            elif op == 'link.add':
+                plan['link_adds'].append(ProfileBatchService._validate_link_fields(index, data, partial=False))
+            elif op == 'link.update':
+                link_id = ProfileBatchService._require_id(index, operation)
+                plan['link_updates'].setdefault(link_id, {}).update(
+                    ProfileBatchService._validate_link_fields(index, data, partial=True)
+                )
+            elif op == 'link.delete':
+                plan['link_deletes'].add(ProfileBatchService._require_id(index, operation))
+            elif op == 'showcase.delete':
+                plan['showcase_deletes'].add(ProfileBatchService._require_id(index, operation))
+            else:
+                key = 'link_reorder' if op == 'link.reorder' else 'showcase_reorder'
+                if plan[key] is not None:
+                    raise BatchValidationError(index, f'Only one {op} operation is allowed per batch')
+                plan[key] = ProfileBatchService._require_ids(index, operation)
+
+        # Ownership: one query per table covering every referenced id
+        link_ids = set(plan['link_updates']) | plan['link_deletes'] | set(plan['link_reorder'] or [])
+        ProfileBatchService._check_owned(SocialLink, user_id, link_ids, 'link')
+        showcase_ids = plan['showcase_deletes'] | set(plan['showcase_reorder'] or [])
+        ProfileBatchService._check_owned(MusicShowcase, user_id, showcase_ids, 'showcase item')
+
+        # Cleared display text falls back to the platform name, as in the single-link endpoint
+        needs_platform = [
+            link_id for link_id, fields in plan['link_updates'].items()
+            if 'display_text' in fields and not fields['display_text'] and 'platform' not in fields
+        ]
+        if needs_platform:
+            platforms = dict(db.session.execute(
+                select(SocialLink.id, SocialLink.platform).where(SocialLink.id.in_(needs_platform))
+            ).all())
+            for link_id in needs_platform:
+                plan['link_updates'][link_id]['display_text'] = platforms[link_id]
+        for fields in plan['link_updates'].values():
+            if 'display_text' in fields and not fields['display_text']:
+                fields['display_text'] = fields['platform']
+
+        if plan['link_deletes'] & set(plan['link_updates']):
+            raise BatchValidationError(None, 'A link cannot be updated and deleted in the same batch')
+        if plan['link_deletes'] & set(plan['link_reorder'] or []):
+            raise BatchValidationError(None, 'A deleted link cannot be reordered in the same batch')
+        if plan['showcase_deletes'] & set(plan['showcase_reorder'] or []):
+            raise BatchValidationError(None, 'A deleted showcase item cannot be reordered in the same batch')
+
+        return plan
+
+    @staticmethod
+    def apply(user_id, plan):
+        """Apply a validated plan with bulk statements; the caller commits or rolls back"""
+        if plan['profile']:
+            profile = UserProfile.query.filter_by(user_id=user_id).first()
+            for field, value in plan['profile'].items():
+                if field == 'avatar_url':
+                    AvatarService.set_avatar(profile, value, None)
+                else:
+                    setattr(profile, field, value)
+            db.session.flush()
+
+        if plan['link_deletes']:
+            db.session.execute(
+                delete(SocialLink)
+                .where(SocialLink.user_id == user_id, SocialLink.id.in_(plan['link_deletes']))
+                .execution_options(synchronize_session=False)
+            )
+
+        if plan['link_updates']:
+            # ORM bulk UPDATE by primary key, grouped into executemany batches by column set
+            db.session.execute(
+                update(SocialLink),
+                [{'id': link_id, **fields} for link_id, fields in plan['link_updates'].items()]
+            )
+
+        if plan['link_reorder']:
+            OrderingService.reorder(SocialLink, user_id, plan['link_reorder'])
+
+        if plan['link_adds']:
+            # New links go after everything else, in the order they were listed
+            base_position = db.session.execute(
+                select(OrderingService.next_position(SocialLink, user_id))
+            ).scalar()
+            db.session.execute(
+                insert(SocialLink),
+                [
+                    {
+                        'user_id': user_id,
+                        'platform': fields['platform'],
+                        'url': fields['url'],
+                        'display_text': fields.get('display_text') or fields['platform'],
+                        'position': base_position + index * OrderingService.POSITION_GAP
+                    }
+                    for index, fields in enumerate(plan['link_adds'])
+                ]
+            )
+
+        if plan['showcase_deletes']:
+            db.session.execute(
+                delete(MusicShowcase)
+                .where(MusicShowcase.user_id == user_id, MusicShowcase.id.in_(plan['showcase_deletes']))
+                .execution_options(synchronize_session=False)
+            )
+
+        if plan['showcase_reorder']:
+            OrderingService.reorder(MusicShowcase, user_id, plan['showcase_reorder'])
+
+    @staticmethod
+    def _require_id(index, operation):
+        item_id = operation.get('id')
+        if not isinstance(item_id, int) or isinstance(item_id, bool):
+            raise BatchValidationError(index, 'id must be an integer')
+        return item_id
+
+    @staticmethod
+    def _require_ids(index, operation):
+        ids = operation.get('ids')
+        if not isinstance(ids, list) or not all(isinstance(i, int) and not isinstance(i, bool) for i in ids):
+            raise BatchValidationError(index, 'ids must be an array of integers')
+        if len(set(ids)) != len(ids):
+            raise BatchValidationError(index, 'ids must be unique')
+        return ids
+
+    @staticmethod
+    def _check_owned(model, user_id, ids, label):
+        if not ids:
+            return
+        owned = set(db.session.execute(
+            select(model.id).where(model.user_id == user_id, model.id.in_(ids))
+        ).scalars())
+        missing = sorted(ids - owned)
+        if missing:
+            raise BatchValidationError(None, f'Some {label}s not found or do not belong to user: {missing}')
+
+    @staticmethod
+    def _validate_profile_fields(index, data):
+        unknown = set(data) - set(ProfileBatchService.PROFILE_FIELDS)
+        if unknown:
+            raise BatchValidationError(index, f'Unknown profile fields: {sorted(unknown)}')
+
+        fields = {}
+        for field in ('display_name', 'bio'):
+            if field in data:
+                if data[field] is not None and not isinstance(data[field], str):
+                    raise BatchValidationError(index, f'{field} must be a string')
+                fields[field] = data[field].strip() if data[field] else None
+
+        if 'avatar_url' in data:
+            avatar_url = data['avatar_url'].strip() if isinstance(data['avatar_url'], str) else None
+            if avatar_url and not validate_url(avatar_url):
+                raise BatchValidationError(index, 'Invalid avatar URL')
+            fields['avatar_url'] = avatar_url or None
+
+        if 'theme_settings' in data:
+            if not isinstance(data['theme_settings'], dict):
+                raise BatchValidationError(index, 'theme_settings must be an object')
+            fields['theme_settings'] = data['theme_settings']
+
+        if 'is_public' in data:
+            fields['is_public'] = bool(data['is_public'])
+
+        return fields
+
+    @staticmethod
+    def _validate_link_fields(index, data, partial):
+        unknown = set(data) - set(ProfileBatchService.LINK_FIELDS)
+        if unknown:
+            raise BatchValidationError(index, f'Unknown link fields: {sorted(unknown)}')
+        if any(data.get(field) is not None and not isinstance(data[field], str) for field in ProfileBatchService.LINK_FIELDS):
+            raise BatchValidationError(index, 'Link fields must be strings')
+
+        fields = {}
+        if 'platform' in data or not partial:
+            platform = (data.get('platform') or '').strip()
+            if not platform:
+                raise BatchValidationError(index, 'Platform is required')
+            fields['platform'] = platform
+
+        if 'url' in data or not partial:
+            url = (data.get('url') or '').strip()
+            if not url or not validate_url(url):
+                raise BatchValidationError(index, 'Valid URL is required')
+            fields['url'] = url
+
+        if 'display_text' in data:
+            fields['display_text'] = (data.get('display_text') or '').strip() or None
+
+        return fields
@@ -1,13 +1,35 @@
 import requests
 import base64
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from flask import current_app
 from app import db
 from app.models import SpotifyConnection
+from app.utils.metrics import record_spotify_status, track_spotify_call
+from app.utils.tracing import traced
+
+# Shared pool for overlapping Spotify HTTP calls with database work
+_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix='spotify')
 
 class SpotifyService:
     """Service for interacting with Spotify API"""
     
+    @staticmethod
+    def submit(fn, *args, **kwargs):
+        """Run a Spotify call on the shared pool inside a new context of the current app; returns a Future
+
+        The caller's context variables go along, so the call's trace span stays under the request span.
+        The call gets its own database session (e.g. to refresh a token), removed when it returns.
+        """
+        app = current_app._get_current_object()
+        
+        def run():
+            with app.app_context():
+                return fn(*args, **kwargs)
+        
+        return _executor.submit(contextvars.copy_context().run, run)
+    
     @staticmethod
     def get_auth_url(state=None):
         """Generate Spotify OAuth authorization URL"""
@@ -38,6 +60,7 @@ class SpotifyService:
         return f"{auth_url}?{query_string}"
     
     @staticmethod
+    @track_spotify_call
     def exchange_code_for_tokens(code):
         """Exchange authorization code for access and refresh tokens"""
         client_id = current_app.config['SPOTIFY_CLIENT_ID']
@@ -65,12 +88,14 @@ class SpotifyService:
             data=data
         )
         
+        record_spotify_status(response.status_code)
         if response.status_code != 200:
             return None
         
         return response.json()
     
     @staticmethod
+    @track_spotify_call
     def refresh_access_token(refresh_token):
         """Refresh Spotify access token"""
         client_id = current_app.config['SPOTIFY_CLIENT_ID']
@@ -95,12 +120,14 @@ class SpotifyService:
             data=data
         )
         
+        record_spotify_status(response.status_code)
         if response.status_code != 200:
             return None
         
         return response.json()
     
     @staticmethod
+    @track_spotify_call
     def get_user_info(access_token):
         """Get Spotify user information"""
         headers = {
@@ -112,12 +139,14 @@ class SpotifyService:
             headers=headers
         )
         
+        record_spotify_status(response.status_code)
         if response.status_code != 200:
             return None
         
         return response.json()
     
     @staticmethod
+    @track_spotify_call
     def search_artist(access_token, artist_name, limit=1):
         """Search for an artist by name - returns first match or None"""
         headers = {
@@ -136,6 +165,7 @@ class SpotifyService:
             params=params
         )
         
+        record_spotify_status(response.status_code)
         if response.status_code != 200:
             return None
         
@@ -148,6 +178,7 @@ class SpotifyService:
         return None
     
     @staticmethod
+    @track_spotify_call
     def search_artists(access_token, query, limit=10):
         """Search for artists by name - returns list of artists"""
         headers = {
@@ -166,6 +197,7 @@ class SpotifyService:
             params=params
         )
         
+        record_spotify_status(response.status_code)
         if response.status_code != 200:
             return None
         
@@ -173,6 +205,7 @@ class SpotifyService:
         return data.get('artists', {})
     
     @staticmethod
+    @track_spotify_call
     def search_albums(access_token, query, limit=50, offset=0):
         """Search for albums by name - returns list of albums"""
         headers = {
@@ -192,6 +225,7 @@ class SpotifyService:
             params=params
         )
         
+        record_spotify_status(response.status_code)
         if response.status_code != 200:
             return None
         
@@ -199,6 +233,7 @@ class SpotifyService:
         return data.get('albums', {})
     
     @staticmethod
+    @track_spotify_call
     def get_artist_albums(access_token, artist_id, limit=50, offset=0):
         """Get albums by a specific artist"""
         headers = {
@@ -217,12 +252,14 @@ class SpotifyService:
             params=params
         )
         
+        record_spotify_status(response.status_code)
         if response.status_code != 200:
             return None
         
         return response.json()
     
     @staticmethod
+    @track_spotify_call
     def get_user_albums(access_token, limit=50, offset=0):
         """Get user's saved albums"""
         headers = {
@@ -240,12 +277,14 @@ class SpotifyService:
             params=params
         )
         
+        record_spotify_status(response.status_code)
         if response.status_code != 200:
             return None
         
         return response.json()
     
     @staticmethod
+    @track_spotify_call
     def get_album_details(access_token, album_id):
         """Get detailed album information"""
         headers = {
@@ -257,12 +296,38 @@ class SpotifyService:
             headers=headers
         )
         
+        record_spotify_status(response.status_code)
         if response.status_code != 200:
             return None
         
         return response.json()
     
     @staticmethod
+    @track_spotify_call
+    def get_several_albums(access_token, album_ids):
+        """Get details for up to 20 albums in one request; unknown ids come back as None"""
+        headers = {
+            'Authorization': f'Bearer {access_token}'
+        }
+        
+        params = {
+            'ids': ','.join(album_ids)
+        }
+        
+        response = requests.get(
+            f"{current_app.config['SPOTIFY_API_BASE_URL']}/albums",
+            headers=headers,
+            params=params
+        )
+        
+        record_spotify_status(response.status_code)
+        if response.status_code != 200:
+            return None
+        
+        return response.json().get('albums', [])
+    
+    @staticmethod
+    @traced('spotify.get_valid_access_token')
     def get_valid_access_token(user_id):
         """Get valid access token for user, refreshing if necessary"""
         connection = SpotifyConnection.query.filter_by(user_id=user_id).first()
@@ -290,3 +355,54 @@ class SpotifyService:
         
         return connection.access_token
 
+    
+    @staticmethod
+    def format_album(album):
+        """Flatten a Spotify album object into the showcase candidate format"""
+        # Determine item type
+        album_type = album.get('album_type', 'album')
+        if album_type == 'single':
+            item_type = 'single'
+        elif album_type == 'ep':
+            item_type = 'ep'
+        else:
+            item_type = 'album'
+        
+        # Get artist names
+        artists = album.get('artists', [])
+        artist_names = ', '.join([artist.get('name', '') for artist in artists])
+        
+        # Get images
+        images = album.get('images', [])
+        image_url = images[0].get('url', '') if images else None
+        
+        return {
+            'spotify_id': album.get('id'),
+            'item_type': item_type,
+            'item_name': album.get('name', ''),
+            'artist_names': artist_names,
+            'image_url': image_url,
+            'spotify_url': album.get('external_urls', {}).get('spotify', ''),
+            'release_date': album.get('release_date', ''),
+            'total_tracks': album.get('total_tracks', 0)
+        }
+    
+    @staticmethod
+    def get_showcase_albums(access_token, artist_id=None, limit=50, offset=0):
+        """Albums a user can showcase: the artist's discography if linked, otherwise saved albums"""
+        if artist_id:
+            albums_data = SpotifyService.get_artist_albums(access_token, artist_id, limit=limit, offset=offset)
+            albums = albums_data.get('items', []) if albums_data else None
+        else:
+            albums_data = SpotifyService.get_user_albums(access_token, limit=limit, offset=offset)
+            albums = [item.get('album', {}) for item in albums_data.get('items', [])] if albums_data else None
+        
+        if albums is None:
+            return None
+        
+        return {
+            'items': [SpotifyService.format_album(album) for album in albums],
+            'total': albums_data.get('total', 0),
+            'limit': limit,
+            'offset': offset
+        }
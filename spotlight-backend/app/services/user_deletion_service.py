@@ -0,0 +1,157 @@
+import os
+import socket
+import threading
+import uuid
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import delete, select, update
+from app import db
+from app.models import User, UserProfile, ProfileClick, UserDeletionJob
+from app.services.avatar_service import AvatarService
+
+class JobTakenOver(Exception):
+    """The job's row names another owner: a worker resumed it after this one looked abandoned"""
+
+class UserDeletionService:
+    """Service for deleting users without loading their child rows into memory"""
+
+    @staticmethod
+    def count_clicks(user_id):
+        """Count a user's profile clicks"""
+        return db.session.query(db.func.count(ProfileClick.id)).filter(ProfileClick.user_id == user_id).scalar() or 0
+
+    @staticmethod
+    def delete_user(user_id):
+        """Delete a user row; the database cascades to profile, links, showcase, Spotify connection and clicks"""
+        avatar = db.session.query(UserProfile.avatar_url, UserProfile.avatar_variants).filter(UserProfile.user_id == user_id).first()
+        if avatar:
+            AvatarService.release(AvatarService.filenames(*avatar))
+
+        result = db.session.execute(delete(User).where(User.id == user_id))
+        db.session.commit()
+
+        AvatarService.collect_released()
+        return result.rowcount > 0
+
+    @staticmethod
+    def purge_clicks(user_id, chunk_size, on_progress=None):
+        """Delete a user's clicks in fixed-size chunks, committing after each one to keep transactions short"""
+        purged = 0
+        while True:
+            chunk_ids = select(ProfileClick.id).where(ProfileClick.user_id == user_id).limit(chunk_size).scalar_subquery()
+            result = db.session.execute(
+                delete(ProfileClick).where(ProfileClick.id.in_(chunk_ids)),
+                execution_options={'synchronize_session': False}
+            )
+            db.session.commit()
+
+            purged += result.rowcount
+            if on_progress:
+                on_progress(purged)
+            if result.rowcount < chunk_size:
+                return purged
+
+    @staticmethod
+    def start_background_deletion(user_id):
+        """Purge clicks in chunks on a background thread, then delete the user; returns the job record"""
+        owner = UserDeletionService._owner()
+        job = UserDeletionJob(
+            id=uuid.uuid4().hex,
+            user_id=user_id,
+            status='pending',
+            clicks_purged=0,
+            owner=owner,
+            updated_at=datetime.utcnow()
+        )
+        db.session.add(job)
+        db.session.commit()
+        snapshot = job.to_dict()
+
+        UserDeletionService._start_thread(job.id, user_id, owner)
+        return snapshot
+
+    @staticmethod
+    def resume_abandoned_jobs():
+        """Take over jobs whose worker stopped reporting progress (USER_DELETE_JOB_STALE_SECONDS); returns their ids
+
+        Run by the leader worker. The purge simply continues: it deletes whatever clicks are left.
+        """
+        cutoff = datetime.utcnow() - timedelta(seconds=current_app.config['USER_DELETE_JOB_STALE_SECONDS'])
+        owner = UserDeletionService._owner()
+        stale = db.session.execute(
+            select(UserDeletionJob.id, UserDeletionJob.user_id, UserDeletionJob.owner)
+            .where(UserDeletionJob.status.in_(('pending', 'running')), UserDeletionJob.updated_at < cutoff)
+        ).all()
+
+        resumed = []
+        for job_id, user_id, previous_owner in stale:
+            # Claimed only if no other worker took it (or its owner reported progress) in the meantime
+            claimed = db.session.execute(
+                update(UserDeletionJob)
+                .where(UserDeletionJob.id == job_id, UserDeletionJob.owner == previous_owner, UserDeletionJob.updated_at < cutoff)
+                .values(owner=owner, updated_at=datetime.utcnow())
+            )
+            db.session.commit()
+            if claimed.rowcount:
+                current_app.logger.warning(f'Resuming deletion job {job_id} of user {user_id}, abandoned by {previous_owner}')
+                UserDeletionService._start_thread(job_id, user_id, owner)
+                resumed.append(job_id)
+        return resumed
+
+    @staticmethod
+    def get_job(job_id):
+        """Return a snapshot of a background deletion job, or None"""
+        job = db.session.get(UserDeletionJob, job_id)
+        return job.to_dict() if job else None
+
+    @staticmethod
+    def _owner():
+        return f'{socket.gethostname()}:{os.getpid()}'
+
+    @staticmethod
+    def _start_thread(job_id, user_id, owner):
+        thread = threading.Thread(
+            target=UserDeletionService._run_job,
+            args=(current_app._get_current_object(), job_id, user_id, owner),
+            name=f"user-delete-{user_id}",
+            daemon=True
+        )
+        thread.start()
+
+    @staticmethod
+    def _update_job(job_id, owner, **changes):
+        """Record progress (and the heartbeat); raises JobTakenOver when another worker has resumed the job"""
+        result = db.session.execute(
+            update(UserDeletionJob)
+            .where(UserDeletionJob.id == job_id, UserDeletionJob.owner == owner)
+            .values(updated_at=datetime.utcnow(), **changes)
+        )
+        db.session.commit()
+        if not result.rowcount:
+            raise JobTakenOver(job_id)
+
+    @staticmethod
+    def _run_job(app, job_id, user_id, owner):
+        with app.app_context():
+            try:
+                UserDeletionService._update_job(job_id, owner, status='running')
+                # A resumed job counts on from what its previous worker purged
+                already_purged = db.session.scalar(select(UserDeletionJob.clicks_purged).where(UserDeletionJob.id == job_id)) or 0
+                UserDeletionService.purge_clicks(
+                    user_id,
+                    app.config['USER_DELETE_CLICK_CHUNK_SIZE'],
+                    on_progress=lambda purged: UserDeletionService._update_job(job_id, owner, clicks_purged=already_purged + purged)
+                )
+                UserDeletionService.delete_user(user_id)
+                UserDeletionService._update_job(job_id, owner, status='completed', finished_at=datetime.utcnow())
+            except JobTakenOver:
+                app.logger.warning(f'Deletion job {job_id} was resumed by another worker; stopping here')
+            except Exception as e:
+                db.session.rollback()
+                app.logger.error(f"Background deletion of user {user_id} failed: {e}")
+                try:
+                    UserDeletionService._update_job(job_id, owner, status='failed', error=str(e), finished_at=datetime.utcnow())
+                except JobTakenOver:
+                    pass
+            finally:
+                db.session.remove()
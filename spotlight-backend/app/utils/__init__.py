@@ -5,12 +5,29 @@ from app.utils.validators import (
     validate_url,
     validate_spotify_url
 )
+from app.utils.pagination import (
+    encode_cursor,
+    decode_cursor,
+    after_cursor,
+    escape_like
+)
+from app.utils.replica import (
+    use_replica,
+    primary,
+    pool_status
+)
 
 __all__ = [
     'validate_email',
     'validate_username',
     'validate_password',
     'validate_url',
-    'validate_spotify_url'
+    'validate_spotify_url',
+    'encode_cursor',
+    'decode_cursor',
+    'after_cursor',
+    'escape_like',
+    'use_replica',
+    'primary',
+    'pool_status'
 ]
-
@@ -0,0 +1,137 @@
+import json
+import logging
+import queue
+import random
+import sys
+import time
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler
+from flask import g, request
+from flask.logging import default_handler
+from werkzeug.serving import WSGIRequestHandler
+from app.utils.background import BackgroundThread
+from app.utils.replica import request_identity
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line; fields passed as extra={'fields': {...}} are merged in"""
+
+    def format(self, record):
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage()
+        }
+        entry.update(getattr(record, 'fields', {}))
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+class DroppingQueueHandler(QueueHandler):
+    """Queue handler that never blocks the caller: records are dropped (and counted) when the queue is full"""
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+class AsyncLogSink(BackgroundThread):
+    """Background listener writing queued records as JSON lines to stderr"""
+
+    thread_name = 'log-sink'
+
+    def __init__(self, max_queue_size=10000, stream=None):
+        super().__init__()
+        self.max_queue_size = max_queue_size
+        self.stream = stream
+        self.handler = DroppingQueueHandler(queue.Queue(maxsize=max_queue_size))
+        self._output = None
+
+    def _prepare(self):
+        # Records queued before the first start are kept; after a fork the queue is the parent's
+        if self._thread is not None:
+            self.handler.queue = queue.Queue(maxsize=self.max_queue_size)
+        self._output = logging.StreamHandler(self.stream or sys.stderr)
+        self._output.setFormatter(JsonFormatter())
+
+    def _run(self):
+        pending = self.handler.queue
+        while True:
+            record = pending.get()
+            if record is None:
+                return
+            self._output.handle(record)
+
+    def _signal_stop(self, timeout):
+        # Queued after every record already waiting, so those are written first
+        try:
+            self.handler.queue.put(None, timeout=timeout)
+        except queue.Full:
+            return False
+        return True
+
+class QuietRequestHandler(WSGIRequestHandler):
+    """Development server request handler without werkzeug's own per-request log line"""
+
+    def log_request(self, code='-', size='-'):
+        pass
+
+# app.logger is one logger shared by every app in the process, so it gets a single sink
+_log_sink = None
+
+def install_access_log(app):
+    """Route the app's logs through a queue and log one structured line per request"""
+    global _log_sink
+    if _log_sink is None:
+        _log_sink = AsyncLogSink(max_queue_size=app.config['ACCESS_LOG_QUEUE_SIZE'])
+        # app.logger is the parent of every module logger under app.*, so all of them go through the queue
+        app.logger.removeHandler(default_handler)
+        app.logger.addHandler(_log_sink.handler)
+        # Handlers on the root logger (e.g. alembic's fileConfig during migrations) would write each record again, synchronously
+        app.logger.propagate = False
+    sink = _log_sink
+    sink.ensure_started()
+    app.extensions['log_sink'] = sink
+    access_logger = logging.getLogger(f'{app.logger.name}.access')
+    access_logger.setLevel(logging.INFO)
+
+    sample_rates = app.config['ACCESS_LOG_SAMPLE_RATES']
+    slow_seconds = app.config['ACCESS_LOG_SLOW_MS'] / 1000
+
+    @app.before_request
+    def start_access_timer():
+        g.access_log_started = time.perf_counter()
+
+    @app.after_request
+    def log_access(response):
+        started = g.pop('access_log_started', None)
+        # CORS preflights are never logged
+        if started is None or request.method == 'OPTIONS':
+            return response
+        sink.ensure_started()
+
+        duration = time.perf_counter() - started
+        sample_rate = sample_rates.get(request.endpoint, 1.0)
+        # Errors and slow requests are always kept; everything else on high-volume routes is sampled
+        if response.status_code < 500 and duration < slow_seconds and sample_rate < 1 and random.random() >= sample_rate:
+            return response
+
+        access_logger.info(f'{request.method} {request.path} {response.status_code}', extra={'fields': {
+            'type': 'access',
+            'method': request.method,
+            'path': request.path,
+            'route': request.url_rule.rule if request.url_rule else None,
+            'endpoint': request.endpoint,
+            'status': response.status_code,
+            'duration_ms': round(duration * 1000, 2),
+            'user_id': request_identity(),
+            'remote_addr': request.remote_addr,
+            'bytes': response.content_length,
+            'sample_rate': sample_rate
+        }})
+        return response
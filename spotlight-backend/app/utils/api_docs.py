@@ -0,0 +1,175 @@
+import importlib.util
+import inspect
+import logging
+import os
+import sys
+import threading
+from flask import Blueprint, Response, current_app, render_template, url_for
+from app.utils.compression import cache_compressed
+
+logger = logging.getLogger(__name__)
+
+SWAGGER_CONFIG = {
+    "headers": [],
+    "specs": [
+        {
+            "endpoint": "apispec",
+            "route": "/apispec.json",
+            "rule_filter": lambda rule: True,
+            "model_filter": lambda tag: True,
+        }
+    ],
+    "static_url_path": "/flasgger_static",
+    "swagger_ui": True,
+    "specs_route": "/api/docs"
+}
+
+SWAGGER_TEMPLATE = {
+    "swagger": "2.0",
+    "info": {
+        "title": "Spotlight Music Hub API",
+        "description": "API documentation for Spotlight - A music link hub platform for artists",
+        "version": "1.0.0",
+        "contact": {
+            "name": "Spotlight API Support"
+        }
+    },
+    "basePath": "/api",
+    "schemes": ["http", "https"],
+    "securityDefinitions": {
+        "Bearer": {
+            "type": "apiKey",
+            "name": "Authorization",
+            "in": "header",
+            "description": "JWT Authorization header using the Bearer scheme. Example: \"Authorization: Bearer {token}\""
+        }
+    },
+    "tags": [
+        {
+            "name": "Authentication",
+            "description": "User authentication and authorization endpoints"
+        },
+        {
+            "name": "Spotify",
+            "description": "Spotify OAuth integration and music data endpoints"
+        },
+        {
+            "name": "Profiles",
+            "description": "User profile management endpoints"
+        },
+        {
+            "name": "Social Links",
+            "description": "Social media links management endpoints"
+        },
+        {
+            "name": "Music Showcase",
+            "description": "Music showcase management endpoints"
+        },
+        {
+            "name": "Health",
+            "description": "API health check endpoints"
+        }
+    ]
+}
+
+_spec_lock = threading.Lock()
+
+def _spec_sources(app):
+    """Files the spec is built from: the module of every registered view, plus this one (the template)"""
+    sources = {os.path.abspath(__file__)}
+    for view in app.view_functions.values():
+        module = sys.modules.get(inspect.unwrap(view).__module__)
+        path = getattr(module, '__file__', None)
+        if path:
+            sources.add(os.path.abspath(path))
+    return sources
+
+def _spec_file_is_current(app, path):
+    """A spec file older than any module contributing views was built from stale docstrings"""
+    if not os.path.exists(path):
+        return False
+    built_at = os.path.getmtime(path)
+    return all(os.path.getmtime(source) <= built_at for source in _spec_sources(app))
+
+def build_apispec(app):
+    """Generate the OpenAPI spec from the route docstrings as JSON text (imports flasgger on demand)"""
+    from flasgger import Swagger
+
+    # Used only as a spec generator: no views, hooks or url_rule patching are installed on the app
+    swagger = Swagger(config=dict(SWAGGER_CONFIG), template=SWAGGER_TEMPLATE)
+    swagger.app = app
+    swagger.load_config(app)
+    spec = swagger.get_apispecs(SWAGGER_CONFIG['specs'][0]['endpoint'])
+    return app.json.dumps(spec)
+
+def write_apispec(app, path=None, body=None):
+    """Write the spec (generated unless given) to API_SPEC_FILE or path; returns the path"""
+    path = path or app.config['API_SPEC_FILE']
+    body = body if body is not None else build_apispec(app)
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    temp_path = f'{path}.tmp'
+    with open(temp_path, 'w') as f:
+        f.write(body)
+    os.replace(temp_path, path)
+    return path
+
+def load_apispec(app):
+    """Spec JSON from memory, then API_SPEC_FILE, else generated once and written there
+
+    In debug mode the spec is rebuilt on every call so docstring edits show up immediately.
+    """
+    if app.debug:
+        return build_apispec(app)
+
+    cached = app.extensions.get('apispec')
+    if cached is not None:
+        return cached
+
+    with _spec_lock:
+        cached = app.extensions.get('apispec')
+        if cached is not None:
+            return cached
+
+        path = app.config.get('API_SPEC_FILE')
+        if path and _spec_file_is_current(app, path):
+            with open(path) as f:
+                body = f.read()
+        else:
+            body = build_apispec(app)
+            if path:
+                try:
+                    write_apispec(app, path, body)
+                except OSError as e:
+                    logger.warning(f'Could not write OpenAPI spec to {path}: {e}')
+
+        app.extensions['apispec'] = body
+        return body
+
+def init_api_docs(app):
+    """Serve /apispec.json and the Swagger UI without building anything until they are requested"""
+    if not app.config['API_DOCS_ENABLED']:
+        return
+
+    # Serve flasgger's bundled Swagger UI assets without importing it; the page is our own template
+    flasgger_dir = importlib.util.find_spec('flasgger').submodule_search_locations[0]
+    docs_bp = Blueprint(
+        'flasgger',
+        __name__,
+        static_folder=os.path.join(flasgger_dir, 'ui3', 'static'),
+        static_url_path=SWAGGER_CONFIG['static_url_path']
+    )
+
+    @docs_bp.route(SWAGGER_CONFIG['specs'][0]['route'])
+    @cache_compressed
+    def apispec():
+        return Response(load_apispec(current_app._get_current_object()), mimetype='application/json')
+
+    @docs_bp.route(SWAGGER_CONFIG['specs_route'])
+    def apidocs():
+        return render_template(
+            'api_docs.html',
+            title=SWAGGER_TEMPLATE['info']['title'],
+            spec_url=url_for('flasgger.apispec')
+        )
+
+    app.register_blueprint(docs_bp)
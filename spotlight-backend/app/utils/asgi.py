@@ -0,0 +1,156 @@
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from tempfile import SpooledTemporaryFile
+from asgiref.sync import AsyncToSync, sync_to_async
+
+# Request bodies up to this size stay in memory while they are received; larger ones spill to disk
+SPOOL_MAX_SIZE = 64 * 1024
+
+class AsgiApp:
+    """Serves the Flask app over ASGI (uvicorn, hypercorn) with async views on the server's event loop
+
+    Each request runs the WSGI app on one of `threads` worker threads, as a threaded WSGI server
+    would. asgiref's own WsgiToAsgi runs every request on a single shared thread instead. Because
+    the threads are started from the event loop, Flask's async views are scheduled back onto that
+    loop rather than on a private loop per request. Their outbound calls then share connections
+    and overlap each other, and sync_to_async work inside them returns to the request's thread.
+
+    The body is received in full (spooled to disk past SPOOL_MAX_SIZE) before the app runs. One
+    larger than max_body_size is refused with 413 without calling the app. Lifespan startup and
+    shutdown run the given coroutine functions, e.g. to open and close shared HTTP clients.
+    """
+
+    def __init__(self, wsgi_app, threads=32, max_body_size=None, on_startup=(), on_shutdown=()):
+        self.wsgi_app = wsgi_app
+        self.threads = threads
+        self.max_body_size = max_body_size
+        self.on_startup = list(on_startup)
+        self.on_shutdown = list(on_shutdown)
+        self.executor = None
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+        elif scope['type'] == 'http':
+            await self._http(scope, receive, send)
+        else:
+            raise ValueError(f"Unsupported ASGI scope type {scope['type']!r}")
+
+    def _executor(self):
+        if self.executor is None:
+            self.executor = ThreadPoolExecutor(max_workers=self.threads, thread_name_prefix='asgi')
+        return self.executor
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                try:
+                    self._executor()
+                    for hook in self.on_startup:
+                        await hook()
+                except Exception as e:
+                    await send({'type': 'lifespan.startup.failed', 'message': str(e)})
+                    return
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                for hook in self.on_shutdown:
+                    await hook()
+                if self.executor is not None:
+                    self.executor.shutdown(wait=False)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def _http(self, scope, receive, send):
+        with SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE) as body:
+            size = 0
+            while True:
+                message = await receive()
+                if message['type'] == 'http.disconnect':
+                    return
+                chunk = message.get('body', b'')
+                size += len(chunk)
+                if self.max_body_size is not None and size > self.max_body_size:
+                    await _send_error(send, 413, b'{"error": "Request body too large"}')
+                    return
+                body.write(chunk)
+                if not message.get('more_body'):
+                    break
+            body.seek(0)
+            await sync_to_async(self._run, thread_sensitive=False, executor=self._executor())(
+                scope, body, size, AsyncToSync(send)
+            )
+
+    def _run(self, scope, body, size, sync_send):
+        response = {}
+
+        def start_response(status, headers, exc_info=None):
+            if exc_info and response.get('sent'):
+                raise exc_info[1].with_traceback(exc_info[2])
+            response['start'] = {
+                'type': 'http.response.start',
+                'status': int(status.split(' ', 1)[0]),
+                'headers': [(name.lower().encode('latin-1'), value.encode('latin-1')) for name, value in headers]
+            }
+
+        def send_start():
+            if not response.get('sent'):
+                response['sent'] = True
+                sync_send(response['start'])
+
+        iterable = self.wsgi_app(build_environ(scope, body, size), start_response)
+        try:
+            for chunk in iterable:
+                if chunk:
+                    send_start()
+                    sync_send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+        finally:
+            if hasattr(iterable, 'close'):
+                iterable.close()
+        send_start()
+        sync_send({'type': 'http.response.body', 'body': b''})
+
+async def _send_error(send, status, body):
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [(b'content-type', b'application/json'), (b'content-length', str(len(body)).encode())]
+    })
+    await send({'type': 'http.response.body', 'body': body})
+
+def build_environ(scope, body, size):
+    """WSGI environ (PEP 3333) for an ASGI HTTP scope whose body has been received into `body`"""
+    server_name, server_port = scope.get('server') or ('localhost', 80)
+    client = scope.get('client')
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', '').encode('utf-8').decode('latin-1'),
+        'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'SERVER_NAME': server_name,
+        'SERVER_PORT': str(server_port or 80),
+        'REMOTE_ADDR': client[0] if client else '',
+        'REMOTE_PORT': str(client[1]) if client else '',
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': body,
+        'wsgi.input_terminated': True,
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+        'CONTENT_LENGTH': str(size)
+    }
+    for name, value in scope.get('headers', []):
+        name = name.decode('latin-1').upper().replace('-', '_')
+        value = value.decode('latin-1')
+        if name == 'CONTENT_LENGTH':
+            continue
+        if name != 'CONTENT_TYPE':
+            name = f'HTTP_{name}'
+        # Repeated headers are joined as a WSGI server would
+        if name in environ:
+            value = f"{environ[name]}{'; ' if name == 'HTTP_COOKIE' else ','}{value}"
+        environ[name] = value
+    return environ
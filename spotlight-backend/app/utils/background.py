@@ -0,0 +1,57 @@
+import atexit
+import os
+import threading
+from abc import ABC, abstractmethod
+
+class BackgroundThread(ABC):
+    """A daemon thread per process: started on first use and again in every forked child
+
+    A fork leaves the thread behind in the parent, so ensure_started() starts a fresh one the
+    first time it is called in a new process, after _prepare() has replaced the state that
+    belonged to the parent (queues, events, file descriptors). stop() runs at exit in the
+    process that started the thread. Subclasses implement _run() and _signal_stop().
+    """
+
+    thread_name = 'background'
+
+    def __init__(self):
+        self._thread = None
+        self._pid = None
+        self._start_lock = threading.Lock()
+        atexit.register(self.stop)
+
+    @property
+    def started(self):
+        """Whether the thread was started in this process (and not stopped since)"""
+        return self._pid == os.getpid()
+
+    def ensure_started(self):
+        if self._pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._pid == os.getpid():
+                return
+            self._prepare()
+            self._thread = threading.Thread(target=self._run, name=self.thread_name, daemon=True)
+            self._thread.start()
+            self._pid = os.getpid()
+
+    def stop(self, timeout=5):
+        """Have the thread finish its pending work and wait for it; True when it was running here"""
+        if self._pid != os.getpid():
+            return False
+        if self._signal_stop(timeout):
+            self._thread.join(timeout)
+        self._pid = None
+        return True
+
+    def _prepare(self):
+        """Set up fresh per-process state before the thread starts"""
+
+    @abstractmethod
+    def _run(self):
+        pass
+
+    @abstractmethod
+    def _signal_stop(self, timeout):
+        """Tell _run() to return once its work is done; False when it cannot be told (nothing to join)"""
@@ -0,0 +1,114 @@
+import gzip
+import hashlib
+import threading
+from collections import OrderedDict
+from functools import wraps
+from flask import g, request
+
+try:
+    import brotli
+except ImportError:  # Optional: without it responses are only gzipped
+    brotli = None
+
+class CompressedBodyCache:
+    """LRU of compressed bodies keyed by (sha256 of the uncompressed body, encoding), bounded in bytes
+
+    Keys come from the content itself, so an entry never goes stale: a changed profile renders a
+    different body and simply misses. Identical bodies share one entry.
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            body = self._entries.get(key)
+            if body is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return body
+
+    def put(self, key, body):
+        if len(body) > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.size -= len(previous)
+            self._entries[key] = body
+            self.size += len(body)
+            while self.size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.size -= len(evicted)
+
+def compress(body, encoding, level):
+    if encoding == 'br':
+        return brotli.compress(body, quality=level)
+    # mtime=0 keeps the output identical for identical input
+    return gzip.compress(body, compresslevel=level, mtime=0)
+
+def cache_compressed(f):
+    """Mark a view's responses as cacheable: each distinct body is compressed once per encoding, at the
+    higher COMPRESSION_CACHE_LEVELS, and served from the cache afterwards"""
+    @wraps(f)
+    def wrapper(*args, **kwargs):
+        g.cache_compressed = True
+        return f(*args, **kwargs)
+    return wrapper
+
+def install_compression(app):
+    """Compress responses with brotli or gzip as negotiated by Accept-Encoding
+
+    Only complete (non-streamed, non-file) 200 responses of COMPRESSION_MIMETYPES at least
+    COMPRESSION_MIN_SIZE bytes long are compressed; smaller bodies gain little and cost a
+    compression pass. Views decorated with cache_compressed reuse compressed bodies from a
+    per-process cache instead of compressing them on every request.
+    """
+    cache = CompressedBodyCache(app.config['COMPRESSION_CACHE_MAX_BYTES'])
+    app.extensions['compression_cache'] = cache
+    encodings = (['br'] if brotli is not None else []) + ['gzip']
+    min_size = app.config['COMPRESSION_MIN_SIZE']
+    mimetypes = app.config['COMPRESSION_MIMETYPES']
+    levels = app.config['COMPRESSION_LEVELS']
+    cache_levels = app.config['COMPRESSION_CACHE_LEVELS']
+
+    @app.after_request
+    def compress_response(response):
+        if (
+            response.status_code != 200
+            or response.direct_passthrough
+            or response.is_streamed
+            or 'Content-Encoding' in response.headers
+            or response.mimetype not in mimetypes
+            or 'no-transform' in response.headers.get('Cache-Control', '')
+        ):
+            return response
+        body = response.get_data()
+        if len(body) < min_size:
+            return response
+
+        # The body now depends on Accept-Encoding, whether or not this client gets it compressed
+        response.vary.add('Accept-Encoding')
+        encoding = request.accept_encodings.best_match(encodings)
+        if encoding is None:
+            return response
+
+        if g.get('cache_compressed'):
+            key = (hashlib.sha256(body).digest(), encoding)
+            compressed = cache.get(key)
+            if compressed is None:
+                compressed = compress(body, encoding, cache_levels[encoding])
+                cache.put(key, compressed)
+        else:
+            compressed = compress(body, encoding, levels[encoding])
+
+        response.set_data(compressed)
+        response.headers['Content-Encoding'] = encoding
+        return response
@@ -0,0 +1,50 @@
+import io
+
+class InvalidImageError(ValueError):
+    """Upload is not an image Pillow can decode (or is too large to decode safely)"""
+
+def render_avatar_variants(path, sizes, webp_quality=80, fallback_quality=85, max_pixels=40_000_000):
+    """Normalize an uploaded image into square avatar variants
+
+    Runs in a worker process, so it reads the staged upload from `path` and returns plain bytes.
+    The image is rotated according to its EXIF orientation and re-encoded from pixels only, which
+    drops EXIF, GPS and other metadata. Animated images keep their first frame. Each size is
+    center-cropped to a square and never upscaled. Returns {size: {'webp': bytes, 'fallback': bytes,
+    'fallback_format': 'png' or 'jpeg'}}.
+    """
+    from PIL import Image, ImageOps
+
+    Image.MAX_IMAGE_PIXELS = max_pixels
+    try:
+        with Image.open(path) as source:
+            source.seek(0)
+            image = ImageOps.exif_transpose(source)
+            image.load()
+    except (Image.DecompressionBombError, OSError, SyntaxError, ValueError) as e:
+        raise InvalidImageError(str(e))
+
+    has_alpha = image.mode in ('RGBA', 'LA', 'PA') or (image.mode == 'P' and 'transparency' in image.info)
+    image = image.convert('RGBA' if has_alpha else 'RGB')
+    side = min(image.size)
+    image = ImageOps.fit(image, (side, side), method=Image.LANCZOS)
+
+    variants = {}
+    for size in sorted(sizes):
+        resized = image if size >= side else image.resize((size, size), Image.LANCZOS)
+
+        webp = io.BytesIO()
+        resized.save(webp, 'WEBP', quality=webp_quality, method=4)
+
+        # PNG keeps transparency; everything else falls back to JPEG
+        fallback = io.BytesIO()
+        if has_alpha:
+            resized.save(fallback, 'PNG', optimize=True)
+        else:
+            resized.save(fallback, 'JPEG', quality=fallback_quality, optimize=True, progressive=True)
+
+        variants[size] = {
+            'webp': webp.getvalue(),
+            'fallback': fallback.getvalue(),
+            'fallback_format': 'png' if has_alpha else 'jpeg'
+        }
+    return variants
@@ -0,0 +1,514 @@
+import bisect
+import inspect
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+import weakref
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from flask import g, request
+from app.utils.background import BackgroundThread
+from app.utils.tracing import span
+
+try:
+    import fcntl
+except ImportError:
+    # Windows: no record locks, and no pre-fork servers whose workers would share the directory
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+class _Shard:
+    """One thread's private slice of a metric; only its owning thread ever writes to it"""
+    __slots__ = ('values', '__weakref__')
+
+    def __init__(self):
+        self.values = {}
+
+class _ThreadShardedMetric:
+    """Base for metrics whose hot path touches only thread-local state
+
+    Each thread updates its own shard without locking. Collection sums every live shard; when a
+    thread exits, its shard is folded into a retired total (the only place a lock is taken) so
+    counts survive short-lived request threads.
+    """
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._local = threading.local()
+        self._shards = weakref.WeakSet()
+        self._retired = {}
+        self._retire_lock = threading.Lock()
+
+    def _shard_values(self):
+        shard = getattr(self._local, 'shard', None)
+        if shard is None:
+            shard = _Shard()
+            self._local.shard = shard
+            with self._retire_lock:
+                self._shards.add(shard)
+            weakref.finalize(shard, self._retire, shard.values)
+        return shard.values
+
+    def _retire(self, values):
+        with self._retire_lock:
+            for key, value in values.items():
+                self._retired[key] = self._merge(self._retired.get(key), value)
+
+    def _collect(self):
+        """Merged {label values: value} across retired and live shards"""
+        # Hold strong references first so no shard can retire mid-collection and be counted twice
+        with self._retire_lock:
+            shards = list(self._shards)
+            merged = {key: self._merge(None, value) for key, value in self._retired.items()}
+        for shard in shards:
+            for key, value in list(shard.values.items()):
+                merged[key] = self._merge(merged.get(key), value)
+        return merged
+
+    def _labels(self, values):
+        return tuple(str(value) for value in values)
+
+class Counter(_ThreadShardedMetric):
+    """Monotonic count; name it *_total"""
+    type = 'counter'
+
+    def inc(self, *labelvalues, amount=1):
+        values = self._shard_values()
+        key = self._labels(labelvalues)
+        values[key] = values.get(key, 0) + amount
+
+    @staticmethod
+    def _merge(total, value):
+        return (total or 0) + value
+
+    def samples(self):
+        for key, value in sorted(self._collect().items()):
+            yield self.name, dict(zip(self.labelnames, key)), value
+
+class Histogram(_ThreadShardedMetric):
+    type = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, *labelvalues):
+        values = self._shard_values()
+        key = self._labels(labelvalues)
+        state = values.get(key)
+        if state is None:
+            # [per-bucket counts (last is +Inf), sum]
+            state = values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+        state[0][bisect.bisect_left(self.buckets, value)] += 1
+        state[1] += value
+
+    @staticmethod
+    def _merge(total, value):
+        if total is None:
+            return [list(value[0]), value[1]]
+        return [[a + b for a, b in zip(total[0], value[0])], total[1] + value[1]]
+
+    def samples(self):
+        for key, (counts, total) in sorted(self._collect().items()):
+            labels = dict(zip(self.labelnames, key))
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                yield self.name + '_bucket', {**labels, 'le': _format_value(bound)}, cumulative
+            yield self.name + '_sum', labels, total
+            yield self.name + '_count', labels, cumulative
+
+class Gauge:
+    """Value read from a callback at scrape time; the callback yields (labels dict, value)
+
+    metric_type='counter' exposes a cumulative count kept elsewhere (name it *_total).
+    """
+
+    def __init__(self, name, documentation, callback, metric_type='gauge'):
+        self.name = name
+        self.documentation = documentation
+        self.callback = callback
+        self.type = metric_type
+
+    def samples(self):
+        for labels, value in self.callback():
+            yield self.name, labels, value
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    if isinstance(value, float) and value.is_integer():
+        return repr(value)
+    return str(value)
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+
+    def register(self, metric):
+        self._metrics[metric.name] = metric
+        return metric
+
+    def unregister(self, name):
+        self._metrics.pop(name, None)
+
+    def get(self, name):
+        return self._metrics.get(name)
+
+    def collect(self):
+        """{metric name: [(sample name, labels, value), ...]} for this process"""
+        return {name: list(metric.samples()) for name, metric in self._metrics.items()}
+
+    def render(self, collected=None):
+        """Prometheus text exposition format (version 0.0.4) of collect(), or of samples merged from several processes"""
+        collected = self.collect() if collected is None else collected
+        lines = []
+        for metric in self._metrics.values():
+            lines.append(f'# HELP {metric.name} {metric.documentation}')
+            lines.append(f'# TYPE {metric.name} {metric.type}')
+            for name, labels, value in collected.get(metric.name, ()):
+                label_text = ','.join(f'{key}="{_escape(val)}"' for key, val in labels.items())
+                lines.append(f"{name}{{{label_text}}} {_format_value(value)}" if label_text else f'{name} {_format_value(value)}')
+        return '\n'.join(lines) + '\n'
+
+def _is_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+class MultiProcessCollector(BackgroundThread):
+    """Sums the metrics of every worker process of a server, whichever worker is scraped
+
+    The server gives all its workers one id, '<master pid>-<token>' (METRICS_SERVER_ID, set by
+    gunicorn.conf.py and asgi.py). Each worker writes its samples to
+    <directory>/<server id>-<pid>-<token>.json every `interval` seconds and when it exits. A
+    scrape writes the answering worker's own snapshot and adds up those of the other workers of
+    its server, so theirs are at most `interval` seconds behind. The counters and histograms of
+    workers that have exited are folded into one <server id>-retired.json and their files deleted,
+    so totals do not go backwards when a worker is replaced and files do not pile up; gauges
+    count only workers that are alive and wrote within three intervals. Without a server id a
+    process is a server of its own. Files of servers whose master is gone are deleted.
+    """
+
+    thread_name = 'metrics-snapshots'
+
+    def __init__(self, registry, directory, interval=5.0, server_id=None):
+        super().__init__()
+        self.registry = registry
+        self.directory = directory
+        self.interval = interval
+        self.server_id = server_id
+        self._stopping = None
+        self._token = None
+        self._token_pid = None
+
+    def _process_token(self):
+        # Keeps a recycled pid from overwriting the counts of the worker that had it before
+        if self._token_pid != os.getpid():
+            self._token = uuid.uuid4().hex[:8]
+            self._token_pid = os.getpid()
+        return self._token
+
+    def _server(self):
+        return self.server_id or f'{os.getpid()}-{self._process_token()}'
+
+    def _path(self):
+        return os.path.join(self.directory, f'{self._server()}-{os.getpid()}-{self._process_token()}.json')
+
+    def _retired_path(self):
+        return os.path.join(self.directory, f'{self._server()}-retired.json')
+
+    def _prepare(self):
+        self._stopping = threading.Event()
+
+    def stop(self, timeout=5):
+        """Stop the thread and write a final snapshot, so the counts of an exiting worker are kept"""
+        if super().stop(timeout):
+            self.write_snapshot()
+            return True
+        return False
+
+    def _signal_stop(self, timeout):
+        self._stopping.set()
+        return True
+
+    def _run(self):
+        while not self._stopping.wait(self.interval):
+            try:
+                self.write_snapshot()
+            except Exception:
+                logger.exception('Writing the metrics snapshot failed')
+
+    def _write(self, path, value):
+        temporary = f'{path}.{os.getpid()}.tmp'
+        with open(temporary, 'w') as f:
+            json.dump(value, f)
+        os.replace(temporary, path)
+
+    @staticmethod
+    def _read(path):
+        try:
+            with open(path) as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def write_snapshot(self, collected=None):
+        os.makedirs(self.directory, exist_ok=True)
+        self._write(self._path(), self.registry.collect() if collected is None else collected)
+
+    @contextmanager
+    def _fold_lock(self):
+        """Exclusive across the server's workers, so an exited worker is folded in exactly once"""
+        if fcntl is None:
+            yield
+            return
+        fd = os.open(os.path.join(self.directory, '.lock'), os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.lockf(fd, fcntl.LOCK_EX)
+            yield
+        finally:
+            os.close(fd)
+
+    def _add(self, totals, snapshot, gauges):
+        """Sum a snapshot into totals ({metric name: {(sample name, labels): value}}), gauges only when asked"""
+        for metric_name, samples in snapshot.items():
+            metric = self.registry.get(metric_name)
+            if metric is None or (metric.type == 'gauge' and not gauges):
+                continue
+            metric_totals = totals.setdefault(metric_name, {})
+            for sample_name, labels, value in samples:
+                key = (sample_name, tuple(labels.items()))
+                metric_totals[key] = metric_totals.get(key, 0) + value
+
+    @staticmethod
+    def _samples(totals):
+        return {
+            metric_name: [(sample_name, dict(labels), value) for (sample_name, labels), value in metric_totals.items()]
+            for metric_name, metric_totals in totals.items()
+        }
+
+    def _fold(self, paths):
+        """Add exited workers' counters and histograms to the retired file, then delete their snapshots"""
+        with self._fold_lock():
+            totals = {}
+            self._add(totals, self._read(self._retired_path()) or {}, gauges=False)
+            folded = []
+            for path in paths:
+                # None when another worker folded it first
+                snapshot = self._read(path)
+                if snapshot is not None:
+                    self._add(totals, snapshot, gauges=False)
+                    folded.append(path)
+            if not folded:
+                return
+            self._write(self._retired_path(), self._samples(totals))
+            for path in folded:
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+
+    def _sibling_snapshots(self):
+        """(snapshot, whether its gauges count) of every other live worker of this server"""
+        server = self._server()
+        own = os.path.basename(self._path())
+        live, exited = [], []
+        for name in os.listdir(self.directory):
+            if not name.endswith('.json') or name == own:
+                continue
+            parts = name[:-len('.json')].split('-')
+            try:
+                master_pid = int(parts[0])
+                pid = int(parts[2]) if len(parts) == 4 else None
+            except (ValueError, IndexError):
+                continue
+            path = os.path.join(self.directory, name)
+            if '-'.join(parts[:2]) != server:
+                if not _is_alive(master_pid):
+                    try:
+                        os.remove(path)
+                    except FileNotFoundError:
+                        pass
+                continue
+            if pid is not None:
+                (live if _is_alive(pid) else exited).append(path)
+        if exited:
+            self._fold(exited)
+        for path in live:
+            try:
+                fresh = time.time() - os.path.getmtime(path) < 3 * self.interval
+            except FileNotFoundError:
+                continue
+            snapshot = self._read(path)
+            if snapshot is not None:
+                yield snapshot, fresh
+
+    def collect(self):
+        """Registry.collect() of this process plus the other live workers' snapshots and the retired totals"""
+        own = self.registry.collect()
+        self.write_snapshot(own)
+        totals = {name: {} for name in own}
+        self._add(totals, own, gauges=True)
+        for snapshot, fresh in self._sibling_snapshots():
+            self._add(totals, snapshot, gauges=fresh)
+        self._add(totals, self._read(self._retired_path()) or {}, gauges=False)
+        return self._samples(totals)
+
+REGISTRY = Registry()
+
+REQUEST_LATENCY = REGISTRY.register(Histogram(
+    'http_request_duration_seconds', 'Request latency by blueprint and route',
+    ('blueprint', 'route', 'method', 'status')
+))
+REQUEST_DB_TIME = REGISTRY.register(Histogram(
+    'http_request_db_seconds', 'Time spent in database queries per request',
+    ('blueprint', 'route')
+))
+REQUEST_DB_QUERIES = REGISTRY.register(Histogram(
+    'http_request_db_queries', 'Database queries per request',
+    ('blueprint', 'route'), buckets=(0, 1, 2, 5, 10, 20, 50, 100)
+))
+SPOTIFY_LATENCY = REGISTRY.register(Histogram(
+    'spotify_request_duration_seconds', 'Spotify API call latency by SpotifyService method',
+    ('method',)
+))
+SPOTIFY_ERRORS = REGISTRY.register(Counter(
+    'spotify_request_errors_total', 'Failed Spotify API calls (exceptions or non-2xx responses) by SpotifyService method',
+    ('method',)
+))
+
+# Outcome of the Spotify call being tracked in this context; its HTTP code reports the response status here
+_spotify_call = ContextVar('spotify_call', default=None)
+
+def record_spotify_status(status_code):
+    """Report the HTTP status of the tracked Spotify call's response; anything but 2xx counts as an error"""
+    outcome = _spotify_call.get()
+    if outcome is not None and not 200 <= status_code < 300:
+        outcome['error'] = f'Spotify returned HTTP {status_code}'
+
+def track_spotify_call(f):
+    """Record latency and a trace span for a Spotify HTTP call, and an error when it raises or gets a non-2xx response
+
+    The wrapped function reports its response status with record_spotify_status(). A None
+    result alone is not an error: search_artist returns None when nothing matches.
+    Works on the async client's coroutine functions too; they are recorded under the same names.
+    """
+    @contextmanager
+    def tracked():
+        started = time.perf_counter()
+        outcome = {'error': None}
+        token = _spotify_call.set(outcome)
+        try:
+            with span(f'spotify.{f.__name__}', 'client', **{'spotify.method': f.__name__}) as call_span:
+                try:
+                    yield
+                except Exception as e:
+                    outcome['error'] = str(e) or type(e).__name__
+                    raise
+                if outcome['error'] and call_span is not None:
+                    call_span.set_error(outcome['error'])
+        finally:
+            _spotify_call.reset(token)
+            SPOTIFY_LATENCY.observe(time.perf_counter() - started, f.__name__)
+            if outcome['error']:
+                SPOTIFY_ERRORS.inc(f.__name__)
+
+    if inspect.iscoroutinefunction(f):
+        @wraps(f)
+        async def async_wrapper(*args, **kwargs):
+            with tracked():
+                return await f(*args, **kwargs)
+        return async_wrapper
+
+    @wraps(f)
+    def wrapper(*args, **kwargs):
+        with tracked():
+            return f(*args, **kwargs)
+    return wrapper
+
+def install_metrics(app):
+    """Time every request and register scrape-time gauges for pools, replica routing and the click queue
+
+    With METRICS_MULTIPROCESS_DIR set, scrapes report the sum over the server's workers.
+    """
+    from app import db
+    from app.utils.replica import pool_status
+
+    @app.before_request
+    def start_request_timer():
+        g.metrics_started = time.perf_counter()
+
+    @app.after_request
+    def remember_status(response):
+        g.metrics_status = response.status_code
+        return response
+
+    @app.teardown_request
+    def observe_request(exc):
+        started = g.pop('metrics_started', None)
+        if started is None:
+            return
+        rule = request.url_rule.rule if request.url_rule else 'unmatched'
+        blueprint = request.blueprint or 'app'
+        status = g.pop('metrics_status', 500)
+        REQUEST_LATENCY.observe(time.perf_counter() - started, blueprint, rule, request.method, status)
+        summary = g.get('sql_summary')
+        if summary:
+            REQUEST_DB_TIME.observe(summary['duration'], blueprint, rule)
+            REQUEST_DB_QUERIES.observe(summary['count'], blueprint, rule)
+
+    def pool_metrics(key):
+        def collect():
+            with app.app_context():
+                pools = pool_status(db.engines)
+            for bind, stats in pools.items():
+                if key in stats:
+                    yield {'bind': bind}, stats[key]
+        return collect
+
+    for key, documentation in (
+        ('size', 'Configured connection pool size'),
+        ('checkedout', 'Connections currently checked out'),
+        ('checkedin', 'Idle connections in the pool'),
+        ('overflow', 'Connections beyond the pool size (negative while under it)')
+    ):
+        REGISTRY.register(Gauge(f'db_pool_{key}', documentation, pool_metrics(key)))
+
+    def click_queue_depth():
+        writer = app.extensions.get('sqlite_writer')
+        yield {}, writer.depth() if writer else 0
+
+    REGISTRY.register(Gauge('click_ingest_queue_depth', 'Profile clicks waiting for the background writer', click_queue_depth))
+
+    def replica_routing():
+        router = app.extensions.get('replica_router')
+        if router:
+            for decision, count in router.status()['routing'].items():
+                yield {'decision': decision}, count
+
+    REGISTRY.register(Gauge('db_replica_routing_total', 'Read routing decisions for @use_replica views', replica_routing, metric_type='counter'))
+
+    if app.config['METRICS_MULTIPROCESS_DIR']:
+        app.extensions['metrics_snapshots'] = MultiProcessCollector(
+            REGISTRY,
+            app.config['METRICS_MULTIPROCESS_DIR'],
+            interval=app.config['METRICS_SNAPSHOT_INTERVAL'],
+            server_id=app.config['METRICS_SERVER_ID']
+        )
@@ -0,0 +1,36 @@
+import base64
+import json
+from datetime import datetime
+from sqlalchemy import tuple_
+
+def encode_cursor(created_at, row_id):
+    """Encode a (created_at, id) keyset position as an opaque cursor string"""
+    payload = json.dumps([created_at.isoformat(), row_id], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+def decode_cursor(cursor):
+    """Decode an opaque cursor back into (created_at, id), or None if it is malformed"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        created_at, row_id = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+        if not isinstance(row_id, int):
+            return None
+        return datetime.fromisoformat(created_at), row_id
+    except (ValueError, TypeError):
+        return None
+
+def after_cursor(position, *columns):
+    """Keyset predicate for rows after `position` in (columns...) order
+
+    A row-value comparison lets the database seek the matching composite index; the
+    equivalent `a > x OR (a = x AND b > y)` is planned as a scan of the whole index.
+    """
+    return tuple_(*columns) > tuple_(*position)
+
+def escape_like(value, escape_char='\\'):
+    """Escape LIKE wildcards so user input is matched literally"""
+    return (
+        value.replace(escape_char, escape_char * 2)
+        .replace('%', f'{escape_char}%')
+        .replace('_', f'{escape_char}_')
+    )
@@ -0,0 +1,173 @@
+import logging
+import os
+import threading
+import time
+import weakref
+from app.utils.background import BackgroundThread
+
+try:
+    import fcntl
+except ImportError:
+    # Windows: no record locks, and no pre-fork servers to elect a leader among
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Apps whose engines are disposed in every forked child
+_fork_safe_apps = weakref.WeakSet()
+
+# Per-worker background threads (BackgroundThread subclasses), by app.extensions key
+WORKER_SERVICES = ('log_sink', 'sqlite_writer', 'tracing', 'traffic_capture', 'metrics_snapshots', 'leader_scheduler')
+
+def dispose_engines(app, close=True):
+    """Drop the pooled connections of every engine of the app (default bind, replica and any others)
+
+    With close=False the connections are forgotten without being closed. That is what a forked
+    child needs: the sockets still belong to the parent, and closing or reusing them from the
+    child would break the parent's sessions on them.
+    """
+    from app import db
+
+    with app.app_context():
+        engines = list(db.engines.values())
+    for engine in engines:
+        engine.dispose(close=close)
+
+def _dispose_engines_in_child():
+    for app in list(_fork_safe_apps):
+        dispose_engines(app, close=False)
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_dispose_engines_in_child)
+
+def install_fork_safety(app):
+    """Give every process forked from this one (pre-fork workers) connection pools of its own
+
+    The SQLite writer and the replica router use the same engines, so they start from empty
+    pools too; their threads and queues are already recreated per process on first use.
+    """
+    _fork_safe_apps.add(app)
+
+def start_worker_services(app):
+    """Start the app's background threads in a new worker process
+
+    Each also starts on first use, but starting them here keeps the first requests a worker
+    serves from paying for it, and moves log records off the queue inherited from the master
+    before the worker logs anything. Call it from the server's post-fork or startup hook.
+    """
+    for name in WORKER_SERVICES:
+        service = app.extensions.get(name)
+        if service is not None:
+            service.ensure_started()
+
+class LeaderScheduler(BackgroundThread):
+    """Runs periodic jobs in exactly one of the server's worker processes
+
+    Every worker runs the thread, but only the one holding an exclusive lock on lock_path runs
+    the jobs; the others retry the lock every poll_interval seconds. It is a POSIX record lock,
+    which the kernel releases when its process exits or is killed and which forked children do
+    not inherit, so a worker replaced by the server hands leadership to another within one poll.
+    """
+
+    thread_name = 'leader-scheduler'
+
+    def __init__(self, app, lock_path, poll_interval=5.0):
+        super().__init__()
+        self.app = app
+        self.lock_path = lock_path
+        self.poll_interval = poll_interval
+        self.jobs = []
+        self._lock_fd = None
+        self._stopping = None
+
+    def add_job(self, name, interval, func):
+        """Run func() in an app context every `interval` seconds (at most every poll_interval) while this process leads"""
+        self.jobs.append({'name': name, 'interval': interval, 'func': func, 'next_run': None})
+
+    @property
+    def is_leader(self):
+        return self.started and self._lock_fd is not None
+
+    def ensure_started(self):
+        if self.jobs:
+            super().ensure_started()
+
+    def _prepare(self):
+        # A forked child holds no lock of its own; the inherited descriptor is the parent's
+        if self._lock_fd is not None:
+            os.close(self._lock_fd)
+            self._lock_fd = None
+        self._stopping = threading.Event()
+
+    def stop(self, timeout=5):
+        """Stop the thread and give up leadership"""
+        if not super().stop(timeout):
+            return False
+        if self._lock_fd is not None:
+            os.close(self._lock_fd)
+            self._lock_fd = None
+        return True
+
+    def _signal_stop(self, timeout):
+        self._stopping.set()
+        return True
+
+    def _run(self):
+        while not self._stopping.is_set():
+            if self._lock_fd is None:
+                self._try_lead()
+            if self._lock_fd is not None:
+                self._run_due_jobs()
+            self._stopping.wait(self.poll_interval)
+
+    def _try_lead(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.lock_path)), exist_ok=True)
+        fd = os.open(self.lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.lockf(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(fd)
+            return
+        os.ftruncate(fd, 0)
+        os.write(fd, f'{os.getpid()}\n'.encode())
+        self._lock_fd = fd
+        # A new leader waits a full interval, so restarting every worker does not rerun each job at once
+        now = time.monotonic()
+        for job in self.jobs:
+            job['next_run'] = now + job['interval']
+        logger.info(f'Worker {os.getpid()} is the leader for scheduled jobs')
+
+    def _run_due_jobs(self):
+        for job in self.jobs:
+            if time.monotonic() < job['next_run']:
+                continue
+            try:
+                with self.app.app_context():
+                    job['func']()
+            except Exception:
+                logger.exception(f"Scheduled job {job['name']} failed")
+            job['next_run'] = time.monotonic() + job['interval']
+
+def install_leader_scheduler(app):
+    """Register the jobs that run once per deployment rather than once per worker
+
+    Nothing runs until a server hook calls start_worker_services(); the dev server and
+    scripts never start it. Without fcntl (Windows) there is no scheduler.
+    """
+    if fcntl is None:
+        return
+    scheduler = LeaderScheduler(app, app.config['LEADER_LOCK_FILE'], poll_interval=app.config['LEADER_POLL_INTERVAL'])
+    if app.config['AVATAR_GC_INTERVAL_SECONDS']:
+        from app.services import AvatarService
+        scheduler.add_job(
+            'collect_avatar_garbage',
+            app.config['AVATAR_GC_INTERVAL_SECONDS'],
+            lambda: AvatarService.collect_garbage(sweep_orphans=True)
+        )
+    from app.services import UserDeletionService
+    scheduler.add_job(
+        'resume_abandoned_deletions',
+        app.config['USER_DELETE_JOB_STALE_SECONDS'],
+        UserDeletionService.resume_abandoned_jobs
+    )
+    app.extensions['leader_scheduler'] = scheduler
@@ -0,0 +1,273 @@
+import json
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+from flask import g, request
+
+try:
+    import fcntl
+except ImportError:
+    # Windows: no record locks; the thread lock is enough for the single process it runs there
+    fcntl = None
+
+class RequestProfiler:
+    """Statistical profiler for selected live requests
+
+    Admins arm it for one endpoint (or all) with a sample rate and a request budget. While a
+    chosen request runs, one shared sampler thread records that thread's Python stack every
+    interval; the result is kept as collapsed stacks ("a;b;c count", the input format of
+    flamegraph.pl and speedscope).
+
+    The rule and the profiles live in `directory`, so every worker process of the server obeys
+    the same rule, spends the same budget and serves the same profiles, whichever one answers
+    the admin's requests. Workers notice a new rule within rule_poll_interval seconds; with
+    nothing armed, the request hooks only check a cached None.
+    """
+
+    def __init__(self, directory, interval=0.005, max_profiles=50, rule_poll_interval=1.0):
+        self.directory = directory
+        self.profiles_directory = os.path.join(directory, 'profiles')
+        self.rule_path = os.path.join(directory, 'rule.json')
+        self.interval = interval
+        self.max_profiles = max_profiles
+        self.rule_poll_interval = rule_poll_interval
+        self._lock = threading.Lock()
+        self._rule = None
+        self._rule_version = None
+        self._rule_checked = None
+        self._reset()
+
+    def _reset(self):
+        # Called again after fork: the sampler thread does not survive it
+        self._pid = os.getpid()
+        self._active = {}
+        self._wakeup = threading.Event()
+        self._thread = None
+
+    def _ensure_sampler(self):
+        if self._pid != os.getpid():
+            self._reset()
+        if not (self._thread and self._thread.is_alive()):
+            self._thread = threading.Thread(target=self._run, name='request-profiler', daemon=True)
+            self._thread.start()
+
+    @contextmanager
+    def _shared_lock(self):
+        """Exclusive across threads and worker processes, for read-modify-write of the stored state"""
+        os.makedirs(self.profiles_directory, exist_ok=True)
+        with self._lock:
+            if fcntl is None:
+                yield
+                return
+            fd = os.open(os.path.join(self.directory, '.lock'), os.O_RDWR | os.O_CREAT, 0o644)
+            try:
+                fcntl.lockf(fd, fcntl.LOCK_EX)
+                yield
+            finally:
+                os.close(fd)
+
+    def _write_json(self, path, value):
+        temporary = f'{path}.{os.getpid()}.tmp'
+        with open(temporary, 'w') as f:
+            json.dump(value, f)
+        os.replace(temporary, path)
+
+    def _read_rule(self):
+        try:
+            with open(self.rule_path) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def _store_rule(self, rule):
+        """Write (or with None remove) the rule; call with the shared lock held"""
+        if rule is None:
+            try:
+                os.remove(self.rule_path)
+            except FileNotFoundError:
+                pass
+        else:
+            self._write_json(self.rule_path, rule)
+        self._rule = rule
+        self._rule_checked = None
+
+    def _current_rule(self):
+        """The stored rule, re-read when the file changed and at most every rule_poll_interval seconds"""
+        now = time.monotonic()
+        if self._rule_checked is not None and now - self._rule_checked < self.rule_poll_interval:
+            return self._rule
+        try:
+            stat = os.stat(self.rule_path)
+            version = (stat.st_ino, stat.st_mtime_ns)
+        except FileNotFoundError:
+            version = None
+        if version != self._rule_version:
+            self._rule = self._read_rule() if version else None
+            self._rule_version = version
+        self._rule_checked = now
+        return self._rule
+
+    def arm(self, endpoint=None, sample_rate=1.0, count=10):
+        """Profile up to count requests to endpoint (None for any), each with probability sample_rate"""
+        with self._shared_lock():
+            self._store_rule({'endpoint': endpoint, 'sample_rate': sample_rate, 'remaining': count})
+
+    def disarm(self):
+        with self._shared_lock():
+            self._store_rule(None)
+
+    def should_profile(self, endpoint):
+        """Whether to profile this request; consumes one unit of the shared budget when it says yes"""
+        rule = self._current_rule()
+        if rule is None:
+            return False
+        if rule['endpoint'] is not None and rule['endpoint'] != endpoint:
+            return False
+        if rule['sample_rate'] < 1 and random.random() >= rule['sample_rate']:
+            return False
+        with self._shared_lock():
+            # Another worker may have spent the budget or replaced the rule since it was cached
+            rule = self._read_rule()
+            if rule is None or (rule['endpoint'] is not None and rule['endpoint'] != endpoint):
+                self._rule_checked = None
+                return False
+            rule['remaining'] -= 1
+            self._store_rule(rule if rule['remaining'] else None)
+        return True
+
+    def start(self):
+        """Begin sampling the calling thread"""
+        thread_id = threading.get_ident()
+        with self._lock:
+            self._ensure_sampler()
+            self._active[thread_id] = Counter()
+            self._wakeup.set()
+        return time.perf_counter()
+
+    def stop(self, started, **details):
+        """Stop sampling the calling thread and store the profile"""
+        with self._lock:
+            stacks = self._active.pop(threading.get_ident(), Counter())
+            if not self._active:
+                self._wakeup.clear()
+        profile = {
+            'id': uuid.uuid4().hex[:12],
+            'recorded_at': datetime.utcnow().isoformat(),
+            'duration_ms': round((time.perf_counter() - started) * 1000, 2),
+            'interval_ms': self.interval * 1000,
+            'samples': sum(stacks.values()),
+            **details,
+            'stacks': stacks
+        }
+        with self._shared_lock():
+            self._write_json(os.path.join(self.profiles_directory, f"{time.time_ns()}-{profile['id']}.json"), profile)
+            # Oldest first by name; beyond max_profiles they are dropped
+            for name in self._profile_files()[:-self.max_profiles]:
+                os.remove(os.path.join(self.profiles_directory, name))
+        return profile
+
+    def _profile_files(self):
+        try:
+            return sorted(name for name in os.listdir(self.profiles_directory) if name.endswith('.json'))
+        except FileNotFoundError:
+            return []
+
+    def _load_profile(self, name):
+        try:
+            with open(os.path.join(self.profiles_directory, name)) as f:
+                profile = json.load(f)
+        except FileNotFoundError:
+            # Dropped by another worker since the directory was listed
+            return None
+        profile['stacks'] = Counter(profile['stacks'])
+        return profile
+
+    def _run(self):
+        sampler_id = threading.get_ident()
+        while True:
+            self._wakeup.wait()
+            frames = sys._current_frames()
+            with self._lock:
+                for thread_id, stacks in self._active.items():
+                    frame = frames.get(thread_id)
+                    if frame is not None and thread_id != sampler_id:
+                        stacks[self.collapse(frame)] += 1
+            del frames
+            time.sleep(self.interval)
+
+    @staticmethod
+    def collapse(frame):
+        """Root-to-leaf stack as 'function (file:line);...' with the function's first line"""
+        names = []
+        while frame is not None:
+            code = frame.f_code
+            names.append(f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})')
+            frame = frame.f_back
+        return ';'.join(reversed(names))
+
+    def status(self):
+        """Current rule and stored profiles (without their stacks); active_requests counts this worker's only"""
+        rule = self._read_rule()
+        profiles = []
+        for name in reversed(self._profile_files()):
+            profile = self._load_profile(name)
+            if profile is not None:
+                profiles.append({key: value for key, value in profile.items() if key != 'stacks'})
+        with self._lock:
+            active = len(self._active)
+        return {
+            'armed': rule,
+            'active_requests': active,
+            'interval_ms': self.interval * 1000,
+            'max_profiles': self.max_profiles,
+            'profiles': profiles
+        }
+
+    def get(self, profile_id):
+        for name in self._profile_files():
+            if name.endswith(f'-{profile_id}.json'):
+                return self._load_profile(name)
+        return None
+
+    @staticmethod
+    def to_collapsed(profile):
+        """Collapsed-stack text, one 'stack count' line per distinct stack"""
+        return ''.join(f'{stack} {count}\n' for stack, count in profile['stacks'].most_common())
+
+def install_profiler(app):
+    """Register the profiler and its request hooks (only when PROFILER_ENABLED)"""
+    profiler = RequestProfiler(
+        app.config['PROFILER_DIR'],
+        interval=app.config['PROFILER_INTERVAL_MS'] / 1000,
+        max_profiles=app.config['PROFILER_MAX_PROFILES']
+    )
+    app.extensions['profiler'] = profiler
+
+    @app.before_request
+    def start_profiling():
+        if profiler.should_profile(request.endpoint):
+            g.profiler_started = profiler.start()
+
+    @app.after_request
+    def remember_status(response):
+        if 'profiler_started' in g:
+            g.profiler_status = response.status_code
+        return response
+
+    @app.teardown_request
+    def stop_profiling(exc):
+        started = g.pop('profiler_started', None)
+        if started is not None:
+            profiler.stop(
+                started,
+                endpoint=request.endpoint,
+                method=request.method,
+                path=request.path,
+                status=g.pop('profiler_status', 500)
+            )
@@ -0,0 +1,173 @@
+import logging
+import sys
+import threading
+import time
+from flask import g, has_request_context, request
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+class RecordedQuery:
+    """One statement executed during a request"""
+
+    __slots__ = ('statement', 'parameters', 'duration', 'location')
+
+    def __init__(self, statement, parameters, duration, location):
+        self.statement = statement
+        self.parameters = parameters
+        self.duration = duration
+        self.location = location
+
+def query_location():
+    """file:line (function) of the innermost app.* frame that led to the statement"""
+    frame = sys._getframe(1)
+    while frame is not None:
+        name = frame.f_globals.get('__name__') or ''
+        if (name == 'app' or name.startswith('app.')) and name != __name__:
+            return f'{frame.f_code.co_filename}:{frame.f_lineno} ({frame.f_code.co_name})'
+        frame = frame.f_back
+    return '<unknown>'
+
+def install_query_recording(engine):
+    """Append every statement run inside a request to g.sql_queries"""
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def start_query_timer(conn, cursor, statement, parameters, context, executemany):
+        if context is not None and has_request_context():
+            context._query_started = time.perf_counter()
+
+    @event.listens_for(engine, 'after_cursor_execute')
+    def record_query(conn, cursor, statement, parameters, context, executemany):
+        started = getattr(context, '_query_started', None)
+        if started is None or not has_request_context():
+            return
+        duration = time.perf_counter() - started
+        if 'sql_queries' not in g:
+            g.sql_queries = []
+        g.sql_queries.append(RecordedQuery(statement, parameters, duration, query_location()))
+
+def redact_parameters(parameters):
+    """Replace bound values with their type names so logs never contain user data"""
+    if isinstance(parameters, dict):
+        return {key: f'<{type(value).__name__}>' for key, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        if parameters and isinstance(parameters[0], (list, tuple, dict)):
+            # Rows of parameters (executemany): describe the first row and how many there were
+            if len(parameters) == 1:
+                return redact_parameters(parameters[0])
+            return f'{len(parameters)} x {redact_parameters(parameters[0])}'
+        return tuple(f'<{type(value).__name__}>' for value in parameters)
+    return f'<{type(parameters).__name__}>'
+
+def summarize_queries(queries, n_plus_one_threshold):
+    """Count, total time and repeated-statement patterns for one request's recorded queries"""
+    patterns = {}
+    for query in queries:
+        pattern = patterns.setdefault(query.statement, {'count': 0, 'parameters': set(), 'location': query.location})
+        pattern['count'] += 1
+        pattern['parameters'].add(repr(query.parameters))
+
+    # The same SELECT issued again and again with different values is the N+1 signature
+    n_plus_one = [
+        {'statement': statement, 'count': pattern['count'], 'location': pattern['location']}
+        for statement, pattern in patterns.items()
+        if pattern['count'] >= n_plus_one_threshold
+        and len(pattern['parameters']) > 1
+        and statement.lstrip().upper().startswith('SELECT')
+    ]
+
+    return {
+        'count': len(queries),
+        'duration': sum(query.duration for query in queries),
+        'duplicates': sum(pattern['count'] - 1 for pattern in patterns.values()),
+        'n_plus_one': n_plus_one
+    }
+
+class QueryStats:
+    """Per-endpoint query counters aggregated across requests in this process"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._endpoints = {}
+
+    def record(self, endpoint, summary, slow_queries):
+        with self._lock:
+            stats = self._endpoints.setdefault(endpoint, {
+                'requests': 0,
+                'queries': 0,
+                'db_time_seconds': 0.0,
+                'max_queries': 0,
+                'duplicate_queries': 0,
+                'n_plus_one_requests': 0,
+                'slow_queries': 0
+            })
+            stats['requests'] += 1
+            stats['queries'] += summary['count']
+            stats['db_time_seconds'] += summary['duration']
+            stats['max_queries'] = max(stats['max_queries'], summary['count'])
+            stats['duplicate_queries'] += summary['duplicates']
+            stats['n_plus_one_requests'] += bool(summary['n_plus_one'])
+            stats['slow_queries'] += slow_queries
+
+    def snapshot(self):
+        """Copy of the counters with per-request averages"""
+        with self._lock:
+            endpoints = {endpoint: dict(stats) for endpoint, stats in self._endpoints.items()}
+        for stats in endpoints.values():
+            stats['avg_queries'] = round(stats['queries'] / stats['requests'], 2)
+            stats['avg_db_time_ms'] = round(stats['db_time_seconds'] * 1000 / stats['requests'], 3)
+            stats['db_time_seconds'] = round(stats['db_time_seconds'], 6)
+        return endpoints
+
+    def reset(self):
+        with self._lock:
+            self._endpoints.clear()
+
+def install_query_instrumentation(app):
+    """Summarize each request's SQL: slow-query and N+1 logging, counters, and dev response headers"""
+    from app import db
+
+    with app.app_context():
+        for engine in db.engines.values():
+            install_query_recording(engine)
+
+    stats = QueryStats()
+    app.extensions['query_stats'] = stats
+    slow_query_seconds = app.config['SQL_SLOW_QUERY_MS'] / 1000
+    n_plus_one_threshold = app.config['SQL_N_PLUS_ONE_THRESHOLD']
+    debug_headers = app.config['SQL_DEBUG_HEADERS']
+    if debug_headers is None:
+        debug_headers = app.debug
+
+    @app.after_request
+    def record_request_queries(response):
+        queries = g.pop('sql_queries', [])
+        if not queries:
+            g.sql_summary = {'count': 0, 'duration': 0.0, 'duplicates': 0, 'n_plus_one': []}
+            return response
+
+        endpoint = request.endpoint or 'unknown'
+        summary = summarize_queries(queries, n_plus_one_threshold)
+        # Also read by the request metrics
+        g.sql_summary = summary
+
+        slow_queries = [query for query in queries if query.duration >= slow_query_seconds]
+        for query in slow_queries:
+            logger.warning(
+                f'Slow query ({query.duration * 1000:.1f} ms) in {endpoint} at {query.location}: '
+                f'{query.statement} params={redact_parameters(query.parameters)}'
+            )
+        for pattern in summary['n_plus_one']:
+            logger.warning(
+                f"Possible N+1 in {endpoint}: {pattern['count']} executions at {pattern['location']}: "
+                f"{pattern['statement']}"
+            )
+
+        stats.record(endpoint, summary, len(slow_queries))
+
+        if debug_headers:
+            response.headers['X-DB-Query-Count'] = str(summary['count'])
+            response.headers['X-DB-Time-Ms'] = f"{summary['duration'] * 1000:.2f}"
+            response.headers['X-DB-Duplicate-Queries'] = str(summary['duplicates'])
+            response.headers['X-DB-N-Plus-One'] = str(len(summary['n_plus_one']))
+        return response
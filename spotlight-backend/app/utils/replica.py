@@ -0,0 +1,205 @@
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+from flask import current_app, g, has_app_context, has_request_context
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event, text
+
+REPLICA_BIND = 'replica'
+
+class ReplicaRouter:
+    """Decides whether a read may go to the replica bind, with lag-aware fallback to the primary"""
+
+    # Postgres standby lag in seconds; 0 when caught up or when the bind is not a standby
+    POSTGRES_LAG_SQL = text(
+        "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+        "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END"
+    )
+
+    def __init__(self, engine, max_lag_seconds=5.0, check_interval=2.0, read_your_writes_seconds=10.0):
+        self.engine = engine
+        self.max_lag_seconds = max_lag_seconds
+        self.check_interval = check_interval
+        self.read_your_writes_seconds = read_your_writes_seconds
+        self._lock = threading.Lock()
+        self._checking = False
+        self._last_check = 0.0
+        self._healthy = True
+        self._lag = 0.0
+        self._last_error = None
+        self._recent_writers = {}
+        self._counters = {
+            'replica_reads': 0,
+            'primary_fallback_lag': 0,
+            'primary_fallback_unavailable': 0,
+            'primary_fallback_read_your_writes': 0
+        }
+
+    def _count(self, name):
+        with self._lock:
+            self._counters[name] += 1
+
+    def _check(self):
+        """Refresh replica health at most once per check_interval; other threads use the cached result"""
+        with self._lock:
+            if self._checking or time.monotonic() - self._last_check < self.check_interval:
+                return
+            self._checking = True
+        try:
+            with self.engine.connect() as connection:
+                if self.engine.dialect.name == 'postgresql':
+                    lag = float(connection.execute(self.POSTGRES_LAG_SQL).scalar() or 0)
+                else:
+                    connection.execute(text('SELECT 1'))
+                    lag = 0.0
+            healthy, error = True, None
+        except Exception as e:
+            lag, healthy, error = None, False, str(e)
+        with self._lock:
+            self._lag = lag
+            self._healthy = healthy
+            self._last_error = error
+            self._last_check = time.monotonic()
+            self._checking = False
+
+    def note_write(self, identity):
+        """Remember that a user just wrote, so their next reads stay on the primary"""
+        now = time.monotonic()
+        with self._lock:
+            self._recent_writers[identity] = now
+            if len(self._recent_writers) > 10000:
+                cutoff = now - self.read_your_writes_seconds
+                self._recent_writers = {k: v for k, v in self._recent_writers.items() if v >= cutoff}
+
+    def choose(self, identity=None):
+        """Return True to read from the replica for this request, False to stay on the primary"""
+        if identity is not None:
+            with self._lock:
+                wrote_at = self._recent_writers.get(identity)
+            if wrote_at and time.monotonic() - wrote_at < self.read_your_writes_seconds:
+                self._count('primary_fallback_read_your_writes')
+                return False
+
+        self._check()
+        with self._lock:
+            healthy, lag = self._healthy, self._lag
+        if not healthy:
+            self._count('primary_fallback_unavailable')
+            return False
+        if lag is not None and lag > self.max_lag_seconds:
+            self._count('primary_fallback_lag')
+            return False
+
+        self._count('replica_reads')
+        return True
+
+    def status(self):
+        """Health, lag and routing counters for metrics"""
+        with self._lock:
+            return {
+                'healthy': self._healthy,
+                'lag_seconds': self._lag,
+                'max_lag_seconds': self.max_lag_seconds,
+                'last_error': self._last_error,
+                'routing': dict(self._counters)
+            }
+
+def request_identity():
+    """JWT identity of the current request if a token was verified, else None"""
+    jwt_data = g.get('_jwt_extended_jwt') if has_request_context() else None
+    if not jwt_data:
+        return None
+    return jwt_data.get(current_app.config.get('JWT_IDENTITY_CLAIM', 'sub'))
+
+def use_replica(f):
+    """Route this view's SELECTs to the replica bind when it is configured, healthy and caught up"""
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        router = current_app.extensions.get('replica_router')
+        if router is not None:
+            try:
+                from flask_jwt_extended import verify_jwt_in_request
+                verify_jwt_in_request(optional=True)
+            except Exception:
+                pass  # Anonymous or invalid token: no read-your-writes pinning needed
+            g.db_use_replica = router.choose(request_identity())
+        return f(*args, **kwargs)
+    return decorated_function
+
+@contextmanager
+def primary():
+    """Force reads inside the block onto the primary (e.g. dedupe checks against fresh writes)"""
+    previous = g.get('db_use_replica', False) if has_request_context() else False
+    if has_request_context():
+        g.db_use_replica = False
+    try:
+        yield
+    finally:
+        if has_request_context():
+            g.db_use_replica = previous
+
+class RoutingSession(Session):
+    """Flask-SQLAlchemy session that sends plain SELECTs to the replica inside @use_replica views"""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if (
+            bind is None
+            and not self._flushing
+            and has_request_context()
+            and g.get('db_use_replica')
+            and getattr(clause, 'is_select', False)
+        ):
+            engine = self._db.engines.get(REPLICA_BIND)
+            if engine is not None:
+                return engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+_read_your_writes_installed = False
+
+def install_read_your_writes(session):
+    """Pin a user's reads to the primary for a short while after they commit a write"""
+    global _read_your_writes_installed
+    if _read_your_writes_installed:
+        return
+    _read_your_writes_installed = True
+
+    @event.listens_for(session, 'after_flush')
+    def mark_write(orm_session, flush_context):
+        orm_session.info['replica_wrote'] = True
+
+    @event.listens_for(session, 'do_orm_execute')
+    def mark_bulk_write(orm_execute_state):
+        if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+            orm_execute_state.session.info['replica_wrote'] = True
+
+    @event.listens_for(session, 'after_commit')
+    def note_write(orm_session):
+        if not orm_session.info.pop('replica_wrote', False) or not has_app_context():
+            return
+        router = current_app.extensions.get('replica_router')
+        identity = request_identity()
+        if router is not None and identity is not None:
+            router.note_write(identity)
+
+    @event.listens_for(session, 'after_rollback')
+    def clear_write(orm_session):
+        orm_session.info.pop('replica_wrote', None)
+
+def pool_status(engines):
+    """Connection pool statistics for every bind"""
+    stats = {}
+    for bind_key, engine in engines.items():
+        pool = engine.pool
+        entry = {
+            'bind': bind_key or 'primary',
+            'url': engine.url.render_as_string(hide_password=True),
+            'pool_class': type(pool).__name__,
+            'status': pool.status()
+        }
+        for metric in ('size', 'checkedin', 'checkedout', 'overflow'):
+            method = getattr(pool, metric, None)
+            if callable(method):
+                entry[metric] = method()
+        stats[bind_key or 'primary'] = entry
+    return stats
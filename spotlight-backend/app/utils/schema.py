@@ -0,0 +1,16 @@
+import os
+from flask_migrate import stamp, upgrade
+from sqlalchemy import inspect
+from app import db
+
+MIGRATIONS_DIRECTORY = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), 'migrations')
+
+# Schema that db.create_all() produced before migrations were tracked
+BASELINE_REVISION = '0001_baseline'
+
+def upgrade_database():
+    """Apply pending migrations, first stamping databases built by db.create_all() at the baseline"""
+    tables = inspect(db.engine).get_table_names()
+    if 'users' in tables and 'alembic_version' not in tables:
+        stamp(directory=MIGRATIONS_DIRECTORY, revision=BASELINE_REVISION)
+    upgrade(directory=MIGRATIONS_DIRECTORY)
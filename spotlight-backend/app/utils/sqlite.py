@@ -0,0 +1,157 @@
+import logging
+import queue
+import sqlite3
+import threading
+from flask import current_app, has_app_context
+from sqlalchemy import event
+from app.utils.background import BackgroundThread
+
+logger = logging.getLogger(__name__)
+
+def is_sqlite_uri(uri):
+    """Whether a database URI points at SQLite"""
+    return bool(uri) and uri.startswith('sqlite')
+
+def is_file_sqlite_uri(uri):
+    """Whether a database URI points at an on-disk SQLite file (WAL needs a file)"""
+    return is_sqlite_uri(uri) and ':memory:' not in uri and uri not in ('sqlite://', 'sqlite:///')
+
+def configure_sqlite_engine(engine, config):
+    """Apply per-connection PRAGMAs to a SQLite engine through its connect event"""
+    concurrent = config.get('SQLITE_CONCURRENT_MODE', False) and is_file_sqlite_uri(str(engine.url))
+
+    @event.listens_for(engine, 'connect')
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        if not isinstance(dbapi_connection, sqlite3.Connection):
+            return
+        cursor = dbapi_connection.cursor()
+        # SQLite ignores ON DELETE CASCADE unless foreign keys are enabled per connection
+        cursor.execute('PRAGMA foreign_keys=ON')
+        if concurrent:
+            # Readers no longer block on the writer (and vice versa) in WAL mode
+            cursor.execute('PRAGMA journal_mode=WAL')
+            cursor.execute(f"PRAGMA busy_timeout={int(config['SQLITE_BUSY_TIMEOUT_MS'])}")
+            cursor.execute(f"PRAGMA synchronous={config['SQLITE_SYNCHRONOUS']}")
+            cursor.execute(f"PRAGMA mmap_size={int(config['SQLITE_MMAP_SIZE'])}")
+            cursor.execute(f"PRAGMA cache_size={int(config['SQLITE_CACHE_SIZE'])}")
+        cursor.close()
+
+    return concurrent
+
+class SQLiteWriter(BackgroundThread):
+    """Single background writer for fire-and-forget inserts (e.g. profile clicks)
+
+    Request threads enqueue (statement, params) pairs and return immediately. One thread
+    drains the queue and applies batches in a single transaction, holding the process-wide
+    write lock so it never competes with request-thread writes for SQLite's lock.
+    """
+
+    thread_name = 'sqlite-writer'
+
+    def __init__(self, engine, write_lock, batch_size=500, flush_interval=0.05, max_queue_size=10000):
+        super().__init__()
+        self.engine = engine
+        self.write_lock = write_lock
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_queue_size = max_queue_size
+        self._queue = None
+        self._stopping = None
+
+    def _prepare(self):
+        self._queue = queue.Queue(maxsize=self.max_queue_size)
+        self._stopping = threading.Event()
+
+    def submit(self, statement, params):
+        """Queue a write; runs it inline if the queue is full so writes are never dropped"""
+        self.ensure_started()
+        try:
+            self._queue.put_nowait((statement, params))
+        except queue.Full:
+            self._write([(statement, params)])
+
+    def depth(self):
+        """Number of writes waiting to be applied"""
+        return self._queue.qsize() if self.started else 0
+
+    def flush(self):
+        """Block until every queued write has been applied"""
+        if self.started and self._thread.is_alive():
+            self._queue.join()
+
+    def _signal_stop(self, timeout):
+        # Outstanding writes are applied before the thread sees the event with an empty queue
+        if not self._thread.is_alive():
+            return False
+        self._stopping.set()
+        self._queue.join()
+        return True
+
+    def _run(self):
+        while not (self._stopping.is_set() and self._queue.empty()):
+            try:
+                batch = [self._queue.get(timeout=self.flush_interval)]
+            except queue.Empty:
+                continue
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self._write(batch)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def _write(self, batch):
+        # Group identical statements so each becomes one executemany
+        grouped = {}
+        for statement, params in batch:
+            grouped.setdefault(statement, []).append(params)
+        try:
+            with self.write_lock:
+                with self.engine.begin() as connection:
+                    for statement, params_list in grouped.items():
+                        connection.execute(statement, params_list)
+        except Exception as e:
+            logger.error(f'SQLite writer failed to apply {len(batch)} writes: {e}')
+
+_session_write_lock_installed = False
+
+def install_session_write_lock(session):
+    """Serialize request-thread writes behind the app's process-wide SQLite write lock
+
+    The lock (app.extensions['sqlite_write_lock']) is taken at the first flush or ORM bulk
+    write of a transaction and released when that transaction ends, so at most one thread
+    holds SQLite's write lock and the others wait in Python instead of failing with
+    "database is locked". Apps without the extension are unaffected.
+    """
+    global _session_write_lock_installed
+    if _session_write_lock_installed:
+        return
+    _session_write_lock_installed = True
+
+    def acquire(orm_session):
+        if orm_session.info.get('sqlite_write_lock') or not has_app_context():
+            return
+        write_lock = current_app.extensions.get('sqlite_write_lock')
+        if write_lock:
+            write_lock.acquire()
+            orm_session.info['sqlite_write_lock'] = write_lock
+
+    @event.listens_for(session, 'before_flush')
+    def lock_before_flush(orm_session, flush_context, instances):
+        acquire(orm_session)
+
+    @event.listens_for(session, 'do_orm_execute')
+    def lock_before_bulk_write(orm_execute_state):
+        if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+            acquire(orm_execute_state.session)
+
+    @event.listens_for(session, 'after_transaction_end')
+    def unlock_after_transaction(orm_session, transaction):
+        if transaction.parent is None:
+            write_lock = orm_session.info.pop('sqlite_write_lock', None)
+            if write_lock:
+                write_lock.release()
@@ -0,0 +1,266 @@
+import os
+import shutil
+import uuid
+from abc import ABC, abstractmethod
+from werkzeug.utils import import_string
+
+# Avatar files are named after their content, so every copy anywhere can be cached forever
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+CHUNK_SIZE = 64 * 1024
+
+class AvatarStorage(ABC):
+    """Backend interface for avatar files and pending direct uploads
+
+    Files are addressed by flat names ('<hash>.webp'). Direct uploads are addressed by an
+    upload id and live apart from the files until they are processed and deleted.
+    """
+
+    # Whether direct uploads reach this backend through the app (receive_upload) rather than presigned URLs
+    receives_uploads = True
+
+    @abstractmethod
+    def put(self, name, data, content_type):
+        pass
+
+    @abstractmethod
+    def touch(self, name):
+        """Refresh a file's modified time; returns False when it does not exist"""
+
+    @abstractmethod
+    def modified_at(self, name):
+        """Unix modified time of a file, or None when it does not exist"""
+
+    @abstractmethod
+    def delete(self, name):
+        pass
+
+    @abstractmethod
+    def list(self):
+        """(name, modified time) of every stored file"""
+
+    def public_url(self, name):
+        """URL clients can fetch a file from directly, or None when the app serves it"""
+        return None
+
+    def presign_upload(self, upload_id, content_type, max_bytes, expires_in):
+        """Where a client sends a direct upload: {'method', 'url', 'fields' or 'headers'}, or None
+        when the backend cannot accept uploads itself (the app then provides the endpoint)"""
+        return None
+
+    @abstractmethod
+    def receive_upload(self, upload_id, path):
+        """Take a direct upload staged at a local path (for backends without presigned URLs)"""
+
+    @abstractmethod
+    def read_upload(self, upload_id, fileobj):
+        """Copy a direct upload into fileobj chunk by chunk; raises FileNotFoundError when missing"""
+
+    @abstractmethod
+    def delete_upload(self, upload_id):
+        pass
+
+    @abstractmethod
+    def list_uploads(self):
+        """(upload id, modified time) of every pending direct upload"""
+
+class LocalStorage(AvatarStorage):
+    """Files in a local directory, served by the app; direct uploads go through the app too"""
+
+    def __init__(self, folder):
+        self.folder = folder
+        self.incoming_folder = os.path.join(folder, '.incoming')
+
+    def _path(self, name):
+        return os.path.join(self.folder, name)
+
+    def put(self, name, data, content_type):
+        os.makedirs(self.folder, exist_ok=True)
+        # Written under a temporary name first: a partial file served as immutable would be cached forever
+        temporary = self._path(f'.{name}.{uuid.uuid4().hex[:8]}.tmp')
+        with open(temporary, 'wb') as f:
+            f.write(data)
+        os.replace(temporary, self._path(name))
+
+    def touch(self, name):
+        try:
+            os.utime(self._path(name))
+            return True
+        except FileNotFoundError:
+            return False
+
+    def modified_at(self, name):
+        try:
+            return os.stat(self._path(name)).st_mtime
+        except FileNotFoundError:
+            return None
+
+    def delete(self, name):
+        try:
+            os.remove(self._path(name))
+        except FileNotFoundError:
+            pass
+
+    def _scan(self, folder):
+        if not os.path.isdir(folder):
+            return
+        for entry in os.scandir(folder):
+            # Dot files are staging and temporary files, not stored avatars
+            if entry.is_file() and not entry.name.startswith('.'):
+                yield entry.name, entry.stat().st_mtime
+
+    def list(self):
+        return self._scan(self.folder)
+
+    def receive_upload(self, upload_id, path):
+        os.makedirs(self.incoming_folder, exist_ok=True)
+        os.replace(path, os.path.join(self.incoming_folder, upload_id))
+
+    def read_upload(self, upload_id, fileobj):
+        with open(os.path.join(self.incoming_folder, upload_id), 'rb') as f:
+            shutil.copyfileobj(f, fileobj, CHUNK_SIZE)
+
+    def delete_upload(self, upload_id):
+        try:
+            os.remove(os.path.join(self.incoming_folder, upload_id))
+        except FileNotFoundError:
+            pass
+
+    def list_uploads(self):
+        return self._scan(self.incoming_folder)
+
+class S3Storage(AvatarStorage):
+    """Files in an S3-compatible bucket (AWS, MinIO, R2...), served from the bucket or a CDN in front of it
+
+    Clients upload straight to the bucket with presigned POSTs limited by size and content
+    type. Credentials come from the usual AWS environment variables or instance role.
+    """
+
+    receives_uploads = False
+
+    def __init__(self, bucket, prefix='avatars/', incoming_prefix='incoming/', endpoint_url=None, region=None, public_base_url=None):
+        import boto3
+
+        self.bucket = bucket
+        self.prefix = prefix
+        self.incoming_prefix = incoming_prefix
+        self.client = boto3.client('s3', endpoint_url=endpoint_url, region_name=region)
+        if public_base_url is None:
+            base = endpoint_url or f'https://{bucket}.s3.amazonaws.com'
+            public_base_url = f'{base.rstrip("/")}/{bucket}/{prefix}' if endpoint_url else f'{base}/{prefix}'
+        self.public_base_url = public_base_url.rstrip('/') + '/'
+
+    def _is_missing(self, error):
+        return error.response.get('Error', {}).get('Code') in ('404', 'NoSuchKey', 'NotFound')
+
+    def put(self, name, data, content_type):
+        self.client.put_object(
+            Bucket=self.bucket,
+            Key=self.prefix + name,
+            Body=data,
+            ContentType=content_type,
+            CacheControl=IMMUTABLE_CACHE_CONTROL
+        )
+
+    def touch(self, name):
+        from botocore.exceptions import ClientError
+
+        key = self.prefix + name
+        try:
+            head = self.client.head_object(Bucket=self.bucket, Key=key)
+            # Copying an object onto itself with new metadata is how S3 updates LastModified
+            self.client.copy_object(
+                Bucket=self.bucket,
+                Key=key,
+                CopySource={'Bucket': self.bucket, 'Key': key},
+                MetadataDirective='REPLACE',
+                ContentType=head.get('ContentType', 'application/octet-stream'),
+                CacheControl=IMMUTABLE_CACHE_CONTROL
+            )
+            return True
+        except ClientError as e:
+            if self._is_missing(e):
+                return False
+            raise
+
+    def modified_at(self, name):
+        from botocore.exceptions import ClientError
+
+        try:
+            head = self.client.head_object(Bucket=self.bucket, Key=self.prefix + name)
+        except ClientError as e:
+            if self._is_missing(e):
+                return None
+            raise
+        return head['LastModified'].timestamp()
+
+    def delete(self, name):
+        self.client.delete_object(Bucket=self.bucket, Key=self.prefix + name)
+
+    def _scan(self, prefix):
+        paginator = self.client.get_paginator('list_objects_v2')
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=prefix):
+            for item in page.get('Contents', []):
+                name = item['Key'][len(prefix):]
+                if name and '/' not in name:
+                    yield name, item['LastModified'].timestamp()
+
+    def list(self):
+        return self._scan(self.prefix)
+
+    def public_url(self, name):
+        return self.public_base_url + name
+
+    def presign_upload(self, upload_id, content_type, max_bytes, expires_in):
+        post = self.client.generate_presigned_post(
+            Bucket=self.bucket,
+            Key=self.incoming_prefix + upload_id,
+            Fields={'Content-Type': content_type},
+            Conditions=[{'Content-Type': content_type}, ['content-length-range', 1, max_bytes]],
+            ExpiresIn=expires_in
+        )
+        return {'method': 'POST', 'url': post['url'], 'fields': post['fields']}
+
+    def receive_upload(self, upload_id, path):
+        # Only reached when the app is configured to proxy uploads; clients normally POST to the bucket
+        self.client.upload_file(path, self.bucket, self.incoming_prefix + upload_id)
+        os.remove(path)
+
+    def read_upload(self, upload_id, fileobj):
+        from botocore.exceptions import ClientError
+
+        try:
+            body = self.client.get_object(Bucket=self.bucket, Key=self.incoming_prefix + upload_id)['Body']
+        except ClientError as e:
+            if self._is_missing(e):
+                raise FileNotFoundError(upload_id)
+            raise
+        for chunk in body.iter_chunks(CHUNK_SIZE):
+            fileobj.write(chunk)
+
+    def delete_upload(self, upload_id):
+        self.client.delete_object(Bucket=self.bucket, Key=self.incoming_prefix + upload_id)
+
+    def list_uploads(self):
+        return self._scan(self.incoming_prefix)
+
+STORAGES = {
+    'local': lambda config: LocalStorage(config['UPLOAD_FOLDER']),
+    's3': lambda config: S3Storage(
+        config['AVATAR_S3_BUCKET'],
+        prefix=config['AVATAR_S3_PREFIX'],
+        incoming_prefix=config['AVATAR_S3_INCOMING_PREFIX'],
+        endpoint_url=config['AVATAR_S3_ENDPOINT_URL'],
+        region=config['AVATAR_S3_REGION'],
+        public_base_url=config['AVATAR_PUBLIC_BASE_URL']
+    )
+}
+
+def load_storage(config, name=None):
+    """AVATAR_STORAGE (or `name`) is a key of STORAGES or an import path to a callable(config) returning an AvatarStorage"""
+    name = name or config['AVATAR_STORAGE']
+    factory = STORAGES.get(name) or import_string(name)
+    storage = factory(config)
+    if not isinstance(storage, AvatarStorage):
+        raise TypeError(f'AVATAR_STORAGE {name!r} returned {type(storage).__name__}, not an AvatarStorage')
+    return storage
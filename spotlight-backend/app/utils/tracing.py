@@ -0,0 +1,326 @@
+import contextvars
+import inspect
+import json
+import logging
+import os
+import queue
+import random
+import re
+import threading
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from functools import wraps
+from flask import g, request
+from sqlalchemy import event
+from werkzeug.utils import import_string
+from app.utils.background import BackgroundThread
+
+logger = logging.getLogger(__name__)
+
+TRACEPARENT = re.compile(r'^00-([0-9a-f]{32})-([0-9a-f]{16})-[0-9a-f]{2}$')
+MAX_STATEMENT_LENGTH = 2000
+
+# The innermost open span of the current request; contextvars follow it into SpotifyService.submit threads
+# and into the tasks of async views
+_current_span = contextvars.ContextVar('current_span', default=None)
+
+class Trace:
+    """Spans of one request, buffered until the tail-sampling decision at the end"""
+
+    def __init__(self, trace_id, max_spans):
+        self.trace_id = trace_id
+        self.max_spans = max_spans
+        self.spans = []
+        self.dropped_spans = 0
+        self.error = False
+
+    def add(self, span):
+        if len(self.spans) < self.max_spans:
+            self.spans.append(span)
+        else:
+            self.dropped_spans += 1
+
+class Span:
+    __slots__ = ('trace', 'span_id', 'parent_id', 'name', 'kind', 'attributes', 'start_time', 'started', 'duration', 'error')
+
+    def __init__(self, trace, name, parent_id=None, kind='internal', attributes=None):
+        self.trace = trace
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.name = name
+        self.kind = kind
+        self.attributes = attributes or {}
+        self.start_time = time.time()
+        self.started = time.perf_counter()
+        self.duration = None
+        self.error = None
+        trace.add(self)
+
+    def set_attribute(self, key, value):
+        self.attributes[key] = value
+
+    def set_error(self, message):
+        self.error = message
+        self.trace.error = True
+
+    def end(self):
+        if self.duration is None:
+            self.duration = time.perf_counter() - self.started
+
+    def to_dict(self):
+        return {
+            'trace_id': self.trace.trace_id,
+            'span_id': self.span_id,
+            'parent_id': self.parent_id,
+            'name': self.name,
+            'kind': self.kind,
+            'start_time': self.start_time,
+            'duration_ms': round((self.duration or 0) * 1000, 3),
+            'status': 'error' if self.error else 'ok',
+            'error': self.error,
+            'attributes': self.attributes
+        }
+
+def current_span():
+    return _current_span.get()
+
+@contextmanager
+def span(name, kind='internal', **attributes):
+    """Child of the current span for the duration of the block; yields None (and records nothing) outside a trace"""
+    parent = _current_span.get()
+    if parent is None:
+        yield None
+        return
+    child = Span(parent.trace, name, parent.span_id, kind, attributes)
+    token = _current_span.set(child)
+    try:
+        yield child
+    except Exception as e:
+        child.set_error(f'{type(e).__name__}: {e}')
+        raise
+    finally:
+        child.end()
+        _current_span.reset(token)
+
+def traced(name=None, kind='internal'):
+    """Decorator form of span(); the name defaults to the function's qualified name"""
+    def decorator(f):
+        span_name = name or f.__qualname__
+
+        if inspect.iscoroutinefunction(f):
+            @wraps(f)
+            async def async_wrapper(*args, **kwargs):
+                with span(span_name, kind):
+                    return await f(*args, **kwargs)
+            return async_wrapper
+
+        @wraps(f)
+        def wrapper(*args, **kwargs):
+            with span(span_name, kind):
+                return f(*args, **kwargs)
+        return wrapper
+    return decorator
+
+class SpanExporter(ABC):
+    """Backend interface: export() gets the span dicts of one kept trace, from a background thread"""
+
+    @abstractmethod
+    def export(self, spans):
+        pass
+
+    def shutdown(self):
+        pass
+
+class JsonLinesFileExporter(SpanExporter):
+    """Appends one JSON object per span to a local file"""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._file = None
+
+    def export(self, spans):
+        body = ''.join(json.dumps(span, default=str) + '\n' for span in spans)
+        with self._lock:
+            if self._file is None:
+                os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+                self._file = open(self.path, 'a')
+            # One write per trace so processes sharing the file never interleave inside a trace
+            self._file.write(body)
+            self._file.flush()
+
+    def shutdown(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+EXPORTERS = {
+    'jsonl': lambda config: JsonLinesFileExporter(config['TRACING_FILE'])
+}
+
+def load_exporter(config):
+    """TRACING_EXPORTER is a name from EXPORTERS or an import path to a callable(config) returning a SpanExporter"""
+    name = config['TRACING_EXPORTER']
+    factory = EXPORTERS.get(name) or import_string(name)
+    exporter = factory(config)
+    if not isinstance(exporter, SpanExporter):
+        raise TypeError(f'TRACING_EXPORTER {name!r} returned {type(exporter).__name__}, not a SpanExporter')
+    return exporter
+
+class BackgroundExporter(BackgroundThread):
+    """Hands kept traces to the exporter on a background thread; traces are dropped when the queue is full"""
+
+    thread_name = 'trace-exporter'
+
+    def __init__(self, exporter, max_queue_size=1000):
+        super().__init__()
+        self.exporter = exporter
+        self.max_queue_size = max_queue_size
+        self.exported = 0
+        self.dropped = 0
+        self._queue = None
+
+    def _prepare(self):
+        self._queue = queue.Queue(maxsize=self.max_queue_size)
+
+    def submit(self, spans):
+        self.ensure_started()
+        try:
+            self._queue.put_nowait(spans)
+        except queue.Full:
+            self.dropped += 1
+
+    def stop(self, timeout=5):
+        """Export what is queued, then stop the thread and the exporter"""
+        if super().stop(timeout):
+            self.exporter.shutdown()
+            return True
+        return False
+
+    def _signal_stop(self, timeout):
+        try:
+            self._queue.put(None, timeout=timeout)
+        except queue.Full:
+            return False
+        return True
+
+    def _run(self):
+        pending = self._queue
+        while True:
+            spans = pending.get()
+            if spans is None:
+                return
+            try:
+                self.exporter.export(spans)
+                self.exported += 1
+            except Exception:
+                logger.exception('Trace export failed')
+
+class TailSampler:
+    """Keep every error or slow trace and a random share of the rest"""
+
+    def __init__(self, slow_seconds, sample_rate):
+        self.slow_seconds = slow_seconds
+        self.sample_rate = sample_rate
+
+    def keep(self, trace, root):
+        if trace.error:
+            return 'error'
+        if root.duration >= self.slow_seconds:
+            return 'slow'
+        if random.random() < self.sample_rate:
+            return 'sampled'
+        return None
+
+def install_sql_tracing(engine, bind_name):
+    """One span per statement executed while a request trace is open"""
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def start_statement_span(conn, cursor, statement, parameters, context, executemany):
+        parent = _current_span.get()
+        if parent is None or context is None:
+            return
+        context._trace_span = Span(parent.trace, 'db.query', parent.span_id, 'client', {
+            'db.system': engine.dialect.name,
+            'db.bind': bind_name,
+            'db.statement': statement[:MAX_STATEMENT_LENGTH],
+            'db.executemany': executemany
+        })
+
+    @event.listens_for(engine, 'after_cursor_execute')
+    def end_statement_span(conn, cursor, statement, parameters, context, executemany):
+        statement_span = getattr(context, '_trace_span', None)
+        if statement_span is not None:
+            statement_span.end()
+            statement_span.set_attribute('db.rows', cursor.rowcount)
+
+    @event.listens_for(engine, 'handle_error')
+    def fail_statement_span(exception_context):
+        statement_span = getattr(exception_context.execution_context, '_trace_span', None)
+        if statement_span is not None:
+            statement_span.end()
+            statement_span.set_error(f'{type(exception_context.original_exception).__name__}: {exception_context.original_exception}')
+
+def install_tracing(app):
+    """Trace every request with child spans for SQL statements and Spotify calls (only when TRACING_ENABLED)"""
+    from app import db
+    from app.utils.replica import request_identity
+
+    exporter = BackgroundExporter(load_exporter(app.config), max_queue_size=app.config['TRACING_QUEUE_SIZE'])
+    sampler = TailSampler(app.config['TRACING_SLOW_MS'] / 1000, app.config['TRACING_SAMPLE_RATE'])
+    max_spans = app.config['TRACING_MAX_SPANS']
+    app.extensions['tracing'] = exporter
+
+    with app.app_context():
+        for bind_name, engine in db.engines.items():
+            install_sql_tracing(engine, bind_name or 'default')
+
+    @app.before_request
+    def start_trace():
+        # Continue a caller's W3C trace context when one is sent
+        incoming = TRACEPARENT.match(request.headers.get('traceparent', ''))
+        trace_id, parent_id = incoming.groups() if incoming else (os.urandom(16).hex(), None)
+        root = Span(Trace(trace_id, max_spans), f'{request.method} {request.url_rule.rule if request.url_rule else request.path}', parent_id, 'server', {
+            'http.method': request.method,
+            'http.target': request.path,
+            'http.route': request.url_rule.rule if request.url_rule else None,
+            'endpoint': request.endpoint
+        })
+        g.trace_root = root
+        g.trace_token = _current_span.set(root)
+
+    @app.after_request
+    def finish_trace_response(response):
+        root = g.get('trace_root')
+        if root is not None:
+            root.set_attribute('http.status_code', response.status_code)
+            if response.status_code >= 500:
+                root.set_error(f'HTTP {response.status_code}')
+            response.headers['X-Trace-Id'] = root.trace.trace_id
+        return response
+
+    @app.teardown_request
+    def end_trace(exc):
+        root = g.pop('trace_root', None)
+        if root is None:
+            return
+        try:
+            _current_span.reset(g.pop('trace_token'))
+        except ValueError:
+            # Torn down from a different context than the one that started the trace
+            _current_span.set(None)
+        if exc is not None:
+            root.set_error(f'{type(exc).__name__}: {exc}')
+        root.set_attribute('user.id', request_identity())
+        root.end()
+
+        trace = root.trace
+        decision = sampler.keep(trace, root)
+        if decision is None:
+            return
+        root.set_attribute('sampling.reason', decision)
+        if trace.dropped_spans:
+            root.set_attribute('dropped_spans', trace.dropped_spans)
+        exporter.submit([span.to_dict() for span in trace.spans])
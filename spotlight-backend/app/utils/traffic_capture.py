@@ -0,0 +1,193 @@
+import gzip
+import hashlib
+import hmac
+import json
+import os
+import queue
+import random
+import threading
+import time
+from flask import g, request
+from app.utils.background import BackgroundThread
+from app.utils.replica import request_identity
+
+# Recorded in place of a secret's value: no length, no shape
+REDACTED = 'redacted'
+
+class CaptureWriter(BackgroundThread):
+    """Appends captured requests to a gzip file from a background thread
+
+    Each flush writes one complete gzip member with a single O_APPEND write, so several worker
+    processes can share a file and gzip readers see the concatenated members as one stream.
+    """
+
+    thread_name = 'traffic-capture'
+
+    def __init__(self, path, max_queue_size=10000, batch_size=500, flush_interval=1.0):
+        super().__init__()
+        self.path = path
+        self.max_queue_size = max_queue_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.written = 0
+        self.dropped = 0
+        self._queue = None
+
+    def _prepare(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._queue = queue.Queue(maxsize=self.max_queue_size)
+
+    def write(self, record):
+        self.ensure_started()
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def _signal_stop(self, timeout):
+        # Written after everything already queued
+        try:
+            self._queue.put(None, timeout=timeout)
+        except queue.Full:
+            return False
+        return True
+
+    def _flush(self, batch):
+        body = gzip.compress(''.join(json.dumps(record, separators=(',', ':')) + '\n' for record in batch).encode())
+        fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o600)
+        try:
+            os.write(fd, body)
+        finally:
+            os.close(fd)
+        self.written += len(batch)
+
+    def _run(self):
+        pending = self._queue
+        batch = []
+        stopping = False
+        while not stopping:
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                try:
+                    record = pending.get(timeout=max(0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if record is None:
+                    stopping = True
+                    break
+                batch.append(record)
+            if batch:
+                self._flush(batch)
+                batch = []
+
+def read_capture(path):
+    """Captured records in file order; a member cut short by a crash ends the stream"""
+    with gzip.open(path, 'rt') as f:
+        try:
+            for line in f:
+                yield json.loads(line)
+        except (EOFError, gzip.BadGzipFile):
+            return
+
+def is_redacted(name, redact_fields):
+    """Whether a field holds a secret: its name, or one of its underscore-separated words, is in redact_fields"""
+    if not isinstance(name, str):
+        return False
+    name = name.lower()
+    return name in redact_fields or not redact_fields.isdisjoint(name.split('_'))
+
+def body_shape(value, keep_fields, redact_fields=frozenset(), key=None):
+    """Structure of a JSON body without its data: strings become 'url', 'email' or their length
+
+    Secret fields become 'redacted', so not even a password's length is stored.
+    """
+    if is_redacted(key, redact_fields):
+        return REDACTED
+    if key in keep_fields:
+        return value
+    if isinstance(value, dict):
+        return {name: body_shape(item, keep_fields, redact_fields, name) for name, item in value.items()}
+    if isinstance(value, list):
+        return [len(value), body_shape(value[0], keep_fields, redact_fields, key) if value else None]
+    if isinstance(value, str):
+        if value.startswith(('http://', 'https://')):
+            return 'url'
+        if '@' in value:
+            return 'email'
+        return len(value)
+    if isinstance(value, bool) or value is None:
+        return value
+    return type(value).__name__
+
+def install_traffic_capture(app):
+    """Record the shape and timing of every request (only when TRAFFIC_CAPTURE_ENABLED)
+
+    Path parameters, non-allowlisted query values and the caller's identity are replaced by keyed
+    hashes: the same username or user always maps to the same token, so replay keeps the
+    popularity distribution without storing who anyone is.
+    """
+    writer = CaptureWriter(app.config['TRAFFIC_CAPTURE_FILE'])
+    app.extensions['traffic_capture'] = writer
+    sample_rate = app.config['TRAFFIC_CAPTURE_SAMPLE_RATE']
+    keep_fields = app.config['TRAFFIC_CAPTURE_KEEP_FIELDS']
+    redact_fields = app.config['TRAFFIC_CAPTURE_REDACT_FIELDS']
+    key = hashlib.sha256(f"traffic-capture:{app.config['SECRET_KEY']}".encode()).digest()
+    in_flight_lock = threading.Lock()
+    in_flight = [0]
+
+    def pseudonym(value):
+        return hmac.new(key, str(value).encode(), hashlib.sha256).hexdigest()[:12]
+
+    @app.before_request
+    def start_capture():
+        endpoint = request.endpoint
+        if endpoint is None or endpoint == 'metrics' or endpoint.startswith('flasgger.') or request.method == 'OPTIONS':
+            return
+        if sample_rate < 1 and random.random() >= sample_rate:
+            return
+        with in_flight_lock:
+            in_flight[0] += 1
+            g.capture_concurrency = in_flight[0]
+        g.capture_time = time.time()
+        g.capture_started = time.perf_counter()
+
+    @app.after_request
+    def remember_status(response):
+        if 'capture_started' in g:
+            g.capture_status = response.status_code
+        return response
+
+    @app.teardown_request
+    def write_capture(exc):
+        started = g.pop('capture_started', None)
+        if started is None:
+            return
+        duration = time.perf_counter() - started
+        with in_flight_lock:
+            in_flight[0] -= 1
+
+        if request.mimetype == 'application/json':
+            body = body_shape(request.get_json(silent=True), keep_fields, redact_fields)
+        elif request.content_length:
+            body = {'_content_type': request.mimetype, '_bytes': request.content_length}
+        else:
+            body = None
+        identity = request_identity()
+
+        writer.write({
+            't': round(g.pop('capture_time'), 3),
+            'm': request.method,
+            'r': request.url_rule.rule,
+            'e': request.endpoint,
+            'p': {name: pseudonym(value) for name, value in (request.view_args or {}).items()},
+            'q': {
+                name: REDACTED if is_redacted(name, redact_fields) else value if name in keep_fields else pseudonym(value)
+                for name, value in request.args.items()
+            },
+            'u': pseudonym(identity) if identity is not None else None,
+            'b': body,
+            's': g.pop('capture_status', 500),
+            'd': round(duration * 1000, 2),
+            'c': g.pop('capture_concurrency'),
+            'w': os.getpid()
+        })
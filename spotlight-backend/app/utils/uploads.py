@@ -0,0 +1,148 @@
+import hashlib
+import io
+import os
+import uuid
+from werkzeug.formparser import parse_form_data
+
+# Leading bytes of each image type; WebP is a RIFF container with 'WEBP' at offset 8
+SNIFF_BYTES = 12
+
+def sniff_image_type(head):
+    """Image type from a file's first bytes ('png', 'jpeg', 'gif' or 'webp'), or None"""
+    if head.startswith(b'\x89PNG\r\n\x1a\n'):
+        return 'png'
+    if head.startswith(b'\xff\xd8\xff'):
+        return 'jpeg'
+    if head.startswith((b'GIF87a', b'GIF89a')):
+        return 'gif'
+    if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+        return 'webp'
+    return None
+
+class UploadRejected(ValueError):
+    """Upload refused while streaming; nothing after the offending chunk was read"""
+
+    def __init__(self, message, status_code=400):
+        super().__init__(message)
+        self.message = message
+        self.status_code = status_code
+
+class StagedUpload:
+    """File part streamed to a temporary file next to its destination, hashed and sniffed as it arrives
+
+    werkzeug's multipart parser writes each chunk here as it decodes it, so an upload is never
+    held in memory. The type is checked against the file's magic bytes (not its name or
+    Content-Type) as soon as the first bytes arrive, and a file over max_bytes is refused at the
+    chunk that crosses the limit; either way the exception stops the parser before it reads the
+    rest of the body. finish() renames the complete file into place.
+    """
+
+    def __init__(self, folder, filename, allowed_types, max_bytes):
+        self.folder = folder
+        self.filename = filename
+        self.allowed_types = allowed_types
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.image_type = None
+        self.path = None
+        self._head = b''
+        self._sha256 = hashlib.sha256()
+        os.makedirs(folder, exist_ok=True)
+        self._partial_path = os.path.join(folder, f'.upload-{uuid.uuid4().hex}.part')
+        self._file = open(self._partial_path, 'w+b')
+
+    def write(self, data):
+        self.size += len(data)
+        if self.size > self.max_bytes:
+            self.discard()
+            raise UploadRejected(f'File too large (max {self.max_bytes // (1024 * 1024)}MB)', 413)
+        if self.image_type is None:
+            self._head += data[:SNIFF_BYTES]
+            if len(self._head) >= SNIFF_BYTES:
+                self._sniff()
+        self._sha256.update(data)
+        self._file.write(data)
+        return len(data)
+
+    def _sniff(self):
+        self.image_type = sniff_image_type(self._head)
+        if self.image_type not in self.allowed_types:
+            self.discard()
+            raise UploadRejected('File content is not an allowed image type')
+
+    def seek(self, offset, whence=0):
+        # werkzeug rewinds each finished part; the data is read back from disk through self.path
+        return self._file.seek(offset, whence)
+
+    def read(self, size=-1):
+        return self._file.read(size)
+
+    @property
+    def sha256(self):
+        return self._sha256.hexdigest()
+
+    def finish(self):
+        """Close the file and rename it into place; returns the final path"""
+        if self.image_type is None:
+            # Shorter than the sniffed prefix
+            self._sniff()
+        self._file.close()
+        extension = 'jpg' if self.image_type == 'jpeg' else self.image_type
+        self.path = os.path.join(self.folder, f'.upload-{self.sha256[:16]}-{uuid.uuid4().hex[:8]}.{extension}')
+        os.replace(self._partial_path, self.path)
+        return self.path
+
+    def discard(self):
+        """Close and delete the file, whether or not it was finished"""
+        self._file.close()
+        for path in (self._partial_path, self.path):
+            if path:
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+
+    def close(self):
+        self._file.close()
+
+def parse_streaming_form(request, file_field, folder, allowed_extensions, allowed_types, max_bytes):
+    """Parse a multipart request, streaming file parts into StagedUploads in `folder`
+
+    Returns (form, upload): the text fields like request.form, and the StagedUpload of
+    `file_field` or None. Other file parts are discarded. Raises UploadRejected for a
+    disallowed extension or content type and for oversized files, and lets werkzeug's
+    RequestEntityTooLarge through when the body is over max_content_length. Must run before
+    anything touches request.form, request.files or request.stream.
+    """
+    staged = []
+
+    def stream_factory(total_content_length, content_type, filename, content_length=None):
+        if not filename:
+            # A file input left empty
+            return io.BytesIO()
+        extension = filename.rsplit('.', 1)[-1].lower() if '.' in filename else None
+        if extension not in allowed_extensions:
+            raise UploadRejected(f"Invalid file type. Allowed: {', '.join(sorted(allowed_extensions))}")
+        upload = StagedUpload(folder, filename, allowed_types, max_bytes)
+        staged.append(upload)
+        return upload
+
+    try:
+        _, form, files = parse_form_data(
+            request.environ,
+            stream_factory=stream_factory,
+            max_form_memory_size=request.max_form_memory_size,
+            max_content_length=request.max_content_length,
+            silent=False
+        )
+    except BaseException:
+        for upload in staged:
+            upload.discard()
+        raise
+
+    storage = files.get(file_field)
+    upload = storage.stream if storage is not None and isinstance(storage.stream, StagedUpload) else None
+    for other in staged:
+        if other is not upload:
+            other.discard()
+    return form, upload
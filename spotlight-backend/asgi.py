@@ -0,0 +1,39 @@
+"""
+ASGI entry point: the same app as run.py, with async views running on the server's event loop
+Usage: python upgrade_database.py && uvicorn asgi:application --host 0.0.0.0 --port 5000 --workers 4
+
+The Spotify routes are async views. Here their Spotify calls share one keep-alive connection
+pool per process and overlap each other, while request threads only wait on them. Migrations
+are not applied here: every worker imports this module, so run upgrade_database.py first.
+"""
+import multiprocessing
+import os
+
+# With --workers, uvicorn spawns every worker from one supervisor, and any of them may answer
+# /api/metrics: they share their numbers through this directory as one server. A single
+# process reports its own. Set before config.py is imported.
+_supervisor = multiprocessing.parent_process()
+if _supervisor is not None:
+    os.environ.setdefault('METRICS_MULTIPROCESS_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'instance', 'metrics'))
+    os.environ.setdefault('METRICS_SERVER_ID', f'{_supervisor.pid}-uvicorn')
+
+from app import create_app
+from app.services import AsyncSpotifyService
+from app.utils.asgi import AsgiApp
+from app.utils.prefork import start_worker_services
+
+app = create_app(os.getenv('FLASK_ENV', 'development'))
+
+async def open_spotify_client():
+    await AsyncSpotifyService.open_client(app.config)
+
+async def start_background_services():
+    start_worker_services(app)
+
+application = AsgiApp(
+    app,
+    threads=app.config['ASGI_THREADS'],
+    max_body_size=app.config['MAX_CONTENT_LENGTH'],
+    on_startup=[open_spotify_client, start_background_services],
+    on_shutdown=[AsyncSpotifyService.close_client]
+)
@@ -0,0 +1,198 @@
+"""
+Benchmark memory per worker: gunicorn.conf.py with the app preloaded in the master vs loaded by each worker
+Usage: python benchmarks/bench_prefork_memory.py [--mode single|separate|preload|all] [--workers 4]
+                                                 [--requests 2000] [--concurrency 8]
+
+Each mode serves the app from a temporary SQLite database, sends --requests mixed requests
+(health, public profiles, a missing profile, sign-in), then reads /proc/<pid>/smaps_rollup for
+every server process:
+  single    - one process serving on the threaded werkzeug server, as run.py did (the baseline)
+  separate  - gunicorn.conf.py with GUNICORN_PRELOAD=false: every worker imports and builds the app
+  preload   - gunicorn.conf.py as shipped: the master builds the app and workers share it copy-on-write
+RSS counts shared pages in full in every process. PSS splits each shared page between the
+processes mapping it, so the sum of PSS is what the server really costs. USS (private pages)
+is what one more worker adds. Each line of output is a JSON result for one mode. Linux only.
+"""
+import argparse
+import json
+import os
+import random
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+def wait_for_port(port, timeout=60):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=1).close()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f'Nothing listening on port {port}')
+
+def memory_mb(pid):
+    """RSS, PSS and USS (private clean + dirty) of one process, in MB"""
+    fields = {}
+    with open(f'/proc/{pid}/smaps_rollup') as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == 'kB':
+                fields[parts[0].rstrip(':')] = int(parts[1])
+    return {
+        'rss_mb': round(fields['Rss'] / 1024, 1),
+        'pss_mb': round(fields['Pss'] / 1024, 1),
+        'uss_mb': round((fields['Private_Clean'] + fields['Private_Dirty']) / 1024, 1)
+    }
+
+def children(pid):
+    with open(f'/proc/{pid}/task/{pid}/children') as f:
+        return [int(child) for child in f.read().split()]
+
+def serve_single(port):
+    """Run the baseline server (called in a subprocess)"""
+    from werkzeug.serving import make_server
+    from app.utils.access_log import QuietRequestHandler
+    from run import app
+
+    make_server('127.0.0.1', port, app, threaded=True, request_handler=QuietRequestHandler).serve_forever()
+
+def seed(users):
+    from app import create_app, db
+    from app.models import User, UserProfile
+    from app.utils.schema import upgrade_database
+
+    app = create_app('production')
+    with app.app_context():
+        upgrade_database()
+        db.session.add_all([User(email=f'memory{i}@bench.example', username=f'memory{i}', password_hash='x') for i in range(users)])
+        db.session.commit()
+        db.session.add_all([
+            UserProfile(user_id=user_id, display_name=f'Memory {user_id}', bio='Benchmark profile ' * 20)
+            for user_id in db.session.scalars(db.select(User.id))
+        ])
+        db.session.commit()
+
+def load(base_url, users, requests_total, concurrency, seed_value):
+    import requests
+
+    statuses = {}
+    lock = threading.Lock()
+    counter = iter(range(requests_total))
+
+    def worker(n):
+        rng = random.Random(seed_value + n)
+        session = requests.Session()
+        local_statuses = {}
+        for _ in counter:
+            scenario = rng.random()
+            if scenario < 0.6:
+                response = session.get(f'{base_url}/api/profiles/memory{rng.randrange(users)}', headers={'Accept-Encoding': 'br, gzip'})
+            elif scenario < 0.75:
+                response = session.get(f'{base_url}/api/profiles/missing{rng.randrange(users)}')
+            elif scenario < 0.9:
+                response = session.post(f'{base_url}/api/auth/login', json={'email': f'memory{rng.randrange(users)}@bench.example', 'password': 'wrong'})
+            else:
+                response = session.get(f'{base_url}/api/health')
+            local_statuses[response.status_code] = local_statuses.get(response.status_code, 0) + 1
+        with lock:
+            for status, count in local_statuses.items():
+                statuses[status] = statuses.get(status, 0) + count
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return statuses
+
+def run_mode(mode, args, env):
+    port = free_port()
+    env = dict(env)
+    if mode == 'single':
+        command = [sys.executable, os.path.abspath(__file__), '--serve-single', '--port', str(port)]
+    else:
+        env.update(
+            GUNICORN_BIND=f'127.0.0.1:{port}',
+            WEB_CONCURRENCY=str(args.workers),
+            GUNICORN_PRELOAD='true' if mode == 'preload' else 'false'
+        )
+        command = [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py']
+
+    server = subprocess.Popen(command, cwd=BACKEND_DIR, env=env)
+    try:
+        wait_for_port(port)
+        if mode != 'single':
+            # The port opens before the workers have all loaded the app
+            deadline = time.time() + 60
+            while len(children(server.pid)) < args.workers and time.time() < deadline:
+                time.sleep(0.1)
+        statuses = load(f'http://127.0.0.1:{port}', args.users, args.requests, args.concurrency, args.seed)
+        time.sleep(1)
+
+        if mode == 'single':
+            master, workers = None, [memory_mb(server.pid)]
+        else:
+            master, workers = memory_mb(server.pid), [memory_mb(pid) for pid in children(server.pid)]
+        processes = ([master] if master else []) + workers
+        return {
+            'mode': mode,
+            'workers': len(workers),
+            'requests': args.requests,
+            'statuses': statuses,
+            'master': master,
+            'worker_rss_mb': round(sum(w['rss_mb'] for w in workers) / len(workers), 1),
+            'worker_pss_mb': round(sum(w['pss_mb'] for w in workers) / len(workers), 1),
+            'worker_uss_mb': round(sum(w['uss_mb'] for w in workers) / len(workers), 1),
+            'total_rss_mb': round(sum(p['rss_mb'] for p in processes), 1),
+            'total_pss_mb': round(sum(p['pss_mb'] for p in processes), 1)
+        }
+    finally:
+        server.send_signal(signal.SIGTERM)
+        server.wait()
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark memory per worker with and without preloading the app')
+    parser.add_argument('--mode', choices=['single', 'separate', 'preload', 'all'], default='all')
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--requests', type=int, default=2000, help='Requests sent before memory is measured')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--users', type=int, default=500)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--serve-single', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--port', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve_single:
+        serve_single(args.port)
+        return
+
+    # Fresh database for every run; the servers inherit it through the environment
+    scratch = tempfile.mkdtemp()
+    os.environ.update(
+        DATABASE_URL=f"sqlite:///{os.path.join(scratch, 'bench_memory.db')}",
+        FLASK_ENV='production',
+        LEADER_LOCK_FILE=os.path.join(scratch, 'leader.lock'),
+        UPGRADE_DATABASE_ON_START='false'
+    )
+    os.environ.setdefault('ACCESS_LOG_ENABLED', 'false')
+    seed(args.users)
+
+    modes = ['single', 'separate', 'preload'] if args.mode == 'all' else [args.mode]
+    for mode in modes:
+        print(json.dumps(run_mode(mode, args, os.environ)), flush=True)
+
+if __name__ == '__main__':
+    main()
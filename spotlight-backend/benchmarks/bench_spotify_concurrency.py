@@ -0,0 +1,285 @@
+"""
+Benchmark Spotify-bound routes per server process: threaded WSGI (sync views) vs asgi.py (async views)
+Usage: python benchmarks/bench_spotify_concurrency.py [--mode sync|asgi|all] [--threads 8]
+                                                      [--concurrency 8,32,128] [--seconds 10]
+                                                      [--latency-ms 100] [--handshake-ms 50] [--backend-dir DIR]
+
+Spotify is replaced by a local fake that answers after --latency-ms, plus --handshake-ms on the
+first request of each new connection to stand in for the TCP and TLS setup to api.spotify.com.
+Each mode serves the app from one process with --threads request threads:
+  sync  - threaded WSGI server capped at --threads, as gunicorn -k gthread --threads N would run it
+  asgi  - uvicorn with asgi.py and ASGI_THREADS=--threads; Spotify calls share one client pool
+Mixed load: GET /api/spotify/album/<id> (1 call), POST /api/spotify/callback (2 calls and a
+write) and POST /api/music-showcase followed by a DELETE (1 call, checks overlapped with it).
+Each line of output is a JSON result for one mode and concurrency level, including the peak
+resident memory of the server process.
+
+To compare with the views before they were async, serve an older checkout in sync mode:
+  git worktree add /tmp/spotlight-before <revision>
+  python benchmarks/bench_spotify_concurrency.py --mode sync --backend-dir /tmp/spotlight-before/spotlight-backend
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+ALBUM = {
+    'id': 'album', 'name': 'Fake Album', 'album_type': 'album', 'total_tracks': 10,
+    'release_date': '2024-01-01', 'artists': [{'name': 'Fake Artist'}],
+    'images': [{'url': 'https://i.scdn.co/image/fake'}],
+    'external_urls': {'spotify': 'https://open.spotify.com/album/fake'}, 'tracks': {'items': []}
+}
+
+def percentile(values, pct):
+    if not values:
+        return None
+    values = sorted(values)
+    index = min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))
+    return values[index]
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+def wait_for_port(port, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=1).close()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f'Nothing listening on port {port}')
+
+def fake_spotify(latency, handshake):
+    """ASGI app answering the Spotify calls the benchmarked routes make"""
+    seen_connections = set()
+
+    async def app(scope, receive, send):
+        if scope['type'] != 'http':
+            return
+        while (await receive()).get('more_body'):
+            pass
+        delay = latency
+        if scope['client'] not in seen_connections:
+            seen_connections.add(scope['client'])
+            delay += handshake
+        await asyncio.sleep(delay)
+        path = scope['path']
+        if path == '/api/token':
+            body = {'access_token': 'fake-access', 'refresh_token': 'fake-refresh', 'expires_in': 3600}
+        elif path == '/v1/me':
+            body = {'id': 'fake-user'}
+        else:
+            body = dict(ALBUM, id=path.rsplit('/', 1)[-1])
+        payload = json.dumps(body).encode()
+        await send({'type': 'http.response.start', 'status': 200, 'headers': [(b'content-type', b'application/json')]})
+        await send({'type': 'http.response.body', 'body': payload})
+
+    return app
+
+def serve(mode, port, spotify_url, threads, backend_dir):
+    """Run one app server process (called in a subprocess)"""
+    sys.path.insert(0, backend_dir)
+    os.environ['ASGI_THREADS'] = str(threads)
+    if mode == 'asgi':
+        import uvicorn
+        import asgi
+        asgi.app.config.update(SPOTIFY_TOKEN_URL=f'{spotify_url}/api/token', SPOTIFY_API_BASE_URL=f'{spotify_url}/v1')
+        uvicorn.run(asgi.application, host='127.0.0.1', port=port, log_level='warning')
+        return
+
+    from werkzeug.serving import BaseWSGIServer
+    from app import create_app
+    from app.utils.access_log import QuietRequestHandler
+
+    app = create_app('production')
+    app.config.update(SPOTIFY_TOKEN_URL=f'{spotify_url}/api/token', SPOTIFY_API_BASE_URL=f'{spotify_url}/v1')
+    executor = ThreadPoolExecutor(max_workers=threads)
+
+    class RequestHandler(QuietRequestHandler):
+        # One request per connection: a pool thread would otherwise stay on one keep-alive client
+        protocol_version = 'HTTP/1.0'
+
+    class PooledWSGIServer(BaseWSGIServer):
+        """Handles each connection on a fixed pool of threads, like gunicorn's gthread worker"""
+        multithread = True
+        request_queue_size = 1024
+
+        def process_request(self, request, client_address):
+            executor.submit(self._handle, request, client_address)
+
+        def _handle(self, request, client_address):
+            try:
+                self.finish_request(request, client_address)
+            except Exception:
+                self.handle_error(request, client_address)
+            finally:
+                self.shutdown_request(request)
+
+    PooledWSGIServer('127.0.0.1', port, app, handler=RequestHandler).serve_forever()
+
+def seed(users):
+    from app import create_app, db
+    from app.models import User, SpotifyConnection
+    from app.utils.schema import upgrade_database
+    from flask_jwt_extended import create_access_token
+
+    app = create_app('production')
+    with app.app_context():
+        upgrade_database()
+        db.session.add_all([User(email=f'spotify{i}@bench.example', username=f'spotify{i}', password_hash='x') for i in range(users)])
+        db.session.commit()
+        user_ids = [row.id for row in db.session.query(User.id)]
+        expires_at = datetime.utcnow() + timedelta(days=1)
+        db.session.add_all([
+            SpotifyConnection(user_id=user_id, spotify_user_id='fake-user', access_token='fake-access',
+                              refresh_token='fake-refresh', token_expires_at=expires_at)
+            for user_id in user_ids
+        ])
+        db.session.commit()
+        return [create_access_token(identity=user_id) for user_id in user_ids]
+
+def peak_rss_mb(pid):
+    try:
+        with open(f'/proc/{pid}/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    return None
+
+def load(base_url, tokens, concurrency, seconds, seed_value):
+    import requests
+
+    latencies = []
+    statuses = {}
+    lock = threading.Lock()
+    deadline = time.perf_counter() + seconds
+
+    def worker(n):
+        rng = random.Random(seed_value + n)
+        session = requests.Session()
+        local_latencies = []
+        local_statuses = {}
+        while time.perf_counter() < deadline:
+            token = tokens[rng.randrange(len(tokens))]
+            headers = {'Authorization': f'Bearer {token}'}
+            scenario = rng.random()
+            started = time.perf_counter()
+            if scenario < 0.5:
+                response = session.get(f'{base_url}/api/spotify/album/{rng.randrange(10 ** 6)}', headers=headers)
+            elif scenario < 0.75:
+                response = session.post(f'{base_url}/api/spotify/callback', headers=headers, json={'code': 'fake-code'})
+            else:
+                response = session.post(f'{base_url}/api/music-showcase', headers=headers,
+                                        json={'spotify_item_id': f'album{rng.randrange(10 ** 9)}'})
+                if response.status_code == 201:
+                    item_id = response.json()['item']['id']
+                    session.delete(f'{base_url}/api/music-showcase/{item_id}', headers=headers)
+            local_latencies.append(time.perf_counter() - started)
+            local_statuses[response.status_code] = local_statuses.get(response.status_code, 0) + 1
+        with lock:
+            latencies.extend(local_latencies)
+            for status, count in local_statuses.items():
+                statuses[status] = statuses.get(status, 0) + count
+
+    workers = [threading.Thread(target=worker, args=(n,)) for n in range(concurrency)]
+    started = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    return latencies, statuses, elapsed
+
+def run(args):
+    import uvicorn
+
+    # Fresh database for every run; the server subprocesses inherit it through the environment
+    database_path = os.path.join(tempfile.mkdtemp(), 'bench_spotify.db')
+    os.environ['DATABASE_URL'] = f'sqlite:///{database_path}'
+    os.environ.setdefault('ACCESS_LOG_ENABLED', 'false')
+    tokens = seed(args.users)
+
+    spotify_port = free_port()
+    spotify = uvicorn.Server(uvicorn.Config(
+        fake_spotify(args.latency_ms / 1000, args.handshake_ms / 1000),
+        host='127.0.0.1', port=spotify_port, log_level='warning', backlog=4096
+    ))
+    threading.Thread(target=spotify.run, daemon=True).start()
+    wait_for_port(spotify_port)
+
+    modes = ['sync', 'asgi'] if args.mode == 'all' else [args.mode]
+    for mode in modes:
+        port = free_port()
+        server = subprocess.Popen(
+            [sys.executable, os.path.abspath(__file__), '--serve', mode, '--port', str(port),
+             '--spotify-url', f'http://127.0.0.1:{spotify_port}', '--threads', str(args.threads),
+             '--backend-dir', os.path.abspath(args.backend_dir)],
+            cwd=os.path.abspath(args.backend_dir)
+        )
+        try:
+            wait_for_port(port)
+            base_url = f'http://127.0.0.1:{port}'
+            load(base_url, tokens, min(args.threads, 4), 1, args.seed)  # Warm up
+            for concurrency in args.concurrency:
+                latencies, statuses, elapsed = load(base_url, tokens, concurrency, args.seconds, args.seed)
+                print(json.dumps({
+                    'mode': mode,
+                    'backend_dir': args.backend_dir,
+                    'threads': args.threads,
+                    'concurrency': concurrency,
+                    'latency_ms': args.latency_ms,
+                    'handshake_ms': args.handshake_ms,
+                    'requests': len(latencies),
+                    'throughput_rps': round(len(latencies) / elapsed, 1),
+                    'p50_ms': round(percentile(latencies, 50) * 1000, 1),
+                    'p95_ms': round(percentile(latencies, 95) * 1000, 1),
+                    'p99_ms': round(percentile(latencies, 99) * 1000, 1),
+                    'statuses': statuses,
+                    'server_peak_rss_mb': peak_rss_mb(server.pid)
+                }), flush=True)
+        finally:
+            server.terminate()
+            server.wait()
+    spotify.should_exit = True
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark Spotify-bound routes, sync WSGI vs ASGI')
+    parser.add_argument('--mode', choices=['sync', 'asgi', 'all'], default='all')
+    parser.add_argument('--threads', type=int, default=8, help='Request threads in the server process')
+    parser.add_argument('--concurrency', type=lambda value: [int(n) for n in value.split(',')], default=[8, 32, 128],
+                        help='Comma-separated numbers of concurrent clients')
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--latency-ms', type=float, default=100, help='Fake Spotify response time')
+    parser.add_argument('--handshake-ms', type=float, default=50, help='Extra time for the first request on a new connection')
+    parser.add_argument('--users', type=int, default=200)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--backend-dir', default=BACKEND_DIR, help='Checkout whose app the servers run (default: this one)')
+    parser.add_argument('--serve', choices=['sync', 'asgi'], help=argparse.SUPPRESS)
+    parser.add_argument('--port', type=int, help=argparse.SUPPRESS)
+    parser.add_argument('--spotify-url', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.serve, args.port, args.spotify_url, args.threads, os.path.abspath(args.backend_dir))
+    else:
+        run(args)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,159 @@
+"""
+Benchmark SQLite under mixed public-profile reads and click writes
+Usage: python benchmarks/bench_sqlite_concurrency.py [--threads 16] [--seconds 10] [--mode default|concurrent|all]
+
+Each mode runs in a fresh interpreter against its own temporary database file:
+  default     - stock SQLite settings (rollback journal, no busy timeout)
+  concurrent  - SQLITE_CONCURRENT_MODE: WAL, tuned PRAGMAs and the single writer queue
+"""
+import argparse
+import json
+import logging
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def percentile(values, pct):
+    if not values:
+        return None
+    values = sorted(values)
+    index = min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))
+    return values[index]
+
+class ErrorCounter(logging.Handler):
+    """Counts error records (e.g. failed click inserts that the route swallows)"""
+
+    def __init__(self):
+        super().__init__(level=logging.ERROR)
+        self.count = 0
+        self.locked = 0
+
+    def emit(self, record):
+        self.count += 1
+        if 'locked' in record.getMessage():
+            self.locked += 1
+
+def run(mode, threads, seconds, users, read_ratio):
+    database_path = os.path.join(tempfile.mkdtemp(), 'bench_sqlite.db')
+    os.environ['DATABASE_URL'] = f'sqlite:///{database_path}'
+    os.environ['SQLITE_CONCURRENT_MODE'] = 'true' if mode == 'concurrent' else 'false'
+
+    from app import create_app, db
+    from app.models import User, UserProfile, SocialLink, ProfileClick
+    from flask_jwt_extended import create_access_token
+
+    app = create_app('development')
+    app.config['DEBUG'] = False
+    errors = ErrorCounter()
+    app.logger.addHandler(errors)
+    logging.getLogger('app.utils.sqlite').addHandler(errors)
+
+    with app.app_context():
+        db.create_all()
+        for i in range(users):
+            user = User(email=f'artist{i}@example.com', username=f'artist{i}')
+            user.password_hash = 'x'
+            db.session.add(user)
+        db.session.commit()
+        user_ids = [row.id for row in db.session.query(User.id)]
+        db.session.add_all([UserProfile(user_id=user_id, display_name=f'Artist {user_id}') for user_id in user_ids])
+        db.session.add_all([
+            SocialLink(user_id=user_id, platform='Instagram', url='https://instagram.com/x', position=(n + 1) * 1024)
+            for user_id in user_ids for n in range(5)
+        ])
+        db.session.commit()
+        tokens = {user_id: create_access_token(identity=user_id) for user_id in user_ids}
+
+    latencies = []
+    statuses = {}
+    results_lock = threading.Lock()
+    deadline = time.perf_counter() + seconds
+    expected_clicks = [0]
+
+    def worker(seed):
+        rng = random.Random(seed)
+        client = app.test_client()
+        local_latencies = []
+        local_statuses = {}
+        local_clicks = 0
+        while time.perf_counter() < deadline:
+            user_id = rng.choice(user_ids)
+            started = time.perf_counter()
+            if rng.random() < read_ratio:
+                response = client.get('/api/social-links', headers={'Authorization': f'Bearer {tokens[user_id]}'})
+            else:
+                # Unique address per request so deduplication never suppresses the click
+                remote_addr = f'10.{rng.randrange(256)}.{rng.randrange(256)}.{rng.randrange(256)}'
+                response = client.get(f'/api/profiles/artist{user_id - 1}', environ_base={'REMOTE_ADDR': remote_addr})
+                local_clicks += 1
+            local_latencies.append(time.perf_counter() - started)
+            local_statuses[response.status_code] = local_statuses.get(response.status_code, 0) + 1
+        with results_lock:
+            latencies.extend(local_latencies)
+            for status, count in local_statuses.items():
+                statuses[status] = statuses.get(status, 0) + count
+            expected_clicks[0] += local_clicks
+
+    workers = [threading.Thread(target=worker, args=(n,)) for n in range(threads)]
+    started = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    with app.app_context():
+        writer = app.extensions.get('sqlite_writer')
+        if writer:
+            writer.flush()
+        stored_clicks = db.session.query(db.func.count(ProfileClick.id)).scalar()
+
+    return {
+        'mode': mode,
+        'threads': threads,
+        'seconds': round(elapsed, 2),
+        'requests': len(latencies),
+        'throughput_rps': round(len(latencies) / elapsed, 1),
+        'p50_ms': round(percentile(latencies, 50) * 1000, 2),
+        'p95_ms': round(percentile(latencies, 95) * 1000, 2),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 2),
+        'statuses': statuses,
+        'logged_errors': errors.count,
+        'database_locked_errors': errors.locked,
+        'clicks_attempted': expected_clicks[0],
+        'clicks_stored': stored_clicks
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark SQLite default vs concurrent mode')
+    parser.add_argument('--mode', choices=['default', 'concurrent', 'all'], default='all')
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--users', type=int, default=200)
+    parser.add_argument('--read-ratio', type=float, default=0.3,
+                        help='Share of requests that only read (the rest are public profile views that write a click)')
+    args = parser.parse_args()
+
+    modes = ['default', 'concurrent'] if args.mode == 'all' else [args.mode]
+    for mode in modes:
+        if len(modes) > 1:
+            # Fresh interpreter per mode: engine listeners and config are process-wide
+            subprocess.run([
+                sys.executable, os.path.abspath(__file__),
+                '--mode', mode,
+                '--threads', str(args.threads),
+                '--seconds', str(args.seconds),
+                '--users', str(args.users),
+                '--read-ratio', str(args.read_ratio)
+            ], check=True)
+        else:
+            print(json.dumps(run(mode, args.threads, args.seconds, args.users, args.read_ratio)))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+"""
+Benchmark application import and cold-start time, with and without the API docs
+Usage: python benchmarks/bench_startup.py [--runs 5] [--mode off|lazy|prebuilt|all]
+
+Every run is a fresh interpreter so module imports are measured cold:
+  off       - API_DOCS_ENABLED=false: no docs routes, flasgger never imported
+  lazy      - docs enabled, spec generated from the route docstrings on the first /apispec.json
+  prebuilt  - docs enabled, spec served from a file written by build_apispec.py
+"""
+import argparse
+import json
+import os
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def measure(mode):
+    """Runs inside the child interpreter; environment is already set by the parent"""
+    sys.path.insert(0, BACKEND_DIR)
+
+    started = time.perf_counter()
+    import app as app_package
+    imported = time.perf_counter()
+    application = app_package.create_app('production')
+    created = time.perf_counter()
+    flasgger_at_startup = 'flasgger' in sys.modules
+    startup_rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+    client = application.test_client()
+    first_health = time.perf_counter()
+    client.get('/api/health')
+    health_done = time.perf_counter()
+
+    result = {
+        'mode': mode,
+        'import_ms': (imported - started) * 1000,
+        'create_app_ms': (created - imported) * 1000,
+        'first_request_ms': (health_done - first_health) * 1000,
+        'flasgger_imported_at_startup': flasgger_at_startup,
+        'startup_max_rss_mb': startup_rss_mb
+    }
+
+    if mode != 'off':
+        spec_started = time.perf_counter()
+        response = client.get('/apispec.json')
+        spec_done = time.perf_counter()
+        client.get('/apispec.json')
+        cached_done = time.perf_counter()
+        assert response.status_code == 200, response.status_code
+        result['first_apispec_ms'] = (spec_done - spec_started) * 1000
+        result['cached_apispec_ms'] = (cached_done - spec_done) * 1000
+
+    return result
+
+def run(mode, runs):
+    env = dict(os.environ)
+    workdir = tempfile.mkdtemp()
+    env['DATABASE_URL'] = f"sqlite:///{os.path.join(workdir, 'bench_startup.db')}"
+    env['API_DOCS_ENABLED'] = 'false' if mode == 'off' else 'true'
+    env['API_SPEC_FILE'] = os.path.join(workdir, 'apispec.json')
+
+    if mode == 'prebuilt':
+        subprocess.run(
+            [sys.executable, os.path.join(BACKEND_DIR, 'build_apispec.py'), '--output', env['API_SPEC_FILE']],
+            env=env, cwd=BACKEND_DIR, check=True, stdout=subprocess.DEVNULL
+        )
+
+    samples = []
+    for _ in range(runs):
+        if mode == 'lazy' and os.path.exists(env['API_SPEC_FILE']):
+            # Lazy mode writes the spec on first request; measure the generating path every time
+            os.remove(env['API_SPEC_FILE'])
+        output = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), '--measure', mode],
+            env=env, cwd=BACKEND_DIR, check=True, capture_output=True, text=True
+        ).stdout
+        samples.append(json.loads(output.strip().splitlines()[-1]))
+
+    summary = {'mode': mode, 'runs': runs}
+    for key, value in samples[0].items():
+        if isinstance(value, float):
+            summary[key] = round(statistics.median(sample[key] for sample in samples), 2)
+        elif key != 'mode':
+            summary[key] = value
+    return summary
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark import and cold-start time')
+    parser.add_argument('--mode', choices=['off', 'lazy', 'prebuilt', 'all'], default='all')
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--measure', default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure:
+        print(json.dumps(measure(args.measure)))
+        return
+
+    modes = ['off', 'lazy', 'prebuilt'] if args.mode == 'all' else [args.mode]
+    for mode in modes:
+        print(json.dumps(run(mode, args.runs)))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,118 @@
+"""
+Benchmark deleting a user with a large click history
+Usage: python benchmarks/bench_user_delete.py [--clicks 1000000] [--database-url sqlite:///bench_delete.db]
+
+Compares three strategies on a freshly seeded database:
+  orm       - load every ProfileClick through the relationship and delete it in Python (the old behaviour)
+  cascade   - single DELETE of the user row, relying on ON DELETE CASCADE (passive deletes)
+  chunked   - purge clicks in fixed-size chunks, then delete the user (the background job path)
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def seed(db, User, UserProfile, ProfileClick, clicks, batch_size=50000):
+    """Create one user with the requested number of clicks using bulk inserts"""
+    user = User(email='bench@example.com', username='bench_artist')
+    user.set_password('benchmark-password')
+    db.session.add(user)
+    db.session.commit()
+    db.session.add(UserProfile(user_id=user.id, display_name='Bench Artist'))
+    db.session.commit()
+
+    start = datetime.utcnow() - timedelta(days=365)
+    table = ProfileClick.__table__
+    for offset in range(0, clicks, batch_size):
+        rows = [
+            {
+                'user_id': user.id,
+                'clicked_at': start + timedelta(seconds=i),
+                'ip_address': f'10.0.{(i >> 8) & 255}.{i & 255}',
+                'user_agent': 'bench',
+                'referer': ''
+            }
+            for i in range(offset, min(offset + batch_size, clicks))
+        ]
+        db.session.execute(table.insert(), rows)
+        db.session.commit()
+    return user.id
+
+def run(strategy, clicks, database_url, chunk_size):
+    os.environ['DATABASE_URL'] = database_url
+    from app import create_app, db
+    from app.models import User, UserProfile, ProfileClick
+    from app.services import UserDeletionService
+
+    app = create_app('development')
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        user_id = seed(db, User, UserProfile, ProfileClick, clicks)
+        db.session.remove()
+
+        tracemalloc.start()
+        started = time.perf_counter()
+
+        if strategy == 'orm':
+            user = User.query.get(user_id)
+            for click in user.profile_clicks.all():
+                db.session.delete(click)
+            db.session.delete(user)
+            db.session.commit()
+        elif strategy == 'cascade':
+            UserDeletionService.delete_user(user_id)
+        else:
+            UserDeletionService.purge_clicks(user_id, chunk_size)
+            UserDeletionService.delete_user(user_id)
+
+        elapsed = time.perf_counter() - started
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        remaining = db.session.query(db.func.count(ProfileClick.id)).scalar()
+        db.drop_all()
+
+    return {
+        'strategy': strategy,
+        'clicks': clicks,
+        'seconds': round(elapsed, 3),
+        'peak_python_mb': round(peak / (1024 * 1024), 2),
+        'remaining_clicks': remaining
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark user deletion strategies')
+    parser.add_argument('--clicks', type=int, default=1000000)
+    parser.add_argument('--strategy', choices=['orm', 'cascade', 'chunked', 'all'], default='all')
+    parser.add_argument('--chunk-size', type=int, default=10000)
+    parser.add_argument('--database-url', default=None,
+                        help='Defaults to a temporary SQLite file')
+    args = parser.parse_args()
+
+    database_url = args.database_url
+    if not database_url:
+        database_url = 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'bench_delete.db')
+
+    strategies = ['orm', 'cascade', 'chunked'] if args.strategy == 'all' else [args.strategy]
+    for strategy in strategies:
+        # Each strategy runs in a fresh interpreter so one run's memory doesn't skew the next
+        if len(strategies) > 1:
+            subprocess.run([
+                sys.executable, os.path.abspath(__file__),
+                '--clicks', str(args.clicks),
+                '--strategy', strategy,
+                '--chunk-size', str(args.chunk_size),
+                '--database-url', database_url
+            ], check=True)
+        else:
+            print(run(strategy, args.clicks, database_url, args.chunk_size))
+
+if __name__ == '__main__':
+    main()
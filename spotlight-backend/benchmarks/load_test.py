@@ -0,0 +1,286 @@
+"""
+Load-test the main API scenarios against a database seeded by seed_dataset.py
+Usage: python benchmarks/load_test.py --database-url URL [--scenario all] [--threads 8] [--seconds 10]
+                                      [--output report.json] [--compare baseline.json] [--tolerance 0.15]
+       python benchmarks/load_test.py --report current.json --compare baseline.json
+
+Scenarios run one after another, in-process through the Flask test client (the app is built
+with the production config against --database-url), or over HTTP against a running server
+started on the same database with --base-url:
+  public_profile  - GET /api/profiles/<username>, skewed toward popular artists (records a click)
+  login           - POST /api/auth/login, dominated by password hashing
+  dashboard       - GET /api/profiles/me/bootstrap with links, showcase and analytics summary
+  reorder         - PUT /api/social-links/reorder with a shuffled order of the user's links
+  admin_stats     - GET /api/admin/stats as the seeded admin
+
+The report is JSON with throughput, p50/p90/p95/p99/max latency and status counts per
+scenario. --compare marks a scenario as regressed when its p95 latency rises or its
+throughput falls by more than --tolerance, or its error rate rises, against the baseline
+report, and exits 1.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from seed_dataset import ADMIN_USERNAME, LOAD_TEST_PASSWORD, popularity_weights, username
+
+SCENARIOS = ['public_profile', 'login', 'dashboard', 'reorder', 'admin_stats']
+
+def percentile(values, pct):
+    if not values:
+        return None
+    index = min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))
+    return values[index]
+
+class InProcessClient:
+    """Drives the app through its test client; one per worker thread"""
+
+    def __init__(self, app):
+        self._client = app.test_client()
+
+    def request(self, method, path, token=None, json_body=None, remote_addr=None):
+        headers = {'Authorization': f'Bearer {token}'} if token else {}
+        environ = {'REMOTE_ADDR': remote_addr} if remote_addr else {}
+        response = self._client.open(path, method=method, headers=headers, json=json_body, environ_base=environ)
+        return response.status_code, response.get_json(silent=True)
+
+class HttpClient:
+    """Drives a running server over HTTP with a keep-alive session; one per worker thread
+
+    A caller address is sent as X-Forwarded-For, which the server only uses as
+    request.remote_addr when started with PROXY_FIX_X_FOR=1 (or behind uvicorn, which trusts
+    it from 127.0.0.1). Otherwise every request comes from this machine and click dedupe
+    turns most public_profile writes into no-ops.
+    """
+
+    def __init__(self, base_url):
+        import requests
+        self._base_url = base_url.rstrip('/')
+        self._session = requests.Session()
+
+    def request(self, method, path, token=None, json_body=None, remote_addr=None):
+        headers = {'Authorization': f'Bearer {token}'} if token else {}
+        if remote_addr:
+            headers['X-Forwarded-For'] = remote_addr
+        response = self._session.request(method, self._base_url + path, headers=headers, json=json_body)
+        try:
+            body = response.json()
+        except ValueError:
+            body = None
+        return response.status_code, body
+
+def login(client, name):
+    """Access token and user id for a seeded account"""
+    status, body = client.request('POST', '/api/auth/login', json_body={
+        'email': f'{name}@loadtest.example', 'password': LOAD_TEST_PASSWORD
+    })
+    if status != 200:
+        sys.exit(f'Login as {name} failed with {status}; seed the database with benchmarks/seed_dataset.py first')
+    return body['access_token'], body['user']['id']
+
+def sign_in_accounts(client, users, auth_users):
+    """Sign in a pool of seeded artists plus the admin; tokens and item ids drive the authenticated requests"""
+    accounts = []
+    for n in range(min(auth_users, users)):
+        token, user_id = login(client, username(n))
+        _, links = client.request('GET', '/api/social-links', token=token)
+        _, showcase = client.request('GET', '/api/music-showcase', token=token)
+        accounts.append({
+            'username': username(n),
+            'user_id': user_id,
+            'token': token,
+            'link_ids': [link['id'] for link in links['links']],
+            'item_ids': [item['id'] for item in showcase['items']]
+        })
+    admin_token, _ = login(client, ADMIN_USERNAME)
+    return accounts, admin_token
+
+def summarize(latencies, statuses, seconds):
+    """Throughput, error rate, status counts and latency percentiles for one scenario"""
+    latencies = sorted(latencies)
+    errors = sum(count for status, count in statuses.items() if status >= 400)
+    result = {
+        'requests': len(latencies),
+        'throughput_rps': round(len(latencies) / seconds, 1),
+        'error_rate': round(errors / len(latencies), 4) if latencies else None,
+        'statuses': {str(status): count for status, count in sorted(statuses.items())}
+    }
+    for pct in (50, 90, 95, 99):
+        value = percentile(latencies, pct)
+        result[f'p{pct}_ms'] = round(value * 1000, 2) if value is not None else None
+    result['max_ms'] = round(latencies[-1] * 1000, 2) if latencies else None
+    return result
+
+class LoadTest:
+    def __init__(self, make_client, users, auth_users, seed):
+        self.make_client = make_client
+        self.users = users
+        self.seed = seed
+        self.cumulative = popularity_weights(users)
+        self.accounts, self.admin_token = sign_in_accounts(make_client(), users, auth_users)
+
+    def step(self, scenario, client, rng):
+        """Issue one request for the scenario; returns the status code"""
+        if scenario == 'public_profile':
+            n = rng.choices(range(self.users), cum_weights=self.cumulative)[0]
+            remote_addr = f'10.{rng.randrange(256)}.{rng.randrange(256)}.{rng.randrange(256)}'
+            return client.request('GET', f'/api/profiles/{username(n)}', remote_addr=remote_addr)[0]
+        if scenario == 'login':
+            return client.request('POST', '/api/auth/login', json_body={
+                'email': f'{username(rng.randrange(self.users))}@loadtest.example', 'password': LOAD_TEST_PASSWORD
+            })[0]
+        if scenario == 'dashboard':
+            account = rng.choice(self.accounts)
+            return client.request('GET', '/api/profiles/me/bootstrap?include=links,showcase,analytics_summary', token=account['token'])[0]
+        if scenario == 'reorder':
+            account = rng.choice(self.accounts)
+            link_ids = rng.sample(account['link_ids'], len(account['link_ids']))
+            return client.request('PUT', '/api/social-links/reorder', token=account['token'], json_body={'link_ids': link_ids})[0]
+        if scenario == 'admin_stats':
+            return client.request('GET', '/api/admin/stats', token=self.admin_token)[0]
+        raise ValueError(f'Unknown scenario {scenario}')
+
+    def run(self, scenario, threads, seconds, warmup):
+        latencies = []
+        statuses = {}
+        results_lock = threading.Lock()
+        measure_from = time.perf_counter() + warmup
+        deadline = measure_from + seconds
+
+        def worker(worker_id):
+            rng = random.Random(f'{self.seed}-{scenario}-{worker_id}')
+            client = self.make_client()
+            local_latencies = []
+            local_statuses = {}
+            while True:
+                started = time.perf_counter()
+                if started >= deadline:
+                    break
+                status = self.step(scenario, client, rng)
+                if started >= measure_from:
+                    local_latencies.append(time.perf_counter() - started)
+                    local_statuses[status] = local_statuses.get(status, 0) + 1
+            with results_lock:
+                latencies.extend(local_latencies)
+                for status, count in local_statuses.items():
+                    statuses[status] = statuses.get(status, 0) + count
+
+        workers = [threading.Thread(target=worker, args=(n,)) for n in range(threads)]
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+
+        return summarize(latencies, statuses, seconds)
+
+def compare(report, baseline, tolerance, min_requests=1):
+    """Per-scenario deltas against the baseline; a scenario regresses on slower p95 or lower throughput
+
+    Scenarios with fewer than min_requests requests in either report are too noisy to judge and are skipped.
+    """
+    comparison = {}
+    for scenario, current in report['scenarios'].items():
+        previous = baseline['scenarios'].get(scenario)
+        if not previous or min(previous['requests'], current['requests']) < max(min_requests, 1):
+            continue
+        p95_change = current['p95_ms'] / previous['p95_ms'] - 1 if previous['p95_ms'] else 0.0
+        throughput_change = current['throughput_rps'] / previous['throughput_rps'] - 1 if previous['throughput_rps'] else 0.0
+        comparison[scenario] = {
+            'p50_ms': [previous['p50_ms'], current['p50_ms']],
+            'p95_ms': [previous['p95_ms'], current['p95_ms']],
+            'p95_change': round(p95_change, 3),
+            'throughput_rps': [previous['throughput_rps'], current['throughput_rps']],
+            'throughput_change': round(throughput_change, 3),
+            'error_rate': [previous['error_rate'], current['error_rate']],
+            'regressed': p95_change > tolerance or throughput_change < -tolerance or current['error_rate'] > previous['error_rate']
+        }
+    return comparison
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            cwd=os.path.dirname(os.path.abspath(__file__)), capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def main():
+    parser = argparse.ArgumentParser(description='Load-test the main API scenarios')
+    parser.add_argument('--database-url', default=None, help='Seeded database for in-process runs')
+    parser.add_argument('--base-url', default=None, help='Drive a running server over HTTP instead, e.g. http://127.0.0.1:5000')
+    parser.add_argument('--scenario', choices=SCENARIOS + ['all'], default='all')
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--warmup', type=float, default=1, help='Seconds per scenario before measuring starts')
+    parser.add_argument('--users', type=int, default=10000, help='--users the database was seeded with')
+    parser.add_argument('--auth-users', type=int, default=50, help='Artists signed in for the authenticated scenarios')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', default=None, help='Also write the report to this file (e.g. to keep as a baseline)')
+    parser.add_argument('--report', default=None, help='Compare an existing report instead of running')
+    parser.add_argument('--compare', default=None, help='Baseline report to check for regressions')
+    parser.add_argument('--tolerance', type=float, default=0.15, help='Allowed relative p95 increase or throughput drop')
+    args = parser.parse_args()
+
+    if args.report:
+        with open(args.report) as f:
+            report = json.load(f)
+    else:
+        if args.base_url:
+            make_client = lambda: HttpClient(args.base_url)
+            target = args.base_url
+        elif args.database_url:
+            os.environ['DATABASE_URL'] = args.database_url
+            # Access log lines would only measure stderr; turn them on explicitly if wanted
+            os.environ.setdefault('ACCESS_LOG_ENABLED', 'false')
+            from app import create_app
+            app = create_app('production')
+            make_client = lambda: InProcessClient(app)
+            target = app.config['SQLALCHEMY_DATABASE_URI'].split(':', 1)[0]
+        else:
+            parser.error('--database-url or --base-url is required')
+
+        load_test = LoadTest(make_client, args.users, args.auth_users, args.seed)
+        scenarios = SCENARIOS if args.scenario == 'all' else [args.scenario]
+        report = {
+            'meta': {
+                'recorded_at': datetime.utcnow().isoformat(),
+                'revision': git_revision(),
+                'target': target,
+                'python': platform.python_version(),
+                'threads': args.threads,
+                'seconds': args.seconds,
+                'users': args.users,
+                # Over HTTP the public_profile callers only differ when the server trusts X-Forwarded-For
+                'caller_addresses': 'x-forwarded-for' if args.base_url else 'remote_addr'
+            },
+            'scenarios': {
+                scenario: load_test.run(scenario, args.threads, args.seconds, args.warmup)
+                for scenario in scenarios
+            }
+        }
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        report['comparison'] = compare(report, baseline, args.tolerance)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    print(json.dumps(report, indent=2))
+
+    if any(result['regressed'] for result in report.get('comparison', {}).values()):
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
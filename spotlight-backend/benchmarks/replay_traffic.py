@@ -0,0 +1,263 @@
+"""
+Replay captured production traffic against a local app instance
+Usage: python benchmarks/replay_traffic.py CAPTURE --database-url URL [--speed 1.0] [--output report.json]
+       python benchmarks/replay_traffic.py CAPTURE --base-url http://127.0.0.1:5000 [--speed 2.0]
+       python benchmarks/replay_traffic.py --report build_b.json --compare build_a.json
+
+CAPTURE is a file written with TRAFFIC_CAPTURE_ENABLED. Replay targets a database seeded by
+seed_dataset.py, and it writes to it, so use a scratch copy. Requests are sent open-loop at their
+captured offsets divided by --speed: bursts stay bursts and concurrency follows the original
+arrival pattern rather than a fixed thread count. Anonymized values are mapped back onto seeded
+data by popularity: the most requested username becomes artist0, the busiest signed-in user
+the first signed-in artist, and so on.
+
+The report has one entry per route with replayed and captured latency percentiles. Replay each
+build against the same seeded data, then pass one report as --compare for the other to get the
+per-route latency deltas.
+"""
+import argparse
+import itertools
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from urllib.parse import urlencode
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from load_test import HttpClient, InProcessClient, compare, git_revision, percentile, sign_in_accounts, summarize
+from seed_dataset import LOAD_TEST_PASSWORD, username
+
+# traffic_capture.REDACTED, which can't be imported before the environment is set up
+REDACTED = 'redacted'
+PATH_PARAMETER = re.compile(r'<(?:[^:<>]+:)?([^<>]+)>')
+
+class Replayer:
+    def __init__(self, records, accounts, admin_token, users, seed):
+        self.records = records
+        self.accounts = accounts
+        self.admin_token = admin_token
+        self.rng = random.Random(seed)
+        self._rng_lock = threading.Lock()
+        self._unique = itertools.count()
+
+        # Rank anonymized usernames and callers by how often they appear
+        usernames = Counter(record['p']['username'] for record in records if 'username' in record['p'])
+        self.usernames = {token: username(rank % users) for rank, (token, _) in enumerate(usernames.most_common())}
+        callers = Counter(record['u'] for record in records if record['u'])
+        self.callers = {token: accounts[rank % len(accounts)] for rank, (token, _) in enumerate(callers.most_common())}
+
+    def _choice(self, values):
+        with self._rng_lock:
+            return self.rng.choice(values) if values else 0
+
+    def _synthesize(self, shape, name, account):
+        """A body value matching the captured shape, using the account's own ids where they matter"""
+        if isinstance(shape, dict):
+            return {key: self._synthesize(value, key, account) for key, value in shape.items()}
+        if isinstance(shape, list):
+            length, item = shape
+            if name == 'link_ids':
+                return account['link_ids'][:length]
+            if name == 'item_ids':
+                return account['item_ids'][:length]
+            return [self._synthesize(item, name, account) for _ in range(length)]
+        if name in ('before_id', 'after_id'):
+            return self._choice(account['link_ids'] + account['item_ids'])
+        if name == 'username':
+            return f'replay{next(self._unique)}'
+        if shape == REDACTED:
+            # Secrets are captured without even their length; the load test password passes validation
+            return LOAD_TEST_PASSWORD
+        if shape == 'url':
+            return f'https://example.com/replay/{next(self._unique)}'
+        if shape == 'email':
+            return f'replay{next(self._unique)}@loadtest.example'
+        if isinstance(shape, int) and not isinstance(shape, bool):
+            return 'x' * shape
+        if shape == 'int':
+            return 1
+        if shape == 'float':
+            return 1.0
+        return shape
+
+    def build(self, record):
+        """(method, path, token, json body) for a captured record, or None when it cannot be replayed"""
+        body = record['b']
+        if isinstance(body, dict) and '_content_type' in body:
+            return None
+
+        account = self.callers.get(record['u']) or self._choice(self.accounts)
+        token = None
+        if record['u']:
+            token = self.admin_token if record['r'].startswith('/api/admin') else account['token']
+
+        def parameter(match):
+            name = match.group(1)
+            value = record['p'].get(name)
+            if name == 'username':
+                return self.usernames.get(value, username(0))
+            if name == 'link_id':
+                return str(self._choice(account['link_ids']))
+            if name == 'item_id':
+                return str(self._choice(account['item_ids']))
+            if name == 'user_id':
+                return str(self._choice(self.accounts)['user_id'])
+            return value
+
+        path = PATH_PARAMETER.sub(parameter, record['r'])
+        if record['q']:
+            path += '?' + urlencode(record['q'])
+
+        if record['e'] == 'auth.login':
+            body = {'email': f"{account['username']}@loadtest.example", 'password': LOAD_TEST_PASSWORD}
+        elif body is not None:
+            body = self._synthesize(body, None, account)
+        return record['m'], path, token, body
+
+    def run(self, make_client, speed, max_workers):
+        local = threading.local()
+        results_lock = threading.Lock()
+        routes = {}
+        in_flight = [0, 0]
+        lags = []
+
+        def send(key, request):
+            client = getattr(local, 'client', None)
+            if client is None:
+                client = local.client = make_client()
+            method, path, token, body = request
+            with results_lock:
+                in_flight[0] += 1
+                in_flight[1] = max(in_flight[1], in_flight[0])
+            started = time.perf_counter()
+            status, _ = client.request(method, path, token=token, json_body=body)
+            elapsed = time.perf_counter() - started
+            with results_lock:
+                in_flight[0] -= 1
+                route = routes.setdefault(key, {'latencies': [], 'statuses': {}})
+                route['latencies'].append(elapsed)
+                route['statuses'][status] = route['statuses'].get(status, 0) + 1
+
+        skipped = 0
+        first = self.records[0]['t']
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            for record in self.records:
+                request = self.build(record)
+                if request is None:
+                    skipped += 1
+                    continue
+                due = started + (record['t'] - first) / speed
+                delay = due - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                else:
+                    lags.append(-delay)
+                pool.submit(send, f"{record['m']} {record['r']}", request)
+        seconds = time.perf_counter() - started
+
+        captured = {}
+        for record in self.records:
+            captured.setdefault(f"{record['m']} {record['r']}", []).append(record['d'])
+
+        scenarios = {}
+        for key, route in sorted(routes.items()):
+            result = summarize(route['latencies'], route['statuses'], seconds)
+            durations = sorted(captured[key])
+            result['captured_p50_ms'] = percentile(durations, 50)
+            result['captured_p95_ms'] = percentile(durations, 95)
+            scenarios[key] = result
+
+        lags.sort()
+        return {
+            'records': len(self.records),
+            'skipped': skipped,
+            'seconds': round(seconds, 2),
+            'captured_seconds': round(self.records[-1]['t'] - first, 2),
+            'captured_max_concurrency': max(record['c'] for record in self.records),
+            'replay_max_concurrency': in_flight[1],
+            'late_sends': len(lags),
+            'p95_send_lag_ms': round(percentile(lags, 95) * 1000, 2) if lags else 0.0
+        }, scenarios
+
+def main():
+    parser = argparse.ArgumentParser(description='Replay captured traffic against a local app instance')
+    parser.add_argument('capture', nargs='?', help='File written by TRAFFIC_CAPTURE_ENABLED')
+    parser.add_argument('--database-url', default=None, help='Seeded database for an in-process app')
+    parser.add_argument('--base-url', default=None, help='Replay against a running server instead')
+    parser.add_argument('--speed', type=float, default=1.0, help='2.0 replays twice as fast as captured')
+    parser.add_argument('--limit', type=int, default=None, help='Replay only the first N requests')
+    parser.add_argument('--max-workers', type=int, default=64, help='Upper bound on concurrent replayed requests')
+    parser.add_argument('--users', type=int, default=10000, help='--users the database was seeded with')
+    parser.add_argument('--auth-users', type=int, default=50, help='Seeded artists that stand in for signed-in users')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', default=None)
+    parser.add_argument('--report', default=None, help='Compare an existing report instead of replaying')
+    parser.add_argument('--compare', default=None, help='Report from the other build')
+    parser.add_argument('--tolerance', type=float, default=0.15, help='Allowed relative p95 increase per route')
+    parser.add_argument('--min-requests', type=int, default=20, help='Routes with fewer replayed requests are not compared')
+    args = parser.parse_args()
+
+    if args.report:
+        with open(args.report) as f:
+            report = json.load(f)
+    else:
+        if not args.capture:
+            parser.error('a capture file is required unless --report is given')
+        if args.base_url:
+            make_client = lambda: HttpClient(args.base_url)
+            target = args.base_url
+        elif args.database_url:
+            os.environ['DATABASE_URL'] = args.database_url
+            os.environ.setdefault('ACCESS_LOG_ENABLED', 'false')
+            os.environ['TRAFFIC_CAPTURE_ENABLED'] = 'false'
+            from app import create_app
+            app = create_app('production')
+            make_client = lambda: InProcessClient(app)
+            target = app.config['SQLALCHEMY_DATABASE_URI'].split(':', 1)[0]
+        else:
+            parser.error('--database-url or --base-url is required')
+
+        # Imported only now: the app's config reads the environment set above when first imported
+        from app.utils.traffic_capture import read_capture
+        records = sorted(itertools.islice(read_capture(args.capture), args.limit), key=lambda record: record['t'])
+        if not records:
+            sys.exit(f'No requests in {args.capture}')
+
+        accounts, admin_token = sign_in_accounts(make_client(), args.users, args.auth_users)
+        replayer = Replayer(records, accounts, admin_token, args.users, args.seed)
+        summary, scenarios = replayer.run(make_client, args.speed, args.max_workers)
+        report = {
+            'meta': {
+                'recorded_at': datetime.utcnow().isoformat(),
+                'revision': git_revision(),
+                'target': target,
+                'capture': os.path.abspath(args.capture),
+                'speed': args.speed,
+                **summary
+            },
+            'scenarios': scenarios
+        }
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        report['comparison'] = compare(report, baseline, args.tolerance, args.min_requests)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    print(json.dumps(report, indent=2))
+
+    if any(result['regressed'] for result in report.get('comparison', {}).values()):
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
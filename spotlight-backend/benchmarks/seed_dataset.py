@@ -0,0 +1,199 @@
+"""
+Seed a large, repeatable dataset for load testing
+Usage: python benchmarks/seed_dataset.py --database-url URL [--users 10000] [--clicks 1000000] [--seed 42] [--reset]
+
+Builds the schema from the migrations, then bulk-inserts users, profiles, social links,
+showcase items and profile clicks. User n is artist{n} / artist{n}@loadtest.example and
+loadtest_admin is an admin; every account uses LOAD_TEST_PASSWORD. Clicks are skewed toward
+low-numbered (popular) artists and spread over the last 90 days. The same --seed always
+produces the same rows, so runs against different builds see identical data.
+"""
+import argparse
+import json
+import os
+import random
+import string
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+LOAD_TEST_PASSWORD = 'loadtest-password'
+ADMIN_USERNAME = 'loadtest_admin'
+PLATFORMS = ['Instagram', 'TikTok', 'YouTube', 'Twitter', 'SoundCloud', 'Bandcamp', 'Website']
+ITEM_TYPES = ['album', 'single', 'ep', 'track']
+POSITION_GAP = 1024
+
+def username(n):
+    return f'artist{n}'
+
+def popularity_weights(users, skew=0.8):
+    """Cumulative Zipf-like weights: artist0 is the most viewed, the tail gets little traffic"""
+    total = 0.0
+    cumulative = []
+    for rank in range(users):
+        total += 1 / (rank + 1) ** skew
+        cumulative.append(total)
+    return cumulative
+
+def _insert(db, table, rows, batch_size):
+    for offset in range(0, len(rows), batch_size):
+        db.session.execute(table.insert(), rows[offset:offset + batch_size])
+        db.session.commit()
+
+def seed(db, users, clicks, links_per_user=5, showcase_per_user=None, seed=42, batch_size=10000):
+    """Bulk-insert the dataset into an empty schema; returns row counts
+
+    showcase_per_user defaults to, and may not exceed, the API's SHOWCASE_LIMIT: fuller
+    showcases than any real user can have would skew the dashboard and profile scenarios.
+    """
+    from app.models import User, UserProfile, SocialLink, MusicShowcase, ProfileClick
+    from app.routes.music_showcase import SHOWCASE_LIMIT
+
+    if showcase_per_user is None:
+        showcase_per_user = SHOWCASE_LIMIT
+    if not 0 <= showcase_per_user <= SHOWCASE_LIMIT:
+        raise ValueError(f'showcase_per_user must be between 0 and SHOWCASE_LIMIT ({SHOWCASE_LIMIT})')
+
+    rng = random.Random(seed)
+    now = datetime.utcnow()
+
+    # One hash for every account: hashing each password would dominate seeding time
+    account = User()
+    account.set_password(LOAD_TEST_PASSWORD)
+    password_hash = account.password_hash
+
+    user_rows = [
+        {
+            'email': f'{username(n)}@loadtest.example',
+            'username': username(n),
+            'password_hash': password_hash,
+            'is_admin': False,
+            'created_at': now - timedelta(days=365) + timedelta(seconds=n),
+            'updated_at': now
+        }
+        for n in range(users)
+    ]
+    user_rows.append({
+        'email': f'{ADMIN_USERNAME}@loadtest.example',
+        'username': ADMIN_USERNAME,
+        'password_hash': password_hash,
+        'is_admin': True,
+        'created_at': now,
+        'updated_at': now
+    })
+    _insert(db, User.__table__, user_rows, batch_size)
+    ids = dict(db.session.query(User.username, User.id))
+    user_ids = [ids[username(n)] for n in range(users)]
+
+    _insert(db, UserProfile.__table__, [
+        {
+            'user_id': user_id,
+            'display_name': f'Artist {n}',
+            'bio': f'Load test artist number {n}',
+            'theme_settings': {},
+            'is_public': True,
+            'created_at': now,
+            'updated_at': now
+        }
+        for n, user_id in enumerate(user_ids)
+    ], batch_size)
+
+    _insert(db, SocialLink.__table__, [
+        {
+            'user_id': user_id,
+            'platform': PLATFORMS[i % len(PLATFORMS)],
+            'url': f'https://example.com/{user_id}/{i}',
+            'display_text': f'Link {i}',
+            'position': (i + 1) * POSITION_GAP,
+            'created_at': now
+        }
+        for user_id in user_ids for i in range(links_per_user)
+    ], batch_size)
+
+    alphabet = string.ascii_letters + string.digits
+    _insert(db, MusicShowcase.__table__, [
+        {
+            'user_id': user_id,
+            'spotify_item_id': ''.join(rng.choice(alphabet) for _ in range(22)),
+            'item_type': rng.choice(ITEM_TYPES),
+            'item_name': f'Release {i}',
+            'artist_names': f'Artist {user_id}',
+            'image_url': f'https://i.scdn.co/image/{user_id}-{i}',
+            'spotify_url': f'https://open.spotify.com/album/{user_id}-{i}',
+            'position': (i + 1) * POSITION_GAP,
+            'created_at': now
+        }
+        for user_id in user_ids for i in range(showcase_per_user)
+    ], batch_size)
+
+    # Clicks are generated batch by batch so a large --clicks never sits in memory at once
+    cumulative = popularity_weights(users)
+    window = 90 * 24 * 3600
+    table = ProfileClick.__table__
+    for offset in range(0, clicks, batch_size):
+        count = min(batch_size, clicks - offset)
+        owners = rng.choices(user_ids, cum_weights=cumulative, k=count)
+        db.session.execute(table.insert(), [
+            {
+                'user_id': user_id,
+                'clicked_at': now - timedelta(seconds=rng.randrange(window)),
+                'ip_address': f'10.{rng.randrange(256)}.{rng.randrange(256)}.{rng.randrange(256)}',
+                'user_agent': 'loadtest',
+                'referer': ''
+            }
+            for user_id in owners
+        ])
+        db.session.commit()
+
+    return {
+        'users': len(user_rows),
+        'social_links': users * links_per_user,
+        'showcase_items': users * showcase_per_user,
+        'profile_clicks': clicks
+    }
+
+def reset_schema(db):
+    """Drop every table, including Alembic's version table, so the migrations start from scratch"""
+    db.drop_all()
+    with db.engine.begin() as conn:
+        conn.exec_driver_sql('DROP TABLE IF EXISTS alembic_version')
+
+def main():
+    parser = argparse.ArgumentParser(description='Seed a repeatable load-test dataset')
+    parser.add_argument('--database-url', required=True)
+    parser.add_argument('--users', type=int, default=10000)
+    parser.add_argument('--clicks', type=int, default=1000000)
+    parser.add_argument('--links', type=int, default=5, help='Social links per user')
+    parser.add_argument('--showcase', type=int, default=None, help='Showcase items per user (default and maximum: SHOWCASE_LIMIT)')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--batch-size', type=int, default=10000)
+    parser.add_argument('--reset', action='store_true', help='Drop all existing tables first')
+    args = parser.parse_args()
+
+    os.environ['DATABASE_URL'] = args.database_url
+    from app import create_app, db
+    from app.models import User
+    from app.routes.music_showcase import SHOWCASE_LIMIT
+    from app.utils.schema import upgrade_database
+
+    if args.showcase is not None and not 0 <= args.showcase <= SHOWCASE_LIMIT:
+        parser.error(f'--showcase must be between 0 and {SHOWCASE_LIMIT} (SHOWCASE_LIMIT)')
+
+    app = create_app('production')
+    with app.app_context():
+        if args.reset:
+            reset_schema(db)
+        upgrade_database()
+        if db.session.query(User.id).first() is not None:
+            sys.exit('Database already has users; pass --reset to drop and reseed it')
+
+        started = time.perf_counter()
+        counts = seed(db, args.users, args.clicks, args.links, args.showcase, args.seed, args.batch_size)
+        counts['seconds'] = round(time.perf_counter() - started, 2)
+
+    print(json.dumps(counts))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,29 @@
+"""
+Script to pre-generate the OpenAPI spec served at /apispec.json
+Usage: python build_apispec.py [--output PATH]
+
+Run at build/deploy time so workers serve the spec from a file instead of parsing every
+route docstring on first request. Defaults to API_SPEC_FILE (build/apispec.json).
+"""
+import argparse
+import os
+import sys
+from app import create_app
+from app.utils.api_docs import write_apispec
+
+def main():
+    parser = argparse.ArgumentParser(description='Write the OpenAPI spec to a file')
+    parser.add_argument('--output', default=None, help='Output path (default: API_SPEC_FILE)')
+    args = parser.parse_args()
+
+    app = create_app(os.getenv('FLASK_ENV', 'development'))
+    try:
+        with app.app_context():
+            path = write_apispec(app, args.output)
+    except Exception as e:
+        print(f"Error generating OpenAPI spec: {e}")
+        sys.exit(1)
+    print(f"Wrote OpenAPI spec to {path}")
+
+if __name__ == '__main__':
+    main()
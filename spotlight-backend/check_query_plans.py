@@ -0,0 +1,150 @@
+"""
+Script to check that hot-path queries are served by indexes
+Usage: python check_query_plans.py [--database-url URL]
+
+Builds the schema from the Alembic migrations (in a temporary SQLite database unless
+--database-url is given), runs EXPLAIN on each hot query and exits non-zero if any of them
+reads a whole table or a whole index instead of seeking one. tests/test_query_plans.py runs
+the same checks under pytest. On Postgres, sequential scans are disabled for the check so
+the planner reports whether a usable index exists even on small tables.
+"""
+import argparse
+import json
+import os
+import re
+import sys
+import tempfile
+from datetime import datetime
+
+def hot_queries():
+    """(name, statement, tables that must not be fully scanned, dialects it applies to)"""
+    from sqlalchemy import func, select
+    from app.models import User, UserProfile, SocialLink, MusicShowcase, ProfileClick
+    from app.services import ClickTrackingService, OrderingService
+    from app.utils import after_cursor, escape_like
+
+    now = datetime.utcnow()
+    return [
+        (
+            'public profile: user by username',
+            select(User).where(User.username == 'artist'),
+            ['users'], None
+        ),
+        (
+            'public profile: profile by user',
+            select(UserProfile).where(UserProfile.user_id == 1),
+            ['user_profiles'], None
+        ),
+        (
+            'social links in display order',
+            select(SocialLink).where(SocialLink.user_id == 1).order_by(*OrderingService.order_by(SocialLink)),
+            ['social_links'], None
+        ),
+        (
+            'music showcase in display order',
+            select(MusicShowcase).where(MusicShowcase.user_id == 1).order_by(*OrderingService.order_by(MusicShowcase)),
+            ['music_showcase'], None
+        ),
+        (
+            'click deduplication',
+            ClickTrackingService.recent_click_query(1, '127.0.0.1', now),
+            ['profile_clicks'], None
+        ),
+        (
+            'analytics summary',
+            select(func.count(ProfileClick.id), func.max(ProfileClick.clicked_at)).where(ProfileClick.user_id == 1),
+            ['profile_clicks'], None
+        ),
+        (
+            'admin users: keyset page',
+            select(User).where(after_cursor((now, 1), User.created_at, User.id)).order_by(User.created_at, User.id).limit(50),
+            ['users'], None
+        ),
+        (
+            # SQLite's LIKE optimization does not apply to lower() expressions, so Postgres only
+            'admin users: username prefix search',
+            select(User).where(func.lower(User.username).like(escape_like('art') + '%', escape='\\')),
+            ['users'], ('postgresql',)
+        ),
+    ]
+
+def explain(connection, statement):
+    """Plan lines for a statement on the connection's dialect"""
+    dialect = connection.dialect
+    compiled = statement.compile(dialect=dialect)
+    params = compiled.params
+    if compiled.positional:
+        params = tuple(params[name] for name in compiled.positiontup)
+
+    if dialect.name == 'sqlite':
+        rows = connection.exec_driver_sql(f'EXPLAIN QUERY PLAN {compiled}', params).all()
+        return [row[-1] for row in rows]
+    if dialect.name == 'postgresql':
+        plan = connection.exec_driver_sql(f'EXPLAIN (FORMAT JSON) {compiled}', params).scalar()
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        lines = []
+        def walk(node):
+            line = f"{node['Node Type']} on {node['Relation Name']}" if 'Relation Name' in node else node['Node Type']
+            if 'Index Cond' in node:
+                line += f" ({node['Index Cond']})"
+            lines.append(line)
+            for child in node.get('Plans', []):
+                walk(child)
+        walk(plan[0]['Plan'])
+        return lines
+    raise ValueError(f'EXPLAIN is not supported for {dialect.name}')
+
+def full_scans(dialect_name, plan, tables):
+    """Plan lines that read every row of one of the given tables, through an index or not"""
+    scans = []
+    for line in plan:
+        for table in tables:
+            if dialect_name == 'sqlite':
+                # Only SEARCH seeks; "SCAN users USING INDEX ..." still walks the whole index
+                if re.match(rf'SCAN {table}\b', line):
+                    scans.append(line)
+            elif line in (f'Seq Scan on {table}', f'Index Scan on {table}', f'Index Only Scan on {table}'):
+                # Index scans without an Index Cond read the whole index
+                scans.append(line)
+    return scans
+
+def main():
+    parser = argparse.ArgumentParser(description='Fail if a hot query regresses to a full table scan')
+    parser.add_argument('--database-url', default=None, help='Existing database to check (default: temporary SQLite)')
+    args = parser.parse_args()
+
+    os.environ['DATABASE_URL'] = args.database_url or f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'plans.db')}"
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+    from app import create_app, db
+    from app.utils.schema import upgrade_database
+
+    app = create_app('development')
+    failures = 0
+
+    with app.app_context():
+        upgrade_database()
+        # Pooled SQLite connections opened before the migration plan EXPLAINs against a stale schema
+        db.engine.dispose()
+        with db.engine.connect() as connection:
+            dialect_name = connection.dialect.name
+            if dialect_name == 'postgresql':
+                connection.exec_driver_sql('SET enable_seqscan = off')
+            for name, statement, tables, dialects in hot_queries():
+                if dialects and dialect_name not in dialects:
+                    print(f'SKIP  {name} ({dialect_name})')
+                    continue
+                plan = explain(connection, statement)
+                scans = full_scans(dialect_name, plan, tables)
+                print(f"{'FAIL' if scans else 'OK':<6}{name}")
+                for line in plan:
+                    print(f'        {line}')
+                failures += bool(scans)
+
+    if failures:
+        print(f'{failures} hot queries use a full table scan')
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,31 @@
+"""
+Script to delete avatar files that no profile references
+Usage: python collect_avatar_garbage.py [--grace-seconds SECONDS]
+
+Files are normally collected right after the commit that drops their last reference. Run this
+from cron to also catch what that misses: files still within the grace period at the time,
+files left by uploads whose transaction failed, and strays from before reference counting.
+"""
+import argparse
+import os
+from app import create_app
+from app.services import AvatarService
+
+def main():
+    parser = argparse.ArgumentParser(description='Delete unreferenced avatar files')
+    parser.add_argument('--grace-seconds', type=int, default=None, help='Keep files touched more recently (default: AVATAR_GC_GRACE_SECONDS)')
+    args = parser.parse_args()
+
+    app = create_app(os.getenv('FLASK_ENV', 'development'))
+    if args.grace_seconds is not None:
+        app.config['AVATAR_GC_GRACE_SECONDS'] = args.grace_seconds
+
+    with app.app_context():
+        removed = AvatarService.collect_garbage(sweep_orphans=True)
+
+    for filename in removed:
+        print(f"Removed {filename}")
+    print(f"Removed {len(removed)} unreferenced avatar file(s) from {app.config['UPLOAD_FOLDER']}")
+
+if __name__ == '__main__':
+    main()
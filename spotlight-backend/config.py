@@ -4,11 +4,26 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
+def parse_sample_rates(value):
+    """'endpoint=rate,endpoint=rate' -> {endpoint: rate}"""
+    rates = {}
+    for item in (value or '').split(','):
+        endpoint, _, rate = item.strip().partition('=')
+        if endpoint and rate:
+            rates[endpoint] = float(rate)
+    return rates
+
 class Config:
     """Base configuration class"""
     SECRET_KEY = os.environ.get('FLASK_SECRET_KEY') or 'dev-secret-key-change-in-production'
     SQLALCHEMY_TRACK_MODIFICATIONS = False
-    SQLALCHEMY_RECORD_QUERIES = True
+    SQLALCHEMY_RECORD_QUERIES = False  # The SQL instrumentation below records its own
+    
+    # SQL Instrumentation
+    SQL_INSTRUMENTATION_ENABLED = os.environ.get('SQL_INSTRUMENTATION_ENABLED', 'true').lower() in ('true', '1', 'yes')
+    SQL_SLOW_QUERY_MS = float(os.environ.get('SQL_SLOW_QUERY_MS', 100))  # Log queries slower than this
+    SQL_N_PLUS_ONE_THRESHOLD = 5  # Same SELECT this many times in one request is flagged as a likely N+1
+    SQL_DEBUG_HEADERS = None  # X-DB-* response headers; None means only when DEBUG is on
     
     # JWT Configuration
     JWT_SECRET_KEY = os.environ.get('JWT_SECRET_KEY') or 'jwt-secret-key-change-in-production'
@@ -22,6 +37,20 @@ class Config:
     SPOTIFY_AUTH_URL = 'https://accounts.spotify.com/authorize'
     SPOTIFY_TOKEN_URL = 'https://accounts.spotify.com/api/token'
     SPOTIFY_API_BASE_URL = 'https://api.spotify.com/v1'
+    SPOTIFY_HTTP_TIMEOUT = float(os.environ.get('SPOTIFY_HTTP_TIMEOUT', 10))  # Seconds, for the async client
+    SPOTIFY_HTTP_MAX_CONNECTIONS = int(os.environ.get('SPOTIFY_HTTP_MAX_CONNECTIONS', 100))  # Shared pool size per ASGI process
+    
+    # ASGI Configuration (asgi.py)
+    ASGI_THREADS = int(os.environ.get('ASGI_THREADS', 32))  # Requests in flight per process; each holds a thread while its view runs
+    
+    # Leader Configuration (gunicorn.conf.py, asgi.py)
+    # One worker process at a time holds LEADER_LOCK_FILE and runs the scheduled jobs (see AVATAR_GC_INTERVAL_SECONDS)
+    LEADER_LOCK_FILE = os.environ.get('LEADER_LOCK_FILE', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'instance', 'leader.lock'))
+    LEADER_POLL_INTERVAL = 5.0  # Seconds between the other workers' attempts to take over
+    
+    # Proxy Configuration
+    # Number of proxies in front of the app whose X-Forwarded-For is trusted for request.remote_addr (0 = none)
+    PROXY_FIX_X_FOR = int(os.environ.get('PROXY_FIX_X_FOR', 0))
     
     # CORS Configuration
     CORS_ORIGINS = os.environ.get('CORS_ORIGINS', 'http://127.0.0.1:5173,http://localhost:5173,http://localhost:3000').split(',')
@@ -30,6 +59,118 @@ class Config:
     UPLOAD_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'uploads', 'avatars')
     MAX_CONTENT_LENGTH = 5 * 1024 * 1024  # 5MB max file size
     ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'webp'}
+    ALLOWED_IMAGE_TYPES = {'png', 'jpeg', 'gif', 'webp'}  # Checked against an upload's magic bytes, not its name
+    
+    # Avatar Processing Configuration
+    # Uploads are re-encoded in a process pool into square WebP variants plus a JPEG/PNG fallback
+    AVATAR_SIZES = (64, 128, 256, 512)  # Pixel sizes rendered for every upload
+    AVATAR_SLOTS = {'public_profile': 128, 'dashboard': 96}  # CSS pixel size of each UI slot
+    AVATAR_PROCESS_WORKERS = int(os.environ.get('AVATAR_PROCESS_WORKERS', 2))
+    AVATAR_PROCESS_TIMEOUT = 30  # Seconds to wait for one upload to be processed
+    AVATAR_WEBP_QUALITY = 80
+    AVATAR_FALLBACK_QUALITY = 85  # JPEG quality; transparent images fall back to PNG
+    AVATAR_MAX_PIXELS = 40_000_000  # Larger images are rejected before decoding (decompression bombs)
+    AVATAR_CACHE_MAX_AGE = 365 * 24 * 3600  # Avatar file names never change content, so they are cached as immutable
+    AVATAR_GC_GRACE_SECONDS = 600  # Unreferenced files touched more recently than this are left for the next collection
+    AVATAR_GC_INTERVAL_SECONDS = int(os.environ.get('AVATAR_GC_INTERVAL_SECONDS', 0))  # collect_avatar_garbage.py's sweep in the leader worker; 0 leaves it to cron
+    AVATAR_X_ACCEL_REDIRECT = os.environ.get('AVATAR_X_ACCEL_REDIRECT')  # nginx internal location serving UPLOAD_FOLDER
+    USE_X_SENDFILE = os.environ.get('USE_X_SENDFILE', 'false').lower() in ('true', '1', 'yes')  # Apache/lighttpd X-Sendfile
+    
+    # Avatar Storage Configuration
+    # 'local' keeps files in UPLOAD_FOLDER; 's3' uses an S3-compatible bucket (AWS, MinIO...) with presigned uploads
+    AVATAR_STORAGE = os.environ.get('AVATAR_STORAGE', 'local')  # Name in storage.STORAGES or import path to a factory(config)
+    AVATAR_S3_BUCKET = os.environ.get('AVATAR_S3_BUCKET')
+    AVATAR_S3_ENDPOINT_URL = os.environ.get('AVATAR_S3_ENDPOINT_URL')  # Unset for AWS; e.g. http://127.0.0.1:9000 for MinIO
+    AVATAR_S3_REGION = os.environ.get('AVATAR_S3_REGION')
+    AVATAR_S3_PREFIX = os.environ.get('AVATAR_S3_PREFIX', 'avatars/')
+    AVATAR_S3_INCOMING_PREFIX = os.environ.get('AVATAR_S3_INCOMING_PREFIX', 'incoming/')  # Direct uploads waiting to be processed; keep it private
+    AVATAR_PUBLIC_BASE_URL = os.environ.get('AVATAR_PUBLIC_BASE_URL')  # CDN or bucket URL of AVATAR_S3_PREFIX; defaults to the bucket
+    AVATAR_UPLOAD_URL_EXPIRES = 600  # Seconds a direct upload target stays valid
+    
+    # Response Compression Configuration
+    # brotli (when the Brotli package is installed) or gzip, as negotiated by Accept-Encoding
+    COMPRESSION_ENABLED = os.environ.get('COMPRESSION_ENABLED', 'true').lower() in ('true', '1', 'yes')
+    COMPRESSION_MIN_SIZE = int(os.environ.get('COMPRESSION_MIN_SIZE', 1024))  # Smaller bodies are sent as they are
+    COMPRESSION_MIMETYPES = {'application/json', 'text/html', 'text/plain', 'text/css', 'application/javascript'}
+    COMPRESSION_LEVELS = {'br': 4, 'gzip': 6}  # Per request: fast enough to pay on every response
+    COMPRESSION_CACHE_LEVELS = {'br': 11, 'gzip': 9}  # Cached bodies are compressed once, so use the densest levels
+    COMPRESSION_CACHE_MAX_BYTES = 32 * 1024 * 1024  # Compressed bodies kept per process
+    
+    # Access Log Configuration
+    # JSON lines on stderr, written by a background thread; sample rates are 'endpoint=rate,...'
+    ACCESS_LOG_ENABLED = os.environ.get('ACCESS_LOG_ENABLED', 'true').lower() in ('true', '1', 'yes')
+    ACCESS_LOG_SAMPLE_RATES = parse_sample_rates(os.environ.get('ACCESS_LOG_SAMPLE_RATES', ''))
+    ACCESS_LOG_SLOW_MS = 1000  # Slower requests are always logged, whatever the sample rate
+    ACCESS_LOG_QUEUE_SIZE = 10000  # Records beyond this are dropped rather than blocking requests
+    
+    # Metrics Configuration
+    # Prometheus text format at /api/metrics; METRICS_TOKEN requires "Authorization: Bearer <token>"
+    # Outside debug mode the endpoint is off unless METRICS_TOKEN is set, and enabling it without one is an error
+    METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+    METRICS_ENABLED = os.environ.get('METRICS_ENABLED', 'true').lower() in ('true', '1', 'yes')
+    # Workers share their metrics through snapshot files here so any one can answer a scrape; gunicorn.conf.py
+    # and asgi.py set it. Unset, /api/metrics reports the process that serves it
+    METRICS_MULTIPROCESS_DIR = os.environ.get('METRICS_MULTIPROCESS_DIR')
+    METRICS_SNAPSHOT_INTERVAL = float(os.environ.get('METRICS_SNAPSHOT_INTERVAL', 5))  # Seconds a sibling's numbers may lag
+    # '<master pid>-<token>' shared by the workers of one server, set by the server; unset, each process stands alone
+    METRICS_SERVER_ID = os.environ.get('METRICS_SERVER_ID')
+    
+    # Tracing Configuration
+    # Spans per request, SQL statement and Spotify call; tail sampling keeps slow and failed traces
+    TRACING_ENABLED = os.environ.get('TRACING_ENABLED', 'false').lower() in ('true', '1', 'yes')
+    TRACING_EXPORTER = os.environ.get('TRACING_EXPORTER', 'jsonl')  # Name in tracing.EXPORTERS or import path to a factory(config)
+    TRACING_FILE = os.environ.get('TRACING_FILE') or os.path.join(os.path.dirname(os.path.abspath(__file__)), 'logs', 'traces.jsonl')
+    TRACING_SAMPLE_RATE = float(os.environ.get('TRACING_SAMPLE_RATE', 0.01))  # Share of normal traces kept
+    TRACING_SLOW_MS = 500  # Slower traces are always kept, as are traces with an error
+    TRACING_MAX_SPANS = 1000  # Spans beyond this per request are counted but not recorded
+    TRACING_QUEUE_SIZE = 1000  # Kept traces waiting for export; more are dropped
+    
+    # Traffic Capture Configuration
+    # Anonymized request shapes and timings appended to a gzip file for benchmarks/replay_traffic.py
+    TRAFFIC_CAPTURE_ENABLED = os.environ.get('TRAFFIC_CAPTURE_ENABLED', 'false').lower() in ('true', '1', 'yes')
+    TRAFFIC_CAPTURE_FILE = os.environ.get('TRAFFIC_CAPTURE_FILE') or os.path.join(os.path.dirname(os.path.abspath(__file__)), 'logs', 'traffic.jsonl.gz')
+    TRAFFIC_CAPTURE_SAMPLE_RATE = float(os.environ.get('TRAFFIC_CAPTURE_SAMPLE_RATE', 1.0))
+    # Query and JSON fields stored verbatim; every other value is hashed or reduced to its shape
+    TRAFFIC_CAPTURE_KEEP_FIELDS = {'include', 'limit', 'offset', 'per_page', 'format', 'gzip', 'total', 'since', 'until', 'platform', 'is_public'}
+    # Fields recorded as 'redacted' with no length or shape, matched by name or by a word of it (current_password, upload_token)
+    TRAFFIC_CAPTURE_REDACT_FIELDS = {'password', 'secret', 'token', 'code'}
+    
+    # Request Profiler Configuration
+    # Off: no hooks are installed at all. On: admins arm it per endpoint via /api/admin/profiler
+    PROFILER_ENABLED = os.environ.get('PROFILER_ENABLED', 'false').lower() in ('true', '1', 'yes')
+    PROFILER_INTERVAL_MS = 5  # Stack sampling interval for profiled requests
+    PROFILER_MAX_PROFILES = 50  # Profiles kept; the oldest is dropped first
+    # The armed rule and the profiles, shared by every worker process on the host
+    PROFILER_DIR = os.environ.get('PROFILER_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'instance', 'profiler'))
+    
+    # API Docs Configuration
+    # Nothing is generated at startup; /apispec.json is built on first request and cached in API_SPEC_FILE
+    API_DOCS_ENABLED = os.environ.get('API_DOCS_ENABLED', 'true').lower() in ('true', '1', 'yes')
+    API_SPEC_FILE = os.environ.get('API_SPEC_FILE') or os.path.join(os.path.dirname(os.path.abspath(__file__)), 'build', 'apispec.json')
+    
+    # SQLite Configuration (ignored for other databases)
+    # Concurrent mode: WAL journaling, tuned PRAGMAs and a single in-process writer
+    SQLITE_CONCURRENT_MODE = os.environ.get('SQLITE_CONCURRENT_MODE', 'false').lower() in ('true', '1', 'yes')
+    SQLITE_BUSY_TIMEOUT_MS = int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', 5000))
+    SQLITE_SYNCHRONOUS = 'NORMAL'  # Safe with WAL; FULL fsyncs on every commit
+    SQLITE_MMAP_SIZE = 256 * 1024 * 1024  # 256MB memory-mapped reads
+    SQLITE_CACHE_SIZE = -64000  # Negative means KiB: ~64MB page cache per connection
+    SQLITE_WRITER_BATCH_SIZE = 500  # Max queued writes applied per transaction
+    SQLITE_WRITER_FLUSH_INTERVAL = 0.05  # Seconds the writer waits for more work before committing
+    
+    # Read Replica Configuration (optional)
+    # When DATABASE_REPLICA_URL is set, views marked @use_replica send their SELECTs to it
+    DATABASE_REPLICA_URL = os.environ.get('DATABASE_REPLICA_URL')
+    SQLALCHEMY_BINDS = {'replica': DATABASE_REPLICA_URL} if DATABASE_REPLICA_URL else {}
+    REPLICA_MAX_LAG_SECONDS = float(os.environ.get('REPLICA_MAX_LAG_SECONDS', 5))  # Fall back to the primary beyond this
+    REPLICA_LAG_CHECK_INTERVAL = 2.0  # Seconds between replica health/lag probes
+    REPLICA_READ_YOUR_WRITES_SECONDS = 10.0  # Users who just wrote keep reading from the primary this long
+    
+    # User Deletion Configuration
+    USER_DELETE_CLICK_CHUNK_SIZE = 10000  # Clicks removed per transaction when purging in the background
+    USER_DELETE_BACKGROUND_THRESHOLD = 50000  # Users with more clicks than this are purged by a background job
+    # A job without progress for this long lost its worker (recycled or killed); the leader resumes it
+    USER_DELETE_JOB_STALE_SECONDS = int(os.environ.get('USER_DELETE_JOB_STALE_SECONDS', 600))
 
 class DevelopmentConfig(Config):
     """Development configuration"""
@@ -40,6 +181,10 @@ class ProductionConfig(Config):
     """Production configuration"""
     DEBUG = False
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or 'sqlite:///spotlight_dev.db'
+    SQLITE_CONCURRENT_MODE = os.environ.get('SQLITE_CONCURRENT_MODE', 'true').lower() in ('true', '1', 'yes')
+    API_DOCS_ENABLED = os.environ.get('API_DOCS_ENABLED', 'false').lower() in ('true', '1', 'yes')
+    METRICS_ENABLED = os.environ.get('METRICS_ENABLED', 'true' if Config.METRICS_TOKEN else 'false').lower() in ('true', '1', 'yes')
+    ACCESS_LOG_SAMPLE_RATES = parse_sample_rates(os.environ.get('ACCESS_LOG_SAMPLE_RATES', 'profiles.get_public_profile=0.1'))
     if not SQLALCHEMY_DATABASE_URI:
         raise ValueError("DATABASE_URL environment variable must be set for production")
 
@@ -47,6 +192,7 @@ class TestingConfig(Config):
     """Testing configuration"""
     TESTING = True
     SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
+    SQLALCHEMY_BINDS = {}
 
 config = {
     'development': DevelopmentConfig,
@@ -0,0 +1,62 @@
+"""
+gunicorn settings: pre-fork workers sharing one copy of the app loaded in the master
+Usage: gunicorn -c gunicorn.conf.py
+
+With preload_app the master imports run.py and builds the app once, then forks the workers, so
+the imported modules and everything create_app sets up are shared copy-on-write instead of
+being loaded again by every worker. The master also applies pending migrations once before any
+worker starts (set UPGRADE_DATABASE_ON_START=false when a deploy step runs upgrade_database.py).
+
+Each worker starts with empty connection pools (app.utils.prefork disposes the master's in
+every forked child) and starts its own background threads; scheduled jobs run in whichever
+worker holds LEADER_LOCK_FILE. Workers share their metrics through METRICS_MULTIPROCESS_DIR.
+"""
+import gc
+import os
+import uuid
+
+wsgi_app = 'run:app'
+bind = os.environ.get('GUNICORN_BIND', f"0.0.0.0:{os.environ.get('PORT', 5000)}")
+workers = int(os.environ.get('WEB_CONCURRENCY', 2 * (os.cpu_count() or 1) + 1))
+worker_class = 'gthread'
+threads = int(os.environ.get('GUNICORN_THREADS', 8))
+preload_app = os.environ.get('GUNICORN_PRELOAD', 'true').lower() in ('true', '1', 'yes')
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 0))  # Recycle workers after this many requests; 0 never does
+max_requests_jitter = max_requests // 10
+# The app writes its own structured access log (ACCESS_LOG_ENABLED)
+accesslog = None
+
+# Any worker may answer /api/metrics, so each shares its numbers through this directory (read when the app loads)
+os.environ.setdefault('METRICS_MULTIPROCESS_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'instance', 'metrics'))
+# Names this master's workers as one server; kept across a HUP reload, new after a re-exec
+if not os.environ.get('METRICS_SERVER_ID', '').startswith(f'{os.getpid()}-'):
+    os.environ['METRICS_SERVER_ID'] = f'{os.getpid()}-{uuid.uuid4().hex[:8]}'
+
+UPGRADE_DATABASE_ON_START = os.environ.get('UPGRADE_DATABASE_ON_START', 'true').lower() in ('true', '1', 'yes')
+
+def on_starting(server):
+    """Master, once, before the first fork"""
+    if UPGRADE_DATABASE_ON_START:
+        if server.cfg.preload_app:
+            from run import app
+            from app.utils.schema import upgrade_database
+            with app.app_context():
+                upgrade_database()
+        else:
+            # Importing the app here would load it into the master after all; migrate from a child process instead
+            import subprocess
+            import sys
+            subprocess.run([sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'upgrade_database.py')], check=True)
+
+    if server.cfg.preload_app:
+        from run import app
+        from app.utils.prefork import dispose_engines
+        # Workers open their own connections; close the ones used above rather than keep them idle in the master
+        dispose_engines(app)
+        # Objects that exist now are never collected; scanning them would write to every shared page
+        gc.freeze()
+
+def post_worker_init(worker):
+    """Worker, once its app is loaded (inherited from the master with preload_app)"""
+    from app.utils.prefork import start_worker_services
+    start_worker_services(worker.wsgi)
@@ -0,0 +1,63 @@
+"""
+Script to copy locally stored avatar files into the configured avatar storage
+Usage: python migrate_avatar_storage.py [--to s3] [--source DIR] [--batch-size 200] [--pause 0.5] [--delete-local]
+
+Run it in the background (nohup, a one-off container, cron) before switching AVATAR_STORAGE
+from 'local' to an object store, then once more right after the switch to pick up files
+uploaded in between. Avatar URLs in the database do not change: /api/uploads/avatars/<name>
+keeps serving local copies until they are deleted and redirects to the object store after.
+Files already in the target are skipped, so an interrupted run can simply be restarted.
+"""
+import argparse
+import mimetypes
+import os
+import sys
+import time
+from app import create_app
+from app.utils.storage import LocalStorage, load_storage
+
+def batches(items, size):
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def main():
+    parser = argparse.ArgumentParser(description='Copy local avatar files into the configured storage')
+    parser.add_argument('--to', default=None, help='Target storage (default: AVATAR_STORAGE)')
+    parser.add_argument('--source', default=None, help='Local folder to copy from (default: UPLOAD_FOLDER)')
+    parser.add_argument('--batch-size', type=int, default=200)
+    parser.add_argument('--pause', type=float, default=0.5, help='Seconds to sleep between batches')
+    parser.add_argument('--delete-local', action='store_true', help='Delete each local file once it is in the target')
+    args = parser.parse_args()
+
+    app = create_app(os.getenv('FLASK_ENV', 'development'))
+    source = LocalStorage(args.source or app.config['UPLOAD_FOLDER'])
+    target = load_storage(app.config, args.to)
+    if isinstance(target, LocalStorage):
+        print("Error: the target storage is local; pass --to or set AVATAR_STORAGE to an object store.")
+        sys.exit(1)
+
+    copied = skipped = 0
+    # Listed up front: --delete-local removes files while the batches run
+    for batch in batches(sorted(source.list()), args.batch_size):
+        for name, _ in batch:
+            if target.modified_at(name) is None:
+                with open(os.path.join(source.folder, name), 'rb') as f:
+                    target.put(name, f.read(), mimetypes.guess_type(name)[0] or 'application/octet-stream')
+                copied += 1
+            else:
+                skipped += 1
+            if args.delete_local:
+                source.delete(name)
+        print(f"Copied {copied}, already present {skipped}")
+        time.sleep(args.pause)
+
+    print(f"Done: copied {copied} file(s), {skipped} already in the target")
+
+if __name__ == '__main__':
+    main()
@@ -11,6 +11,7 @@ import sys
 # Add the parent directory to the path so we can import our app
 sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 
+from flask import current_app, has_app_context
 from app import create_app, db
 from app.models import User, UserProfile, SocialLink, SpotifyConnection, MusicShowcase, ProfileClick
 
@@ -19,10 +20,10 @@ config = context.config
 
 # Interpret the config file for Python logging.
 if config.config_file_name is not None:
-    fileConfig(config.config_file_name)
+    fileConfig(config.config_file_name, disable_existing_loggers=False)
 
-# Get the Flask app and set up the database URL
-app = create_app(os.getenv('FLASK_ENV', 'development'))
+# Get the Flask app (the running one when invoked from upgrade_database) and set up the database URL
+app = current_app._get_current_object() if has_app_context() else create_app(os.getenv('FLASK_ENV', 'development'))
 config.set_main_option('sqlalchemy.url', app.config['SQLALCHEMY_DATABASE_URI'])
 
 # add your model's MetaData object here for 'autogenerate' support
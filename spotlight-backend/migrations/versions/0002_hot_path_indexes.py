@@ -0,0 +1,73 @@
+"""hot path indexes
+
+Revision ID: 0002_hot_path_indexes
+Revises: 0001_baseline
+Create Date: 2026-10-19 08:20:00.000000
+
+Composite indexes for the per-user ordered link/showcase reads, click deduplication and the
+admin user listing. On Postgres they are built with CREATE INDEX CONCURRENTLY outside the
+migration transaction, so large tables stay writable while the index builds. IF NOT EXISTS
+makes the migration safe on databases where db.create_all() already made some of them.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0002_hot_path_indexes'
+down_revision = '0001_baseline'
+branch_labels = None
+depends_on = None
+
+
+# (name, table, columns, Postgres column list with operator classes or None)
+INDEXES = [
+    ('ix_social_links_user_id_position', 'social_links', ['user_id', 'position'], None),
+    ('ix_music_showcase_user_id_position', 'music_showcase', ['user_id', 'position'], None),
+    ('ix_profile_clicks_user_id_ip_address_clicked_at', 'profile_clicks', ['user_id', 'ip_address', 'clicked_at'], None),
+    ('ix_users_created_at_id', 'users', ['created_at', 'id'], None),
+    ('ix_users_username_lower', 'users', ['lower(username)'], 'lower(username) varchar_pattern_ops'),
+    ('ix_users_email_lower', 'users', ['lower(email)'], 'lower(email) varchar_pattern_ops'),
+]
+
+
+def is_postgresql():
+    return op.get_context().dialect.name == 'postgresql'
+
+
+def upgrade():
+    if is_postgresql():
+        # CONCURRENTLY cannot run inside a transaction block
+        with op.get_context().autocommit_block():
+            for name, table, columns, postgresql_columns in INDEXES:
+                # An interrupted concurrent build leaves an INVALID index that IF NOT EXISTS would keep
+                invalid = op.get_bind().execute(sa.text(
+                    "SELECT 1 FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+                    "WHERE c.relname = :name AND NOT i.indisvalid"
+                ), {'name': name}).first()
+                if invalid:
+                    op.execute(f'DROP INDEX CONCURRENTLY IF EXISTS {name}')
+                op.execute(
+                    f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON {table} "
+                    f"({postgresql_columns or ', '.join(columns)})"
+                )
+        return
+
+    for name, table, columns, _ in INDEXES:
+        op.create_index(
+            name, table,
+            [sa.text(column) if '(' in column else column for column in columns],
+            unique=False, if_not_exists=True
+        )
+
+
+def downgrade():
+    if is_postgresql():
+        with op.get_context().autocommit_block():
+            for name, _, _, _ in reversed(INDEXES):
+                op.execute(f'DROP INDEX CONCURRENTLY IF EXISTS {name}')
+        return
+
+    for name, table, _, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table, if_exists=True)
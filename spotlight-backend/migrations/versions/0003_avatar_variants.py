@@ -0,0 +1,33 @@
+"""avatar variants
+
+Revision ID: 0003_avatar_variants
+Revises: 0002_hot_path_indexes
+Create Date: 2026-10-19 09:10:00.000000
+
+Nullable JSON column with the URLs of the resized WebP/fallback avatar variants. Adding a
+nullable column without a default is a metadata-only change on Postgres and SQLite. Skipped when
+db.create_all() already made the column.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0003_avatar_variants'
+down_revision = '0002_hot_path_indexes'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    columns = [column['name'] for column in sa.inspect(op.get_bind()).get_columns('user_profiles')]
+    if 'avatar_variants' in columns:
+        return
+    with op.batch_alter_table('user_profiles') as batch_op:
+        batch_op.add_column(sa.Column('avatar_variants', sa.JSON(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('user_profiles') as batch_op:
+        batch_op.drop_column('avatar_variants')
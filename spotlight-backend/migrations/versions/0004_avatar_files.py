@@ -0,0 +1,66 @@
+"""avatar files
+
+Revision ID: 0004_avatar_files
+Revises: 0003_avatar_variants
+Create Date: 2026-10-19 10:40:00.000000
+
+Reference counts for uploaded avatar files, which are shared between profiles once they are
+stored under content-hash names. Existing uploads are backfilled with one reference per
+profile that points at them, so they are collected like new ones when replaced. A table that
+db.create_all() already made is reused and only backfilled.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0004_avatar_files'
+down_revision = '0003_avatar_variants'
+branch_labels = None
+depends_on = None
+
+
+AVATAR_URL_PREFIX = '/api/uploads/avatars/'
+
+
+def upgrade():
+    columns = [
+        sa.Column('filename', sa.String(length=100), nullable=False),
+        sa.Column('ref_count', sa.Integer(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=True)
+    ]
+    if 'avatar_files' in sa.inspect(op.get_bind()).get_table_names():
+        avatar_files = sa.table('avatar_files', *(sa.column(column.name) for column in columns))
+        op.execute(avatar_files.delete())
+    else:
+        avatar_files = op.create_table('avatar_files', *columns, sa.PrimaryKeyConstraint('filename'))
+
+    user_profiles = sa.table(
+        'user_profiles',
+        sa.column('avatar_url', sa.String),
+        sa.column('avatar_variants', sa.JSON)
+    )
+    counts = {}
+    rows = op.get_bind().execute(
+        sa.select(user_profiles.c.avatar_url, user_profiles.c.avatar_variants)
+        .where(user_profiles.c.avatar_url.like(AVATAR_URL_PREFIX + '%'))
+    )
+    for avatar_url, variants in rows:
+        urls = {avatar_url}
+        for urls_by_kind in (variants or {}).values():
+            urls.update(urls_by_kind.values())
+        for url in urls:
+            if url and url.startswith(AVATAR_URL_PREFIX):
+                filename = url[len(AVATAR_URL_PREFIX):]
+                counts[filename] = counts.get(filename, 0) + 1
+
+    if counts:
+        op.bulk_insert(avatar_files, [
+            {'filename': filename, 'ref_count': ref_count, 'updated_at': None}
+            for filename, ref_count in counts.items()
+        ])
+
+
+def downgrade():
+    op.drop_table('avatar_files')
@@ -0,0 +1,52 @@
+"""users created_at not null
+
+Revision ID: 0005_users_created_at_not_null
+Revises: 0004_avatar_files
+Create Date: 2026-10-20 09:00:00.000000
+
+The admin user list pages on (created_at, id); a NULL created_at cannot be compared, so a
+cursor taken from such a row ended the listing. Rows without one are backfilled with the
+earliest existing value, where they already sorted, and the column becomes NOT NULL.
+
+"""
+from datetime import datetime
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0005_users_created_at_not_null'
+down_revision = '0004_avatar_files'
+branch_labels = None
+depends_on = None
+
+
+# Reflection skips expression indexes, so SQLite's table rebuild drops these (created by 0002)
+EXPRESSION_INDEXES = [
+    ('ix_users_username_lower', 'lower(username)'),
+    ('ix_users_email_lower', 'lower(email)'),
+]
+
+
+def restore_expression_indexes():
+    if op.get_context().dialect.name == 'sqlite':
+        for name, expression in EXPRESSION_INDEXES:
+            op.create_index(name, 'users', [sa.text(expression)], unique=False, if_not_exists=True)
+
+
+def upgrade():
+    users = sa.table('users', sa.column('created_at', sa.DateTime))
+    bind = op.get_bind()
+    # Bound as DateTime so SQLite stores the same text format as rows written by the app
+    earliest = bind.execute(sa.select(sa.func.min(users.c.created_at))).scalar() or datetime.utcnow()
+    bind.execute(users.update().where(users.c.created_at.is_(None)).values(created_at=earliest))
+    # SQLite rebuilds the table here; the migration connection does not enforce foreign keys, so nothing cascades
+    with op.batch_alter_table('users') as batch_op:
+        batch_op.alter_column('created_at', existing_type=sa.DateTime(), nullable=False)
+    restore_expression_indexes()
+
+
+def downgrade():
+    with op.batch_alter_table('users') as batch_op:
+        batch_op.alter_column('created_at', existing_type=sa.DateTime(), nullable=True)
+    restore_expression_indexes()
@@ -0,0 +1,43 @@
+"""user deletion jobs
+
+Revision ID: 0006_user_deletion_jobs
+Revises: 0005_users_created_at_not_null
+Create Date: 2026-10-20 11:00:00.000000
+
+Background user deletions were tracked in a dict inside the worker that started them, so
+under several worker processes GET /api/admin/jobs/<id> answered 404 from every other one.
+Jobs now live in the database, with the worker running each one and a heartbeat, so the
+leader can resume a job whose worker died. A table that db.create_all() already made is kept.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0006_user_deletion_jobs'
+down_revision = '0005_users_created_at_not_null'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if 'user_deletion_jobs' in sa.inspect(op.get_bind()).get_table_names():
+        return
+    op.create_table(
+        'user_deletion_jobs',
+        sa.Column('id', sa.String(length=32), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('status', sa.String(length=20), nullable=False),
+        sa.Column('clicks_purged', sa.Integer(), nullable=False),
+        sa.Column('started_at', sa.DateTime(), nullable=False),
+        sa.Column('finished_at', sa.DateTime(), nullable=True),
+        sa.Column('error', sa.Text(), nullable=True),
+        sa.Column('owner', sa.String(length=100), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+
+
+def downgrade():
+    op.drop_table('user_deletion_jobs')
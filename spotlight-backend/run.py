@@ -1,13 +1,16 @@
 from app import create_app
-from app import db
+from app.utils.schema import upgrade_database
+from app.utils.access_log import QuietRequestHandler
 import os
 
+# Importing this module only builds the app, so gunicorn.conf.py can preload it in the master
 app = create_app(os.getenv('FLASK_ENV', 'development'))
 
-with app.app_context():
-    # db.drop_all()
-    db.create_all()
-
 if __name__ == '__main__':  
-    app.run(debug=True, host='0.0.0.0', port=5000)
-
+    with app.app_context():
+        # Schema changes live in migrations/versions; this applies any that are pending
+        upgrade_database()
+    
+    # The structured access log replaces werkzeug's request lines
+    request_handler = QuietRequestHandler if app.config['ACCESS_LOG_ENABLED'] else None
+    app.run(debug=True, host='0.0.0.0', port=5000, request_handler=request_handler)
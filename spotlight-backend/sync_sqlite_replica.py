@@ -0,0 +1,59 @@
+"""
+Script to refresh a local SQLite read replica from the primary database
+Usage: python sync_sqlite_replica.py [--interval SECONDS]
+
+Local stand-in for streaming replication: set DATABASE_URL and DATABASE_REPLICA_URL to two
+SQLite files and run this (once, or in a loop with --interval) to copy the primary into the
+replica using SQLite's online backup API. Writes made between syncs show up as replica lag.
+"""
+import argparse
+import os
+import sqlite3
+import sys
+import time
+from sqlalchemy.engine import make_url
+from app import create_app
+
+def sqlite_path(uri):
+    """File path of a SQLite URI, or None for anything else"""
+    url = make_url(uri)
+    if url.get_backend_name() != 'sqlite' or not url.database or url.database == ':memory:':
+        return None
+    return url.database
+
+def sync(primary_path, replica_path):
+    """Copy the primary database into the replica file"""
+    source = sqlite3.connect(primary_path)
+    target = sqlite3.connect(replica_path)
+    try:
+        source.backup(target)
+    finally:
+        target.close()
+        source.close()
+
+def main():
+    parser = argparse.ArgumentParser(description='Copy a SQLite primary into its local replica')
+    parser.add_argument('--interval', type=float, default=None, help='Keep syncing every N seconds')
+    args = parser.parse_args()
+
+    app = create_app(os.getenv('FLASK_ENV', 'development'))
+    primary_path = sqlite_path(app.config['SQLALCHEMY_DATABASE_URI'])
+    replica_path = sqlite_path(app.config.get('DATABASE_REPLICA_URL') or '')
+
+    if not primary_path or not replica_path:
+        print("Error: DATABASE_URL and DATABASE_REPLICA_URL must both point at SQLite files.")
+        sys.exit(1)
+
+    # Relative SQLite paths resolve against the Flask instance folder
+    primary_path = os.path.join(app.instance_path, primary_path) if not os.path.isabs(primary_path) else primary_path
+    replica_path = os.path.join(app.instance_path, replica_path) if not os.path.isabs(replica_path) else replica_path
+
+    while True:
+        sync(primary_path, replica_path)
+        print(f"Synced {primary_path} -> {replica_path}")
+        if args.interval is None:
+            break
+        time.sleep(args.interval)
+
+if __name__ == '__main__':
+    main()
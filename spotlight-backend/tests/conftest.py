@@ -0,0 +1,25 @@
+import os
+import sys
+import tempfile
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+# config.py reads DATABASE_URL when it is imported, so it is set before anything imports the app.
+# TEST_DATABASE_URL runs the suite against another database (e.g. a scratch Postgres).
+os.environ['DATABASE_URL'] = os.environ.get('TEST_DATABASE_URL') or f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'tests.db')}"
+os.environ.setdefault('ACCESS_LOG_ENABLED', 'false')
+
+@pytest.fixture(scope='session')
+def app():
+    """The app on a database built from the migrations"""
+    from app import create_app, db
+    from app.utils.schema import upgrade_database
+
+    app = create_app('development')
+    with app.app_context():
+        upgrade_database()
+        # Pooled SQLite connections opened before the migration would see a stale schema
+        db.engine.dispose()
+    return app
@@ -0,0 +1,31 @@
+import io
+import logging
+import pytest
+
+@pytest.fixture
+def make_app(monkeypatch):
+    from config import DevelopmentConfig
+    from app import create_app
+
+    monkeypatch.setattr(DevelopmentConfig, 'ACCESS_LOG_ENABLED', True)
+    return lambda: create_app('development')
+
+def test_apps_in_one_process_share_one_sink(make_app):
+    first, second = make_app(), make_app()
+    sink = first.extensions['log_sink']
+    assert second.extensions['log_sink'] is sink
+    assert second.logger.handlers.count(sink.handler) == 1
+    assert not second.logger.propagate
+
+def test_access_lines_are_not_repeated_on_root_handlers(make_app):
+    app = make_app()
+    # As left by alembic's fileConfig when migrations run in the same process
+    root_output = io.StringIO()
+    root_handler = logging.StreamHandler(root_output)
+    logging.getLogger().addHandler(root_handler)
+    try:
+        app.test_client().get('/api/health')
+        app.extensions['log_sink'].stop()
+    finally:
+        logging.getLogger().removeHandler(root_handler)
+    assert '/api/health' not in root_output.getvalue()
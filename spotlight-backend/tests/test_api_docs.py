@@ -0,0 +1,35 @@
+import os
+from app.utils.api_docs import _spec_file_is_current, _spec_sources
+
+def test_spec_sources_include_every_module_with_views(app):
+    import app as app_package
+    from app.routes import profiles
+
+    sources = _spec_sources(app)
+    # The health and metrics views are defined in create_app
+    assert os.path.abspath(app_package.__file__) in sources
+    assert os.path.abspath(profiles.__file__) in sources
+
+def test_spec_file_older_than_app_init_is_stale(app, tmp_path):
+    import app as app_package
+
+    path = tmp_path / 'apispec.json'
+    path.write_text('{}')
+    newest = max(os.path.getmtime(source) for source in _spec_sources(app))
+    os.utime(path, (newest + 1, newest + 1))
+    assert _spec_file_is_current(app, str(path))
+
+    edited = os.path.getmtime(app_package.__file__)
+    os.utime(path, (edited - 1, edited - 1))
+    assert not _spec_file_is_current(app, str(path))
+
+def test_docs_page_is_our_template_over_the_bundled_ui(app):
+    client = app.test_client()
+    response = client.get('/api/docs')
+    page = response.get_data(as_text=True)
+
+    assert response.status_code == 200
+    assert '"/apispec.json"' in page
+    for asset in ('swagger-ui-bundle.js', 'swagger-ui-standalone-preset.js', 'swagger-ui.css'):
+        assert f'/flasgger_static/{asset}' in page
+        assert client.get(f'/flasgger_static/{asset}').status_code == 200
@@ -0,0 +1,48 @@
+import multiprocessing
+import queue
+import pytest
+from app.utils.background import BackgroundThread
+
+class Echo(BackgroundThread):
+    thread_name = 'echo'
+
+    def _prepare(self):
+        self.inbox = queue.Queue()
+        self.outbox = queue.Queue()
+
+    def _run(self):
+        while (item := self.inbox.get()) is not None:
+            self.outbox.put(item)
+
+    def _signal_stop(self, timeout):
+        self.inbox.put(None)
+        return True
+
+    def echo(self, item):
+        self.ensure_started()
+        self.inbox.put(item)
+        return self.outbox.get(timeout=5)
+
+def test_subclasses_must_implement_run_and_signal_stop():
+    with pytest.raises(TypeError):
+        type('Incomplete', (BackgroundThread,), {})()
+
+def test_stop_and_restart_in_the_same_process():
+    echo = Echo()
+    assert echo.echo('a') == 'a'
+    assert echo.stop()
+    assert not echo.started and not echo.stop()
+    assert echo.echo('b') == 'b'
+    echo.stop()
+
+def test_a_forked_child_starts_its_own_thread():
+    echo = Echo()
+    echo.echo('parent')
+    context = multiprocessing.get_context('fork')
+    results = context.Queue()
+    child = context.Process(target=lambda: results.put((echo.started, echo.echo('child'), echo.started)))
+    child.start()
+    assert results.get(timeout=10) == (False, 'child', True)
+    child.join()
+    assert echo.started
+    echo.stop()
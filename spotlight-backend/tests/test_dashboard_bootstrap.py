@@ -0,0 +1,41 @@
+import threading
+from datetime import datetime, timedelta
+from flask_jwt_extended import create_access_token
+
+def test_expired_token_is_refreshed_on_the_spotify_pool(app, monkeypatch):
+    from app import db
+    from app.models import SpotifyConnection, User
+    from app.services import SpotifyService
+
+    threads = {}
+
+    def refresh_access_token(refresh_token):
+        threads['refresh'] = threading.current_thread().name
+        return {'access_token': 'fresh', 'expires_in': 3600}
+
+    def get_showcase_albums(access_token, artist_id=None, limit=50, offset=0):
+        threads['albums'] = threading.current_thread().name
+        return {'albums': [], 'total': 0, 'access_token': access_token}
+
+    monkeypatch.setattr(SpotifyService, 'refresh_access_token', staticmethod(refresh_access_token))
+    monkeypatch.setattr(SpotifyService, 'get_showcase_albums', staticmethod(get_showcase_albums))
+
+    with app.app_context():
+        user = User(email='bootstrap@example.com', username='bootstrap', password_hash='x')
+        db.session.add(user)
+        db.session.commit()
+        db.session.add(SpotifyConnection(
+            user_id=user.id, spotify_user_id='s', access_token='stale', refresh_token='r',
+            token_expires_at=datetime.utcnow() - timedelta(minutes=1), artist_id='artist'
+        ))
+        db.session.commit()
+        headers = {'Authorization': f'Bearer {create_access_token(identity=user.id)}'}
+
+        response = app.test_client().get('/api/profiles/me/bootstrap?include=links,spotify', headers=headers)
+
+        assert response.status_code == 200
+        assert response.json['spotify_albums']['access_token'] == 'fresh'
+        # The refresh and the call that needs it ran together, off the request thread
+        assert threads['refresh'].startswith('spotify') and threads['albums'] == threads['refresh']
+        db.session.remove()
+        assert SpotifyConnection.query.filter_by(user_id=user.id).one().access_token == 'fresh'
@@ -0,0 +1,121 @@
+import os
+import pytest
+from app.services import SpotifyService
+from app.utils.metrics import SPOTIFY_ERRORS
+
+class FakeResponse:
+    def __init__(self, status_code, body):
+        self.status_code = status_code
+        self._body = body
+
+    def json(self):
+        return self._body
+
+def spotify_errors(method):
+    return dict((labels['method'], value) for _, labels, value in SPOTIFY_ERRORS.samples()).get(method, 0)
+
+@pytest.mark.parametrize('status_code, counted', [(200, 0), (429, 1), (500, 1)])
+def test_spotify_errors_count_non_2xx_responses_only(app, monkeypatch, status_code, counted):
+    monkeypatch.setattr('app.services.spotify_service.requests.get', lambda *args, **kwargs: FakeResponse(status_code, {'artists': {'items': []}}))
+    before = spotify_errors('search_artist')
+    with app.app_context():
+        # No artist matched: None either way, but only a failed response is an error
+        assert SpotifyService.search_artist('token', 'nobody') is None
+    assert spotify_errors('search_artist') - before == counted
+
+def test_spotify_errors_count_exceptions(app, monkeypatch):
+    def fail(*args, **kwargs):
+        raise ConnectionError('unreachable')
+    monkeypatch.setattr('app.services.spotify_service.requests.get', fail)
+    before = spotify_errors('get_user_info')
+    with app.app_context(), pytest.raises(ConnectionError):
+        SpotifyService.get_user_info('token')
+    assert spotify_errors('get_user_info') - before == 1
+
+def test_metrics_require_a_token_outside_debug(monkeypatch):
+    from config import ProductionConfig
+    from app import create_app
+
+    monkeypatch.setattr(ProductionConfig, 'METRICS_ENABLED', True)
+    monkeypatch.setattr(ProductionConfig, 'METRICS_TOKEN', None)
+    with pytest.raises(ValueError, match='METRICS_TOKEN'):
+        create_app('production')
+
+def forked(target, *args):
+    """Run target(*args) in a forked child, as a gunicorn worker is, and return what it returns"""
+    import multiprocessing
+
+    context = multiprocessing.get_context('fork')
+    results = context.Queue()
+    process = context.Process(target=lambda: results.put(target(*args)))
+    process.start()
+    result = results.get(timeout=30)
+    process.join()
+    return result
+
+def test_scrapes_sum_every_worker_of_the_server(tmp_path):
+    import multiprocessing
+    from app.utils.metrics import Counter, Gauge, MultiProcessCollector, Registry
+
+    registry = Registry()
+    requests = registry.register(Counter('requests_total', 'Requests', ('route',)))
+    registry.register(Gauge('pool_size', 'Pool size', lambda: [({}, 4)]))
+    collector = MultiProcessCollector(registry, str(tmp_path), interval=60, server_id=f'{os.getpid()}-test')
+
+    def serve(count):
+        for _ in range(count):
+            requests.inc('/api/health')
+        return {name: {sample[0]: sample[2] for sample in samples} for name, samples in collector.collect().items()}
+
+    # A worker of an earlier server whose master is gone
+    stale = tmp_path / f'{forked(os.getpid)}-old-1-00000000.json'
+    stale.write_text('{"requests_total": [["requests_total", {"route": "/api/health"}, 100]]}')
+
+    context = multiprocessing.get_context('fork')
+    stop = context.Event()
+    ready = context.Event()
+
+    def long_lived_worker():
+        requests.inc('/api/health', amount=3)
+        collector.write_snapshot()
+        ready.set()
+        stop.wait(30)
+
+    worker = context.Process(target=long_lived_worker)
+    worker.start()
+    ready.wait(30)
+    try:
+        scraped = forked(serve, 2)
+        assert scraped['requests_total']['requests_total'] == 5
+        assert scraped['pool_size']['pool_size'] == 8
+    finally:
+        stop.set()
+        worker.join()
+
+    # Counts from workers that exited are kept; their gauges are not
+    scraped = forked(serve, 1)
+    assert scraped['requests_total']['requests_total'] == 6
+    assert scraped['pool_size']['pool_size'] == 4
+    assert not stale.exists()
+
+    # Exited workers are folded into one file, once
+    assert forked(serve, 1)['requests_total']['requests_total'] == 7
+    assert sorted(path.name for path in tmp_path.glob('*.json'))[-1] == f'{os.getpid()}-test-retired.json'
+    assert len(list(tmp_path.glob('*.json'))) == 2
+
+def test_without_a_server_id_a_process_stands_alone(tmp_path):
+    from app.utils.metrics import Counter, MultiProcessCollector, Registry
+
+    registry = Registry()
+    requests = registry.register(Counter('requests_total', 'Requests'))
+    collector = MultiProcessCollector(registry, str(tmp_path), interval=60)
+
+    # Left by an earlier run of the same command, under the same parent
+    def earlier_run():
+        requests.inc(amount=50)
+        collector.write_snapshot()
+    forked(earlier_run)
+
+    requests.inc()
+    assert collector.collect()['requests_total'] == [('requests_total', {}, 1)]
+    assert len(list(tmp_path.glob('*.json'))) == 1
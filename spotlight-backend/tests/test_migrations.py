@@ -0,0 +1,65 @@
+import os
+import pytest
+from sqlalchemy import inspect, text
+
+HOT_PATH_INDEXES = {
+    'ix_social_links_user_id_position',
+    'ix_music_showcase_user_id_position',
+    'ix_profile_clicks_user_id_ip_address_clicked_at',
+    'ix_users_created_at_id'
+}
+
+def index_names(connection):
+    if connection.dialect.name == 'sqlite':
+        # The inspector skips expression indexes on SQLite
+        return set(connection.execute(text("SELECT name FROM sqlite_master WHERE type = 'index'")).scalars())
+    inspector = inspect(connection)
+    return {index['name'] for table in inspector.get_table_names() for index in inspector.get_indexes(table)}
+
+def head_revision():
+    from alembic.script import ScriptDirectory
+    from flask_migrate import Config
+    from app.utils.schema import MIGRATIONS_DIRECTORY
+
+    config = Config(os.path.join(MIGRATIONS_DIRECTORY, 'alembic.ini'))
+    config.set_main_option('script_location', MIGRATIONS_DIRECTORY)
+    return ScriptDirectory.from_config(config).get_current_head()
+
+def test_migrations_build_the_hot_path_indexes(app):
+    from app import db
+
+    with app.app_context(), db.engine.connect() as connection:
+        assert HOT_PATH_INDEXES <= index_names(connection)
+        assert connection.execute(text('SELECT version_num FROM alembic_version')).scalar() == head_revision()
+
+@pytest.fixture
+def create_all_app(monkeypatch, tmp_path):
+    """An app on a fresh SQLite file whose schema comes from db.create_all(), as before migrations"""
+    from config import DevelopmentConfig
+    from app import create_app, db
+
+    if os.environ.get('TEST_DATABASE_URL'):
+        pytest.skip('Builds its own SQLite database')
+    monkeypatch.setattr(DevelopmentConfig, 'SQLALCHEMY_DATABASE_URI', f"sqlite:///{tmp_path / 'create_all.db'}")
+    app = create_app('development')
+    with app.app_context():
+        db.create_all()
+        db.session.execute(text(
+            "INSERT INTO users (email, username, password_hash, is_admin, created_at) "
+            "VALUES ('old@example.com', 'old', 'x', 0, '2024-01-01 00:00:00.000000')"
+        ))
+        db.session.commit()
+        db.engine.dispose()
+    return app
+
+def test_create_all_database_is_stamped_then_upgraded(create_all_app):
+    from app import db
+    from app.utils.schema import upgrade_database
+
+    with create_all_app.app_context():
+        upgrade_database()
+        db.engine.dispose()
+        with db.engine.connect() as connection:
+            assert connection.execute(text('SELECT version_num FROM alembic_version')).scalar() == head_revision()
+            assert connection.execute(text("SELECT count(*) FROM users WHERE username = 'old'")).scalar() == 1
+            assert HOT_PATH_INDEXES <= index_names(connection)
@@ -0,0 +1,24 @@
+import os
+import subprocess
+import sys
+import textwrap
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def test_app_builds_without_fcntl():
+    """Windows has no fcntl: the app still imports and runs, just without a leader scheduler"""
+    script = textwrap.dedent('''
+        import sys
+        sys.modules['fcntl'] = None
+        from app import create_app
+        from app.utils.profiler import RequestProfiler
+        import tempfile
+
+        app = create_app('development')
+        assert 'leader_scheduler' not in app.extensions
+        profiler = RequestProfiler(tempfile.mkdtemp())
+        profiler.arm(count=1)
+        assert profiler.should_profile('health_check')
+    ''')
+    result = subprocess.run([sys.executable, '-c', script], cwd=BACKEND_DIR, capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
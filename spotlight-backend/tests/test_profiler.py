@@ -0,0 +1,45 @@
+import pytest
+from app.utils.profiler import RequestProfiler
+
+@pytest.fixture
+def workers(tmp_path):
+    """Two profilers on one directory, as two worker processes of one server see it"""
+    return [RequestProfiler(str(tmp_path), interval=0.001, max_profiles=3, rule_poll_interval=0) for _ in range(2)]
+
+def profile(profiler, endpoint):
+    if not profiler.should_profile(endpoint):
+        return None
+    return profiler.stop(profiler.start(), endpoint=endpoint)
+
+def test_a_rule_armed_in_one_worker_applies_in_all(workers):
+    first, second = workers
+    first.arm('profiles.get_public_profile', count=3)
+
+    assert not second.should_profile('auth.login')
+    assert profile(second, 'profiles.get_public_profile')
+    assert second.status()['armed']['remaining'] == 2
+
+    first.disarm()
+    assert not second.should_profile('profiles.get_public_profile')
+
+def test_workers_share_one_budget(workers):
+    first, second = workers
+    first.arm(count=3)
+
+    profiled = [profile(worker, 'health_check') for worker in (first, second, first, second, first)]
+    assert sum(p is not None for p in profiled) == 3
+    assert first.status()['armed'] is None
+
+def test_profiles_are_served_by_every_worker(workers):
+    first, second = workers
+    first.arm(count=5)
+    ids = [profile(worker, 'health_check')['id'] for worker in (first, second, first, second)]
+
+    listed = [p['id'] for p in second.status()['profiles']]
+    # Newest first, and only max_profiles are kept
+    assert listed == ids[::-1][:3]
+    stored = first.get(ids[-1])
+    assert stored['endpoint'] == 'health_check'
+    assert RequestProfiler.to_collapsed(stored) == ''.join(f'{stack} {count}\n' for stack, count in stored['stacks'].most_common())
+    assert first.get(ids[0]) is None
+    assert first.get('../rule') is None
@@ -0,0 +1,42 @@
+import pytest
+from check_query_plans import explain, full_scans, hot_queries
+
+@pytest.fixture
+def connection(app):
+    from app import db
+
+    with app.app_context():
+        with db.engine.connect() as connection:
+            if connection.dialect.name == 'postgresql':
+                # Report whether a usable index exists even though the test tables are tiny
+                connection.exec_driver_sql('SET enable_seqscan = off')
+            yield connection
+
+@pytest.mark.parametrize('name, statement, tables, dialects', hot_queries(), ids=[query[0] for query in hot_queries()])
+def test_hot_query_seeks_an_index(connection, name, statement, tables, dialects):
+    if dialects and connection.dialect.name not in dialects:
+        pytest.skip(f'{name} is only checked on {", ".join(dialects)}')
+    plan = explain(connection, statement)
+    assert not full_scans(connection.dialect.name, plan, tables), '\n'.join(plan)
+
+def test_full_index_scans_are_reported():
+    assert full_scans('sqlite', ['SCAN users USING INDEX ix_users_created_at_id'], ['users'])
+    assert full_scans('sqlite', ['SCAN users'], ['users'])
+    assert not full_scans('sqlite', ['SEARCH users USING INDEX ix_users_created_at_id (created_at>?)'], ['users'])
+    assert full_scans('postgresql', ['Index Scan on users'], ['users'])
+    assert not full_scans('postgresql', ['Index Scan on users ((created_at > now()))'], ['users'])
+
+def test_or_form_keyset_predicate_is_a_full_scan(connection):
+    """The predicate admin.get_users used before switching to after_cursor()"""
+    from datetime import datetime
+    from sqlalchemy import and_, or_, select
+    from app.models import User
+
+    if connection.dialect.name != 'sqlite':
+        pytest.skip('Postgres may plan the OR form with a bitmap scan')
+    now = datetime.utcnow()
+    statement = select(User).where(or_(
+        User.created_at > now,
+        and_(User.created_at == now, User.id > 1)
+    )).order_by(User.created_at, User.id).limit(50)
+    assert full_scans('sqlite', explain(connection, statement), ['users'])
@@ -0,0 +1,27 @@
+from flask import g
+
+def test_request_queries_are_summarized(app, monkeypatch):
+    monkeypatch.setitem(app.config, 'SQL_DEBUG_HEADERS', True)
+    before = app.extensions['query_stats'].snapshot().get('profiles.get_public_profile', {}).get('queries', 0)
+
+    response = app.test_client().get('/api/profiles/nobody')
+
+    assert response.status_code == 404
+    count = int(response.headers['X-DB-Query-Count'])
+    assert count >= 1
+    assert app.extensions['query_stats'].snapshot()['profiles.get_public_profile']['queries'] - before == count
+
+def test_queries_are_recorded_from_the_request_only(app):
+    from app import db
+    from app.models import User
+
+    with app.test_request_context('/api/profiles/nobody'):
+        app.view_functions['profiles.get_public_profile']('nobody')
+        query = g.sql_queries[0]
+        assert query.statement.lstrip().upper().startswith('SELECT')
+        assert 'profiles.py' in query.location and '(get_public_profile)' in query.location
+
+    # Outside a request (scripts, the shell) nothing accumulates on g
+    with app.app_context():
+        db.session.execute(db.select(User.id)).first()
+        assert 'sql_queries' not in g
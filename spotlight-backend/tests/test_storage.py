@@ -0,0 +1,38 @@
+import pytest
+from app.utils.storage import AvatarStorage, LocalStorage, S3Storage, load_storage
+
+class FilesOnly(AvatarStorage):
+    """Implements the file methods but none of the direct upload ones"""
+
+    def __init__(self, config):
+        pass
+
+    def put(self, name, data, content_type):
+        pass
+
+    def touch(self, name):
+        return False
+
+    def modified_at(self, name):
+        return None
+
+    def delete(self, name):
+        pass
+
+    def list(self):
+        return iter(())
+
+def test_backend_missing_methods_fails_when_built():
+    with pytest.raises(TypeError):
+        load_storage({}, f'{__name__}.FilesOnly')
+
+def test_factory_must_return_an_avatar_storage():
+    with pytest.raises(TypeError, match='not an AvatarStorage'):
+        load_storage({}, 'builtins.dict')
+
+def test_shipped_backends_implement_every_method():
+    assert not LocalStorage.__abstractmethods__
+    assert not S3Storage.__abstractmethods__
+
+def test_local_storage_loads(tmp_path):
+    assert isinstance(load_storage({'UPLOAD_FOLDER': str(tmp_path)}, 'local'), LocalStorage)
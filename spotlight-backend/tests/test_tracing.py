@@ -0,0 +1,14 @@
+import pytest
+from app.utils.tracing import SpanExporter, load_exporter
+
+class NoExport(SpanExporter):
+    def __init__(self, config):
+        pass
+
+def test_exporter_without_export_fails_when_built():
+    with pytest.raises(TypeError):
+        load_exporter({'TRACING_EXPORTER': f'{__name__}.NoExport'})
+
+def test_factory_must_return_a_span_exporter():
+    with pytest.raises(TypeError, match='not a SpanExporter'):
+        load_exporter({'TRACING_EXPORTER': 'builtins.dict'})
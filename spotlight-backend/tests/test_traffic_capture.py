@@ -0,0 +1,21 @@
+from app.utils.traffic_capture import REDACTED, body_shape, is_redacted
+from config import Config
+
+REDACT = Config.TRAFFIC_CAPTURE_REDACT_FIELDS
+
+def test_passwords_are_redacted_without_their_length():
+    shape = body_shape({'email': 'a@b.example', 'password': 'hunter22', 'username': 'artist'}, set(), REDACT)
+    assert shape == {'email': 'email', 'password': REDACTED, 'username': 6}
+
+def test_secret_fields_match_by_word():
+    for name in ('current_password', 'new_password', 'refresh_token', 'upload_token', 'code', 'client_secret', 'Password'):
+        assert is_redacted(name, REDACT), name
+    for name in ('username', 'display_name', 'bio', None):
+        assert not is_redacted(name, REDACT), name
+
+def test_nested_secrets_are_redacted():
+    shape = body_shape({'items': [{'token': 'abc'}], 'account': {'password': 'x' * 30}}, set(), REDACT)
+    assert shape == {'items': [1, {'token': REDACTED}], 'account': {'password': REDACTED}}
+
+def test_redaction_wins_over_keep_fields():
+    assert body_shape({'token': 'abc'}, {'token'}, REDACT) == {'token': REDACTED}
@@ -0,0 +1,86 @@
+import time
+from sqlalchemy import create_engine, text
+
+def test_deletion_jobs_are_visible_outside_the_worker_that_started_them(app, monkeypatch):
+    from app import db
+    from app.models import ProfileClick, User
+    from app.services import UserDeletionService
+
+    monkeypatch.setitem(app.config, 'USER_DELETE_CLICK_CHUNK_SIZE', 10)
+    with app.app_context():
+        user = User(email='purged@example.com', username='purged', password_hash='x')
+        db.session.add(user)
+        db.session.commit()
+        db.session.add_all([ProfileClick(user_id=user.id) for _ in range(25)])
+        db.session.commit()
+
+        job = UserDeletionService.start_background_deletion(user.id)
+        assert wait_for_job(UserDeletionService, job['id'])['clicks_purged'] == 25
+
+    # Another worker process shares nothing with this one but the database
+    engine = create_engine(app.config['SQLALCHEMY_DATABASE_URI'])
+    with engine.connect() as connection:
+        status = connection.execute(text('SELECT status FROM user_deletion_jobs WHERE id = :id'), {'id': job['id']}).scalar()
+    engine.dispose()
+    assert status == 'completed'
+
+def test_unknown_job(app):
+    from app.services import UserDeletionService
+
+    with app.app_context():
+        assert UserDeletionService.get_job('missing') is None
+
+def wait_for_job(service, job_id):
+    from app import db
+
+    deadline = time.time() + 10
+    while service.get_job(job_id)['status'] in ('pending', 'running') and time.time() < deadline:
+        time.sleep(0.05)
+        db.session.remove()
+    return service.get_job(job_id)
+
+def test_the_leader_resumes_jobs_abandoned_by_their_worker(app, monkeypatch):
+    from datetime import datetime, timedelta
+    from app import db
+    from app.models import ProfileClick, User, UserDeletionJob
+    from app.services import UserDeletionService
+
+    monkeypatch.setitem(app.config, 'USER_DELETE_CLICK_CHUNK_SIZE', 10)
+    with app.app_context():
+        user = User(email='abandoned@example.com', username='abandoned', password_hash='x')
+        db.session.add(user)
+        db.session.commit()
+        db.session.add_all([ProfileClick(user_id=user.id) for _ in range(15)])
+        # A worker purged 40 clicks, then was recycled mid-job
+        long_ago = datetime.utcnow() - timedelta(seconds=app.config['USER_DELETE_JOB_STALE_SECONDS'] + 60)
+        db.session.add_all([
+            UserDeletionJob(id='abandoned', user_id=user.id, status='running', clicks_purged=40, owner='gone:1', updated_at=long_ago),
+            UserDeletionJob(id='healthy', user_id=user.id, status='running', clicks_purged=0, owner='busy:2', updated_at=datetime.utcnow())
+        ])
+        db.session.commit()
+
+        assert UserDeletionService.resume_abandoned_jobs() == ['abandoned']
+        job = wait_for_job(UserDeletionService, 'abandoned')
+        assert job['status'] == 'completed'
+        assert job['clicks_purged'] == 55
+        assert job['owner'] == UserDeletionService._owner()
+        assert UserDeletionService.get_job('healthy')['status'] == 'running'
+
+def test_a_worker_stops_once_its_job_was_taken_over(app):
+    from app import db
+    from app.models import User, UserDeletionJob
+    from app.services import UserDeletionService
+
+    with app.app_context():
+        user = User(email='takenover@example.com', username='takenover', password_hash='x')
+        db.session.add(user)
+        db.session.commit()
+        db.session.add(UserDeletionJob(id='taken', user_id=user.id, status='running', clicks_purged=0, owner='other:3'))
+        db.session.commit()
+        user_id = user.id
+
+    # This worker's stale thread finds the job now belongs to another worker and leaves the user alone
+    UserDeletionService._run_job(app, 'taken', user_id, 'stale:4')
+    with app.app_context():
+        assert db.session.get(User, user_id) is not None
+        assert UserDeletionService.get_job('taken')['status'] == 'running'
@@ -0,0 +1,20 @@
+"""
+Script to apply pending database migrations
+Usage: python upgrade_database.py
+
+Run it once per deploy before starting asgi.py or any server other than gunicorn.conf.py,
+which applies migrations in its master process, and `python run.py`, which applies them on
+startup. Nothing applies them at import time, so workers never race each other to migrate.
+"""
+import os
+from app import create_app, db
+from app.utils.schema import upgrade_database
+
+def main():
+    app = create_app(os.getenv('FLASK_ENV', 'development'))
+    with app.app_context():
+        upgrade_database()
+        print(f"Database at {db.engine.url.render_as_string(hide_password=True)} is up to date")
+
+if __name__ == '__main__':
+    main()
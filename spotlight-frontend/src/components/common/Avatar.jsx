@@ -0,0 +1,38 @@
+const API_ORIGIN = (import.meta.env.VITE_API_BASE_URL || 'http://127.0.0.1:5000/api').replace('/api', '');
+
+// Uploaded files are served by the API host; external URLs are used as they are
+const resolveUrl = (url) => (url.startsWith('/api/uploads/') ? API_ORIGIN + url : url);
+
+const resolveSrcset = (srcset) =>
+  srcset
+    ? srcset
+        .split(', ')
+        .map((entry) => {
+          const [url, density] = entry.split(' ');
+          return `${resolveUrl(url)} ${density}`;
+        })
+        .join(', ')
+    : undefined;
+
+// `avatar` is the slot-sized object from the API ({ size, src, srcset, webp_srcset });
+// `src` is a plain URL used when there is none (older responses or a local preview)
+const Avatar = ({ avatar, src, alt, className }) => {
+  const image = avatar || (src ? { src } : null);
+  if (!image) return null;
+
+  return (
+    <picture>
+      {image.webp_srcset && <source type="image/webp" srcSet={resolveSrcset(image.webp_srcset)} />}
+      <img
+        src={resolveUrl(image.src)}
+        srcSet={resolveSrcset(image.srcset)}
+        width={image.size}
+        height={image.size}
+        alt={alt}
+        className={className}
+      />
+    </picture>
+  );
+};
+
+export default Avatar;
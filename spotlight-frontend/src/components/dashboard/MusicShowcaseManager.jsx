@@ -2,9 +2,9 @@ import { useState, useEffect, useRef } from 'react';
 import api from '../../utils/api';
 
 const MusicShowcaseManager = ({ profile, onUpdate }) => {
-  const [showcase, setShowcase] = useState([]);
+  const [showcase, setShowcase] = useState(profile?.music_showcase || []);
   const [albums, setAlbums] = useState([]);
-  const [loading, setLoading] = useState(true);
+  const [loading, setLoading] = useState(!profile?.music_showcase);
   const [browsing, setBrowsing] = useState(false);
   const [selectedAlbum, setSelectedAlbum] = useState(null);
   const [searchQuery, setSearchQuery] = useState('');
@@ -14,7 +14,10 @@ const MusicShowcaseManager = ({ profile, onUpdate }) => {
   const searchTimeout = useRef(null);
 
   useEffect(() => {
-    fetchShowcase();
+    // Showcase items already arrive with the dashboard bootstrap
+    if (!profile?.music_showcase) {
+      fetchShowcase();
+    }
   }, []);
 
   const fetchShowcase = async () => {
@@ -44,6 +47,14 @@ const MusicShowcaseManager = ({ profile, onUpdate }) => {
     setSearchQuery(''); // Clear search when fetching new albums
     setSearching(false);
     setSearchResults([]);
+
+    // Use the albums prefetched by the dashboard bootstrap the first time
+    if (!albums.length && profile?.spotify_albums?.items) {
+      setAlbums(profile.spotify_albums.items);
+      fetchingAlbums.current = false;
+      return;
+    }
+
     try {
       const response = await api.get('/spotify/user-albums?limit=50');
       setAlbums(response.data.items || []);
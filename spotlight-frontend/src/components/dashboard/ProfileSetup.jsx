@@ -1,5 +1,7 @@
 import { useState, useRef } from 'react';
 import api from '../../utils/api';
+import { uploadAvatar } from '../../utils/avatarUpload';
+import Avatar from '../common/Avatar';
 
 const ProfileSetup = ({ profile, onUpdate }) => {
   const [formData, setFormData] = useState({
@@ -14,20 +16,9 @@ const ProfileSetup = ({ profile, onUpdate }) => {
   const [message, setMessage] = useState('');
   const fileInputRef = useRef(null);
 
-  // Get current avatar URL for display
+  // Current avatar for display; a newly picked file is previewed instead
   const currentAvatarUrl = profile?.profile?.avatar_url || null;
-  const getAvatarUrl = () => {
-    if (avatarPreview) return avatarPreview;
-    if (!currentAvatarUrl) return null;
-    // If it's a relative path (uploaded file), construct full URL
-    if (currentAvatarUrl.startsWith('/api/uploads/')) {
-      const baseUrl = import.meta.env.VITE_API_BASE_URL || 'http://127.0.0.1:5000/api';
-      return baseUrl.replace('/api', '') + currentAvatarUrl;
-    }
-    // Otherwise it's an external URL
-    return currentAvatarUrl;
-  };
-  const displayAvatarUrl = getAvatarUrl();
+  const currentAvatar = profile?.profile?.avatar || null;
 
   const handleChange = (e) => {
     const { name, value, type, checked } = e.target;
@@ -81,15 +72,15 @@ const ProfileSetup = ({ profile, onUpdate }) => {
     setMessage('');
 
     try {
+      if (avatarFile) {
+        await uploadAvatar(avatarFile);
+      }
+
       const submitData = new FormData();
       submitData.append('display_name', formData.display_name);
       submitData.append('bio', formData.bio);
       submitData.append('is_public', formData.is_public);
       
-      if (avatarFile) {
-        submitData.append('avatar', avatarFile);
-      }
-      
       if (removeAvatar) {
         submitData.append('remove_avatar', 'true');
       }
@@ -168,10 +159,11 @@ const ProfileSetup = ({ profile, onUpdate }) => {
           </label>
           
           {/* Avatar Preview */}
-          {(displayAvatarUrl || avatarPreview) && (
+          {(avatarPreview || currentAvatarUrl) && (
             <div className="mb-4 flex flex-col sm:flex-row items-start sm:items-center gap-4">
-              <img
-                src={displayAvatarUrl}
+              <Avatar
+                avatar={avatarPreview ? null : currentAvatar}
+                src={avatarPreview || currentAvatarUrl}
                 alt="Avatar preview"
                 className="w-20 h-20 sm:w-24 sm:h-24 rounded-full object-cover border-2 border-white/10 shadow-glow"
               />
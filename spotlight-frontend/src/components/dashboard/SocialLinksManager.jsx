@@ -2,8 +2,8 @@ import { useState, useEffect } from 'react';
 import api from '../../utils/api';
 
 const SocialLinksManager = ({ profile, onUpdate }) => {
-  const [links, setLinks] = useState([]);
-  const [loading, setLoading] = useState(true);
+  const [links, setLinks] = useState(profile?.social_links || []);
+  const [loading, setLoading] = useState(!profile?.social_links);
   const [showAddForm, setShowAddForm] = useState(false);
   const [formData, setFormData] = useState({
     platform: '',
@@ -12,7 +12,10 @@ const SocialLinksManager = ({ profile, onUpdate }) => {
   });
 
   useEffect(() => {
-    fetchLinks();
+    // Links already arrive with the dashboard bootstrap
+    if (!profile?.social_links) {
+      fetchLinks();
+    }
   }, []);
 
   const fetchLinks = async () => {
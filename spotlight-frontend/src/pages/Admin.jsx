@@ -9,7 +9,10 @@ const Admin = () => {
   const [loading, setLoading] = useState(true);
   const [activeTab, setActiveTab] = useState('stats');
   const [page, setPage] = useState(1);
-  const [totalPages, setTotalPages] = useState(1);
+  const [cursors, setCursors] = useState([null]);
+  const [nextCursor, setNextCursor] = useState(null);
+  const [search, setSearch] = useState('');
+  const [searchInput, setSearchInput] = useState('');
 
   useEffect(() => {
     if (activeTab === 'stats') {
@@ -17,7 +20,7 @@ const Admin = () => {
     } else if (activeTab === 'users') {
       fetchUsers();
     }
-  }, [activeTab, page]);
+  }, [activeTab, page, search]);
 
   const fetchStats = async () => {
     try {
@@ -33,9 +36,12 @@ const Admin = () => {
   const fetchUsers = async () => {
     try {
       setLoading(true);
-      const response = await api.get(`/admin/users?page=${page}&per_page=20`);
+      const params = { per_page: 20 };
+      if (cursors[page - 1]) params.cursor = cursors[page - 1];
+      if (search) params.q = search;
+      const response = await api.get('/admin/users', { params });
       setUsers(response.data.users);
-      setTotalPages(response.data.pages);
+      setNextCursor(response.data.next_cursor);
     } catch (error) {
       console.error('Failed to fetch users:', error);
     } finally {
@@ -43,6 +49,19 @@ const Admin = () => {
     }
   };
 
+  const handleSearch = (e) => {
+    e.preventDefault();
+    setCursors([null]);
+    setPage(1);
+    setSearch(searchInput.trim());
+  };
+
+  const goToNextPage = () => {
+    if (!nextCursor) return;
+    setCursors(prev => [...prev.slice(0, page), nextCursor]);
+    setPage(p => p + 1);
+  };
+
   const toggleAdmin = async (userId) => {
     try {
       await api.post(`/admin/users/${userId}/toggle-admin`);
@@ -149,6 +168,21 @@ const Admin = () => {
           {activeTab === 'users' && (
             <div>
               <h2 className="text-xl font-bold text-primary-light mb-6">User Management</h2>
+              <form onSubmit={handleSearch} className="flex gap-2 mb-4">
+                <input
+                  type="text"
+                  value={searchInput}
+                  onChange={(e) => setSearchInput(e.target.value)}
+                  placeholder="Search by username or email prefix"
+                  className="flex-1 px-3 py-2 bg-white/5 border border-white/10 rounded text-white text-sm"
+                />
+                <button
+                  type="submit"
+                  className="px-4 py-2 bg-white/5 hover:bg-white/10 text-white rounded text-sm border border-white/10"
+                >
+                  Search
+                </button>
+              </form>
               {loading ? (
                 <div className="text-center text-gray-400 py-8">Loading users...</div>
               ) : (
@@ -160,6 +194,9 @@ const Admin = () => {
                           <th className="pb-3 text-gray-400 text-sm font-medium">ID</th>
                           <th className="pb-3 text-gray-400 text-sm font-medium">Email</th>
                           <th className="pb-3 text-gray-400 text-sm font-medium">Username</th>
+                          <th className="pb-3 text-gray-400 text-sm font-medium">Links</th>
+                          <th className="pb-3 text-gray-400 text-sm font-medium">Showcase</th>
+                          <th className="pb-3 text-gray-400 text-sm font-medium">Clicks</th>
                           <th className="pb-3 text-gray-400 text-sm font-medium">Admin</th>
                           <th className="pb-3 text-gray-400 text-sm font-medium">Actions</th>
                         </tr>
@@ -170,6 +207,9 @@ const Admin = () => {
                             <td className="py-3 text-primary-light">{u.id}</td>
                             <td className="py-3 text-primary-light">{u.email}</td>
                             <td className="py-3 text-primary-light">{u.username}</td>
+                            <td className="py-3 text-primary-light">{u.stats?.social_links ?? 0}</td>
+                            <td className="py-3 text-primary-light">{u.stats?.showcase_items ?? 0}</td>
+                            <td className="py-3 text-primary-light">{u.stats?.profile_clicks ?? 0}</td>
                             <td className="py-3">
                               <span className={`px-2 py-1 rounded text-xs ${
                                 u.is_admin 
@@ -194,7 +234,7 @@ const Admin = () => {
                       </tbody>
                     </table>
                   </div>
-                  {totalPages > 1 && (
+                  {(page > 1 || nextCursor) && (
                     <div className="flex justify-center gap-2 mt-6">
                       <button
                         onClick={() => setPage(p => Math.max(1, p - 1))}
@@ -204,11 +244,11 @@ const Admin = () => {
                         Previous
                       </button>
                       <span className="px-4 py-2 text-primary-light">
-                        Page {page} of {totalPages}
+                        Page {page}
                       </span>
                       <button
-                        onClick={() => setPage(p => Math.min(totalPages, p + 1))}
-                        disabled={page === totalPages}
+                        onClick={goToNextPage}
+                        disabled={!nextCursor}
                         className="px-4 py-2 bg-white/5 hover:bg-white/10 text-white rounded disabled:opacity-50 disabled:cursor-not-allowed border border-white/10"
                       >
                         Next
@@ -13,13 +13,18 @@ const Dashboard = () => {
   const [loading, setLoading] = useState(true);
 
   useEffect(() => {
-    fetchProfile();
+    // One bootstrap request replaces the separate profile, links, showcase and albums fetches
+    fetchProfile('links,showcase,spotify');
   }, []);
 
-  const fetchProfile = async () => {
+  const fetchProfile = async (include = 'links,showcase') => {
     try {
-      const response = await api.get('/profiles/me');
-      setProfile(response.data);
+      const response = await api.get('/profiles/me/bootstrap', { params: { include } });
+      // Keep previously loaded Spotify albums when refreshing without them
+      setProfile(prev => ({
+        ...response.data,
+        spotify_albums: response.data.spotify_albums ?? prev?.spotify_albums,
+      }));
     } catch (error) {
       console.error('Failed to fetch profile:', error);
     } finally {
@@ -103,16 +108,16 @@ const Dashboard = () => {
         {/* Tab Content */}
         <div className="bg-gradient-to-br from-white/5 via-primary/5 to-accent/5 backdrop-blur-xl rounded-2xl p-4 sm:p-6 border border-primary/20 shadow-glow">
           {activeTab === 'profile' && (
-            <ProfileSetup profile={profile} onUpdate={fetchProfile} />
+            <ProfileSetup profile={profile} onUpdate={() => fetchProfile()} />
           )}
           {activeTab === 'spotify' && (
-            <SpotifyConnection profile={profile} onUpdate={fetchProfile} />
+            <SpotifyConnection profile={profile} onUpdate={() => fetchProfile('links,showcase,spotify')} />
           )}
           {activeTab === 'links' && (
-            <SocialLinksManager profile={profile} onUpdate={fetchProfile} />
+            <SocialLinksManager profile={profile} onUpdate={() => fetchProfile()} />
           )}
           {activeTab === 'showcase' && (
-            <MusicShowcaseManager profile={profile} onUpdate={fetchProfile} />
+            <MusicShowcaseManager profile={profile} onUpdate={() => fetchProfile()} />
           )}
         </div>
       </div>
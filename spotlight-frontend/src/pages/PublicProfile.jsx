@@ -1,6 +1,7 @@
 import { useEffect, useState, useRef, useCallback } from 'react';
 import { useParams } from 'react-router-dom';
 import api from '../utils/api';
+import Avatar from '../components/common/Avatar';
 
 const PublicProfile = () => {
   const { username } = useParams();
@@ -210,31 +211,17 @@ const PublicProfile = () => {
 
   const { profile: profileData, social_links } = profile;
 
-  // Get avatar URL - handle both uploaded files and external URLs
-  const getAvatarUrl = () => {
-    if (!profileData.avatar_url) return null;
-    // If it's a relative path (uploaded file), construct full URL
-    if (profileData.avatar_url.startsWith('/api/uploads/')) {
-      const baseUrl = import.meta.env.VITE_API_BASE_URL || 'http://127.0.0.1:5000/api';
-      return baseUrl.replace('/api', '') + profileData.avatar_url;
-    }
-    // Otherwise it's an external URL
-    return profileData.avatar_url;
-  };
-  const avatarUrl = getAvatarUrl();
-
   return (
     <div className="min-h-screen bg-gradient-dark overflow-x-hidden">
       <div className="max-w-2xl mx-auto px-4 sm:px-6 py-8 sm:py-12">
         {/* Header */}
         <div className="text-center mb-6 sm:mb-8">
-          {avatarUrl && (
-            <img
-              src={avatarUrl}
-              alt={profileData.display_name || username}
-              className="w-24 h-24 sm:w-32 sm:h-32 rounded-full mx-auto mb-4 border-4 border-white/10 object-cover shadow-glow"
-            />
-          )}
+          <Avatar
+            avatar={profileData.avatar}
+            src={profileData.avatar_url}
+            alt={profileData.display_name || username}
+            className="w-24 h-24 sm:w-32 sm:h-32 rounded-full mx-auto mb-4 border-4 border-white/10 object-cover shadow-glow"
+          />
           <h1 className="text-3xl sm:text-4xl md:text-5xl font-bold text-primary-light mb-2 text-balance">
             {profileData.display_name || username}
           </h1>
@@ -0,0 +1,32 @@
+import axios from 'axios';
+import api from './api';
+
+// Upload an avatar straight to storage, then have the API process it.
+// The file never goes through the API server when storage hands out presigned URLs (S3).
+export const uploadAvatar = async (file) => {
+  const { data: target } = await api.post('/profiles/me/avatar/uploads', {
+    content_type: file.type,
+    size: file.size,
+  });
+
+  // Local storage returns a path on the API server; the base URL itself may be relative (e.g. /api)
+  const apiBase = new URL(api.defaults.baseURL, window.location.origin);
+  const url = new URL(target.url, apiBase).toString();
+
+  if (target.method === 'POST') {
+    // Presigned POST: the policy fields must come before the file
+    const uploadData = new FormData();
+    Object.entries(target.fields).forEach(([key, value]) => {
+      uploadData.append(key, value);
+    });
+    uploadData.append('file', file);
+    await axios.post(url, uploadData);
+  } else {
+    await axios.put(url, file, { headers: target.headers });
+  }
+
+  const { data } = await api.post('/profiles/me/avatar', {
+    upload_token: target.upload_token,
+  });
+  return data.profile;
+};